@@ -0,0 +1,201 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Deque, Dict, Optional, Tuple
+
+import bcrypt
+
+# bcrypt releases the GIL, so threads hash in parallel; cap them so a login
+# burst cannot take every core away from page renders
+AUTH_WORKERS = int(os.environ.get('AUTH_WORKERS', min(4, os.cpu_count() or 1)))
+# Hash requests allowed to wait for a worker before new ones are rejected
+AUTH_MAX_QUEUE = int(os.environ.get('AUTH_MAX_QUEUE', 16))
+# Seconds a caller waits for its hash before giving up
+AUTH_HASH_TIMEOUT = float(os.environ.get('AUTH_HASH_TIMEOUT', 10))
+# Login attempts allowed per window, per email and per client IP
+LOGIN_ATTEMPTS_PER_EMAIL = int(os.environ.get('LOGIN_ATTEMPTS_PER_EMAIL', 5))
+LOGIN_ATTEMPTS_PER_IP = int(os.environ.get('LOGIN_ATTEMPTS_PER_IP', 20))
+LOGIN_WINDOW_SECONDS = int(os.environ.get('LOGIN_WINDOW_SECONDS', 300))
+# Latency samples kept for percentile metrics
+LATENCY_SAMPLES = 512
+
+
+class AuthServiceBusy(Exception):
+    """Raised when the hash queue is full or a hash does not finish in time"""
+
+
+class RateLimited(Exception):
+    """Raised when an email or IP has used up its login attempts"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many login attempts, try again in {int(retry_after) + 1} seconds")
+        self.retry_after = retry_after
+
+
+class SlidingWindowRateLimiter:
+    """Allow at most `limit` hits per key within any `window` seconds"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._hits: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> Tuple[bool, float]:
+        """Record an attempt; returns (allowed, seconds until the next one is allowed)"""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return False, hits[0] + self.window - now
+            hits.append(now)
+            # Drop idle keys now and then so the table tracks active clients only
+            if len(self._hits) > 10000:
+                self._hits = {k: v for k, v in self._hits.items() if v and v[-1] > now - self.window}
+            return True, 0.0
+
+    def reset(self, key: str):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class HashLatencyStats:
+    """Counters and recent latency samples for hash and verify calls"""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[Tuple[float, float]]] = {}
+        self._counts: Dict[str, int] = {}
+        self._sample_size = samples
+        self.rejected = 0
+        self.timeouts = 0
+
+    def record(self, operation: str, wait_seconds: float, hash_seconds: float):
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self._sample_size)).append(
+                (wait_seconds, hash_seconds)
+            )
+            self._counts[operation] = self._counts.get(operation, 0) + 1
+
+    def count_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def count_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict:
+        """Per-operation counts plus p50/p95/max queue wait and hash time in milliseconds"""
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+        with self._lock:
+            operations = {}
+            for operation, samples in self._samples.items():
+                waits = sorted(wait for wait, _ in samples)
+                hashes = sorted(hashed for _, hashed in samples)
+                operations[operation] = {
+                    'count': self._counts[operation],
+                    'hash_p50_ms': percentile(hashes, 0.5),
+                    'hash_p95_ms': percentile(hashes, 0.95),
+                    'hash_max_ms': hashes[-1] * 1000,
+                    'wait_p50_ms': percentile(waits, 0.5),
+                    'wait_p95_ms': percentile(waits, 0.95),
+                }
+            return {'operations': operations, 'rejected': self.rejected, 'timeouts': self.timeouts}
+
+
+class AuthService:
+    """Runs bcrypt on a bounded worker pool with admission control and login rate limits
+
+    At most `workers` hashes run at once and at most `max_queue` more may
+    wait; beyond that callers get AuthServiceBusy immediately instead of
+    piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int = AUTH_WORKERS, max_queue: int = AUTH_MAX_QUEUE,
+                 timeout: float = AUTH_HASH_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='auth-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self.stats = HashLatencyStats()
+        self.email_limiter = SlidingWindowRateLimiter(LOGIN_ATTEMPTS_PER_EMAIL, LOGIN_WINDOW_SECONDS)
+        self.ip_limiter = SlidingWindowRateLimiter(LOGIN_ATTEMPTS_PER_IP, LOGIN_WINDOW_SECONDS)
+
+    def _run(self, operation: str, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self.stats.count_rejected()
+            raise AuthServiceBusy("Authentication is busy, please try again shortly")
+        with self._in_flight_lock:
+            self._in_flight += 1
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished = time.perf_counter()
+                self.stats.record(operation, started - submitted, finished - started)
+                with self._in_flight_lock:
+                    self._in_flight -= 1
+                # The slot is held until the hash really finishes, even if the caller timed out
+                self._slots.release()
+
+        future = self._executor.submit(task)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.stats.count_timeout()
+            raise AuthServiceBusy("Authentication timed out, please try again shortly")
+
+    def hash_password(self, password: str) -> bytes:
+        """bcrypt hash of a password, computed on the worker pool"""
+        return self._run('hash', bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+
+    def verify_password(self, password: str, password_hash: bytes) -> bool:
+        """Check a password against a bcrypt hash on the worker pool"""
+        return self._run('verify', bcrypt.checkpw, password.encode('utf-8'), password_hash)
+
+    def check_login_allowed(self, email: str, client_ip: Optional[str] = None):
+        """Count a login attempt, raising RateLimited if the email or IP is over its limit"""
+        allowed, retry_after = self.email_limiter.hit(email.strip().lower())
+        if allowed and client_ip:
+            allowed, retry_after = self.ip_limiter.hit(client_ip)
+        if not allowed:
+            raise RateLimited(retry_after)
+
+    def login_succeeded(self, email: str):
+        """Clear an email's failed-attempt history after a successful login"""
+        self.email_limiter.reset(email.strip().lower())
+
+    def metrics(self) -> Dict:
+        snapshot = self.stats.snapshot()
+        with self._in_flight_lock:
+            snapshot['in_flight'] = self._in_flight
+        snapshot['workers'] = self.workers
+        snapshot['max_queue'] = self.max_queue
+        return snapshot
+
+
+_auth_service: Optional[AuthService] = None
+_service_lock = threading.Lock()
+
+
+def get_auth_service() -> AuthService:
+    """Process-wide auth service shared by every Streamlit session"""
+    global _auth_service
+    if _auth_service is None:
+        with _service_lock:
+            if _auth_service is None:
+                _auth_service = AuthService()
+    return _auth_service
@@ -1,12 +1,28 @@
 import os
-import bcrypt
+import json
+import logging
+import threading
 import streamlit as st
 from datetime import datetime, timedelta
 import psycopg2
 from psycopg2.pool import SimpleConnectionPool
 from contextlib import contextmanager
+from http.cookies import SimpleCookie
 from typing import Optional, Dict, Tuple
 
+from auth_service import get_auth_service, AuthServiceBusy, RateLimited
+from session_store import get_session_store
+
+# Cookie carrying the signed session token, so a reload or an app restart
+# resumes the session without another password check
+SESSION_COOKIE = 'outfit_wizard_session'
+# Query parameter older releases kept the token in; such tokens are revoked
+SESSION_QUERY_PARAM = 'session'
+
+# Reverse proxies in front of the app that append to X-Forwarded-For. With the
+# default of 0 the header is ignored, as any client can send one
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
 # Initialize connection pool with better error handling
 def create_connection_pool():
     try:
@@ -20,56 +36,45 @@ def create_connection_pool():
         st.error(f"Failed to create database pool: {str(e)}")
         raise
 
-# Initialize connection pool
-connection_pool = create_connection_pool()
+# Connection pool, created on first use so importing this module stays cheap
+connection_pool = None
+_pool_lock = threading.Lock()
+
+def get_connection_pool() -> SimpleConnectionPool:
+    """Return the shared pool, creating it on first use"""
+    global connection_pool
+    if connection_pool is None:
+        with _pool_lock:
+            if connection_pool is None:
+                connection_pool = create_connection_pool()
+    return connection_pool
 
 @contextmanager
 def get_db_connection():
     """Context manager for database connections with proper error handling"""
+    pool = get_connection_pool()
     conn = None
     try:
-        conn = connection_pool.getconn()
+        conn = pool.getconn()
         yield conn
     finally:
         if conn:
             if not conn.closed:
                 conn.commit()
-            connection_pool.putconn(conn)
+            pool.putconn(conn)
 
 def init_auth_tables():
-    """Initialize authentication and profile tables"""
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            # Create users table with additional profile fields
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    username VARCHAR(64) UNIQUE NOT NULL,
-                    email VARCHAR(120) UNIQUE NOT NULL,
-                    password_hash BYTEA NOT NULL,
-                    role VARCHAR(10) NOT NULL DEFAULT 'user',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    full_name VARCHAR(100),
-                    bio TEXT,
-                    profile_picture_path VARCHAR(255),
-                    preferences JSONB DEFAULT '{}',
-                    last_login TIMESTAMP,
-                    CHECK (role IN ('admin', 'user'))
-                )
-            """)
-            conn.commit()
-            st.success("Successfully initialized auth tables")
-        except Exception as e:
-            st.error(f"Failed to initialize auth tables: {str(e)}")
-            conn.rollback()
-            raise
-        finally:
-            cur.close()
+    """Initialize authentication and profile tables by applying pending migrations"""
+    from migrations import run_migrations
+    success, message = run_migrations()
+    if not success:
+        st.error(f"Failed to initialize auth tables: {message}")
+        raise RuntimeError(message)
+    logging.info(message)
 
 def hash_password(password: str) -> bytes:
-    """Hash a password using bcrypt with proper encoding"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    """Hash a password using bcrypt on the shared auth worker pool"""
+    return get_auth_service().hash_password(password)
 
 def verify_password(password: str, password_hash: bytes) -> bool:
     """Verify a password against its hash with proper type handling"""
@@ -77,7 +82,9 @@ def verify_password(password: str, password_hash: bytes) -> bool:
         # Convert memoryview to bytes if necessary
         if isinstance(password_hash, memoryview):
             password_hash = password_hash.tobytes()
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash)
+        return get_auth_service().verify_password(password, password_hash)
+    except AuthServiceBusy:
+        raise
     except Exception as e:
         st.error(f"Password verification error: {str(e)}")
         return False
@@ -107,8 +114,41 @@ def create_user(username: str, email: str, password: str, role: str = 'user') ->
         st.error(f"Error creating user: {str(e)}")
         return False
 
-def authenticate_user(email: str, password: str) -> Tuple[bool, Dict]:
-    """Authenticate a user and update last login time"""
+def get_client_ip(trusted_proxies: int = TRUSTED_PROXY_COUNT) -> Optional[str]:
+    """Client address used as a rate-limit key
+
+    Behind `trusted_proxies` proxies the address is the X-Forwarded-For hop
+    added by the outermost trusted one; entries left of it are whatever the
+    client sent and are never used. Without trusted proxies the headers are
+    ignored and the socket peer address is used.
+    """
+    try:
+        context = st.context
+        headers = context.headers
+    except Exception:
+        return None
+    if trusted_proxies > 0:
+        hops = [hop.strip() for hop in headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+        # Fewer hops than proxies means a request that bypassed the proxy chain
+        return None
+    # st.context.ip_address only exists on newer Streamlit releases
+    return getattr(context, 'ip_address', None)
+
+def authenticate_user(email: str, password: str, client_ip: Optional[str] = None) -> Tuple[bool, Dict]:
+    """Authenticate a user and update last login time
+
+    Attempts are rate limited per email and per client IP. On failure the
+    returned dict may carry an 'error' message to show instead of the
+    generic invalid-credentials text.
+    """
+    service = get_auth_service()
+    try:
+        service.check_login_allowed(email, client_ip)
+    except RateLimited as e:
+        logging.warning(f"Login rate limit hit for {email} from {client_ip or 'unknown address'}")
+        return False, {"error": str(e)}
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
@@ -124,12 +164,9 @@ def authenticate_user(email: str, password: str) -> Tuple[bool, Dict]:
                 result = cur.fetchone()
 
                 if result and verify_password(password, result[2]):
-                    # Update last login time
-                    cur.execute(
-                        "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s",
-                        (result[0],)
-                    )
-                    conn.commit()
+                    service.login_succeeded(email)
+                    # last_login is written in batches by the session store
+                    get_session_store().batcher.touch_login(result[0])
                     return True, {
                         "id": result[0],
                         "username": result[1],
@@ -138,6 +175,8 @@ def authenticate_user(email: str, password: str) -> Tuple[bool, Dict]:
                 return False, {}
             finally:
                 cur.close()
+    except AuthServiceBusy as e:
+        return False, {"error": str(e)}
     except Exception as e:
         st.error(f"Authentication error: {str(e)}")
         return False, {}
@@ -210,12 +249,81 @@ def get_user_profile(user_id: int) -> Optional[Dict]:
         st.error(f"Error fetching profile: {str(e)}")
         return None
 
+def _read_session_cookie() -> Optional[str]:
+    """Session token sent with the browser's connection, if any"""
+    try:
+        cookies = getattr(st.context, 'cookies', None)
+        if cookies is not None:
+            return cookies.get(SESSION_COOKIE)
+        # st.context.cookies only exists on newer Streamlit releases
+        jar = SimpleCookie(st.context.headers.get('Cookie', ''))
+    except Exception:
+        return None
+    morsel = jar.get(SESSION_COOKIE)
+    return morsel.value if morsel else None
+
+def _write_session_cookie(token: str):
+    """Set the session cookie in the browser, or clear it when token is empty
+
+    Streamlit cannot send Set-Cookie headers from a script, so the cookie is
+    written by a zero-height component script. It keeps the token out of
+    URLs, history and Referer headers, but it cannot be HttpOnly: script on
+    the page, including any XSS, can read it.
+
+    The cookie is SameSite=Strict, and Secure only when the page is served
+    over https, since browsers drop Secure cookies on plain-HTTP origins.
+    """
+    import streamlit.components.v1 as components
+    max_age = int(get_session_store().ttl.total_seconds()) if token else 0
+    cookie = f"{SESSION_COOKIE}={token}; Path=/; Max-Age={max_age}; SameSite=Strict"
+    components.html(
+        "<script>"
+        f"const cookie = {json.dumps(cookie)};"
+        "window.parent.document.cookie = window.parent.location.protocol === 'https:'"
+        " ? cookie + '; Secure' : cookie;"
+        "</script>",
+        height=0
+    )
+
 def init_session_state():
-    """Initialize session state variables for authentication"""
+    """Initialize session state variables for authentication, resuming a stored session if present"""
     if 'user' not in st.session_state:
         st.session_state.user = None
     if 'auth_status' not in st.session_state:
         st.session_state.auth_status = None
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = None
+
+    # Tokens from older releases sat in the URL and may have leaked through
+    # history or logs; end those sessions rather than resuming them
+    legacy_token = st.query_params.get(SESSION_QUERY_PARAM)
+    if legacy_token:
+        get_session_store().revoke(legacy_token)
+        del st.query_params[SESSION_QUERY_PARAM]
+
+    # Cookie writes are queued by login/logout, which rerun before anything renders
+    pending_cookie = st.session_state.pop('pending_session_cookie', None)
+    if pending_cookie is not None:
+        _write_session_cookie(pending_cookie)
+
+    if st.session_state.user is None and not st.session_state.get('session_resume_checked'):
+        st.session_state.session_resume_checked = True
+        token = _read_session_cookie()
+        if token:
+            user = get_session_store().resolve(token)
+            if user:
+                st.session_state.user = user
+                st.session_state.session_token = token
+            else:
+                _write_session_cookie('')
+
+def start_session(user_data: Dict):
+    """Log a user in and persist a server-side session for them"""
+    st.session_state.user = user_data
+    token = get_session_store().create(user_data)
+    if token:
+        st.session_state.session_token = token
+        st.session_state.pending_session_cookie = token
 
 def is_admin(user_data: Optional[Dict]) -> bool:
     """Check if the current user has admin role"""
@@ -233,6 +341,11 @@ def require_admin(func):
     return wrapper
 
 def logout_user():
-    """Log out the current user"""
+    """Log out the current user and revoke their stored session"""
+    token = st.session_state.get('session_token')
+    if token:
+        get_session_store().revoke(token)
+        st.session_state.pending_session_cookie = ''
     st.session_state.user = None
-    st.session_state.auth_status = None
\ No newline at end of file
+    st.session_state.auth_status = None
+    st.session_state.session_token = None
\ No newline at end of file
@@ -0,0 +1,230 @@
+import os
+import json
+import sqlite3
+import datetime
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Iterable
+
+
+class BackupCatalog:
+    """SQLite-backed index of backups with time/type lookups and GFS retention
+
+    Every write runs in its own transaction, and the database uses WAL so
+    readers (listing, verification) never block the writer or see a
+    half-written catalog.
+    """
+
+    def __init__(self, db_path: str, legacy_manifest: Optional[str] = None):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._create_schema()
+        if legacy_manifest:
+            self._import_legacy_manifest(legacy_manifest)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backups (
+                    id INTEGER PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    filepath TEXT NOT NULL UNIQUE,
+                    created_at TEXT NOT NULL,
+                    checksum TEXT NOT NULL,
+                    sha256 TEXT,
+                    size_bytes INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_backups_type_created ON backups(type, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_backups_created ON backups(created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backup_runs (
+                    id INTEGER PRIMARY KEY,
+                    job TEXT NOT NULL,
+                    started_at TEXT NOT NULL,
+                    duration_seconds REAL NOT NULL,
+                    bytes_read INTEGER NOT NULL,
+                    backup_bytes INTEGER,
+                    throughput_bps REAL,
+                    success INTEGER NOT NULL,
+                    message TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_backup_runs_job_started ON backup_runs(job, started_at)")
+
+    def _import_legacy_manifest(self, manifest_file: str):
+        """One-time import of the old JSON manifest, renamed afterwards so it is not re-read"""
+        if not os.path.exists(manifest_file):
+            return
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+        with self._connect() as conn:
+            for backup_type, entries in manifest.items():
+                for entry in entries:
+                    conn.execute("""
+                        INSERT OR IGNORE INTO backups (type, filepath, created_at, checksum, sha256)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (backup_type, entry['filepath'], entry['timestamp'],
+                          entry['checksum'], entry.get('sha256')))
+        os.replace(manifest_file, f"{manifest_file}.imported")
+        logging.info(f"Imported legacy backup manifest {manifest_file} into {self.db_path}")
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> Dict:
+        entry = {
+            'filepath': row['filepath'],
+            'timestamp': row['created_at'],
+            'checksum': row['checksum'],
+            'type': row['type'],
+            'size_bytes': row['size_bytes'],
+        }
+        if row['sha256']:
+            entry['sha256'] = row['sha256']
+        return entry
+
+    def add(self, backup_type: str, filepath: str, checksum: str, sha256: Optional[str] = None,
+            size_bytes: Optional[int] = None, created_at: Optional[datetime.datetime] = None):
+        """Record a backup, replacing any earlier entry for the same path"""
+        created_at = (created_at or datetime.datetime.now()).isoformat()
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO backups (type, filepath, created_at, checksum, sha256, size_bytes)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(filepath) DO UPDATE SET
+                    type = excluded.type,
+                    created_at = excluded.created_at,
+                    checksum = excluded.checksum,
+                    sha256 = excluded.sha256,
+                    size_bytes = excluded.size_bytes
+            """, (backup_type, filepath, created_at, checksum, sha256, size_bytes))
+
+    def get(self, filepath: str, backup_type: Optional[str] = None) -> Optional[Dict]:
+        """Look up one backup by path"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM backups WHERE filepath = ?", (filepath,)).fetchone()
+        if row is None or (backup_type and row['type'] != backup_type):
+            return None
+        return self._entry(row)
+
+    def find(self, backup_type: Optional[str] = None, since: Optional[datetime.datetime] = None,
+             until: Optional[datetime.datetime] = None, limit: Optional[int] = None,
+             newest_first: bool = False) -> List[Dict]:
+        """Backups filtered by type and creation time window"""
+        conditions, params = [], []
+        if backup_type:
+            conditions.append("type = ?")
+            params.append(backup_type)
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since.isoformat())
+        if until:
+            conditions.append("created_at < ?")
+            params.append(until.isoformat())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "DESC" if newest_first else "ASC"
+        query = f"SELECT * FROM backups {where} ORDER BY created_at {order}, id {order}"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        with self._connect() as conn:
+            return [self._entry(row) for row in conn.execute(query, params)]
+
+    def latest(self, backup_type: str) -> Optional[Dict]:
+        """Most recent backup of a type"""
+        entries = self.find(backup_type, limit=1, newest_first=True)
+        return entries[0] if entries else None
+
+    def types(self) -> List[str]:
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT type FROM backups ORDER BY type")]
+
+    def remove(self, filepaths: Iterable[str]) -> int:
+        """Delete entries in a single transaction"""
+        filepaths = list(filepaths)
+        if not filepaths:
+            return 0
+        with self._connect() as conn:
+            cursor = conn.executemany("DELETE FROM backups WHERE filepath = ?", [(p,) for p in filepaths])
+            return cursor.rowcount
+
+    def plan_retention(self, backup_type: str, daily: int = 7, weekly: int = 4, monthly: int = 12,
+                       now: Optional[datetime.datetime] = None) -> Tuple[List[Dict], List[Dict]]:
+        """Split a type's backups into (keep, expire) using grandfather-father-son rules
+
+        Keeps the newest backup of each of the last `daily` days, of each of
+        the last `weekly` ISO weeks and of each of the last `monthly` months.
+        The newest backup overall is always kept.
+        """
+        now = now or datetime.datetime.now()
+        today = now.date()
+        this_week = today - datetime.timedelta(days=today.weekday())
+        day_cutoff = today - datetime.timedelta(days=daily - 1)
+        week_cutoff = this_week - datetime.timedelta(weeks=weekly - 1)
+        month_index = today.year * 12 + today.month - 1
+        month_cutoff = month_index - (monthly - 1)
+
+        seen_days, seen_weeks, seen_months = set(), set(), set()
+        keep, expire = [], []
+        for position, entry in enumerate(self.find(backup_type, newest_first=True)):
+            created = datetime.datetime.fromisoformat(entry['timestamp']).date()
+            week = created - datetime.timedelta(days=created.weekday())
+            month = created.year * 12 + created.month - 1
+
+            retained = position == 0
+            if daily > 0 and created >= day_cutoff and created not in seen_days:
+                seen_days.add(created)
+                retained = True
+            if weekly > 0 and week >= week_cutoff and week not in seen_weeks:
+                seen_weeks.add(week)
+                retained = True
+            if monthly > 0 and month >= month_cutoff and month not in seen_months:
+                seen_months.add(month)
+                retained = True
+            (keep if retained else expire).append(entry)
+        return keep, expire
+
+    def record_run(self, job: str, started_at: datetime.datetime, duration_seconds: float,
+                   bytes_read: int, backup_bytes: Optional[int], success: bool, message: str = ''):
+        """Record one scheduled run's duration and throughput"""
+        throughput = bytes_read / duration_seconds if duration_seconds > 0 else None
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO backup_runs (job, started_at, duration_seconds, bytes_read,
+                                         backup_bytes, throughput_bps, success, message)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (job, started_at.isoformat(), duration_seconds, bytes_read,
+                  backup_bytes, throughput, int(success), message))
+
+    def recent_runs(self, job: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Latest scheduled runs, newest first"""
+        where = "WHERE job = ?" if job else ""
+        params = [job] if job else []
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM backup_runs {where} ORDER BY started_at DESC, id DESC LIMIT ?",
+                params + [int(limit)]
+            ).fetchall()
+        return [
+            {
+                'job': row['job'],
+                'started_at': row['started_at'],
+                'duration_seconds': row['duration_seconds'],
+                'bytes_read': row['bytes_read'],
+                'backup_bytes': row['backup_bytes'],
+                'throughput_bps': row['throughput_bps'],
+                'success': bool(row['success']),
+                'message': row['message'],
+            }
+            for row in rows
+        ]
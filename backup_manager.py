@@ -1,27 +1,136 @@
 import os
+import re
 import shutil
 import datetime
 import logging
 import psycopg2
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List, Iterable
 import subprocess
 import json
 from pathlib import Path
 import hashlib
+import uuid
+import zipfile
+import zlib
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from backup_catalog import BackupCatalog
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; object store locking is skipped there
+    fcntl = None
+
+# Directories holding user content that file backups cover
+FILE_BACKUP_DIRS = ['user_images', 'wardrobe', 'merged_outfits']
+# Bytes read per block when hashing or copying files
+HASH_BLOCK_SIZE = 1 << 20
+# pg_dump/pg_restore parallelism and compression for directory-format dumps
+DB_DUMP_JOBS = int(os.environ.get('DB_DUMP_JOBS', os.cpu_count() or 1))
+DB_DUMP_COMPRESSION = 6
+# Worker threads for selective restores
+RESTORE_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+# Creation time embedded in backup names by _get_backup_filename
+BACKUP_TIMESTAMP_PATTERN = re.compile(r'_(\d{8}_\d{6})')
+
+
+class IORateLimiter:
+    """Token bucket capping how fast backups read source files, shared across threads
+
+    With bytes_per_second=None reads are never delayed but are still
+    counted, so callers can report throughput either way.
+    """
+
+    def __init__(self, bytes_per_second: Optional[int] = None, burst_bytes: int = HASH_BLOCK_SIZE * 4):
+        self.bytes_per_second = bytes_per_second
+        self.burst_bytes = max(burst_bytes, HASH_BLOCK_SIZE)
+        self.bytes_read = 0
+        self._tokens = float(self.burst_bytes)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int):
+        """Account for nbytes just read, sleeping long enough to stay under the rate"""
+        with self._lock:
+            self.bytes_read += nbytes
+            if not self.bytes_per_second:
+                return
+            now = time.monotonic()
+            self._tokens = min(
+                float(self.burst_bytes),
+                self._tokens + (now - self._last_refill) * self.bytes_per_second
+            )
+            self._last_refill = now
+            self._tokens -= nbytes
+            # Sleeping under the lock makes concurrent readers queue behind
+            # each other, so the limit holds for the process as a whole
+            if self._tokens < 0:
+                time.sleep(-self._tokens / self.bytes_per_second)
+
+
+class _HashingWriter:
+    """Write-only file wrapper that hashes bytes as they are written
+
+    It deliberately has no seek(), so zipfile streams entries with data
+    descriptors instead of seeking back, and the running digests always
+    match the bytes on disk.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._position = 0
+        self.md5 = hashlib.md5()
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.md5.update(data)
+        self.sha256.update(data)
+        self._f.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        self._f.flush()
+
 
 class BackupManager:
-    def __init__(self):
+    def __init__(self, read_bytes_per_second: Optional[int] = None):
         self.backup_dir = "backups"
         self.db_backup_dir = os.path.join(self.backup_dir, "database")
         self.files_backup_dir = os.path.join(self.backup_dir, "files")
         self.manifest_file = os.path.join(self.backup_dir, "backup_manifest.json")
+        # Incremental file backups: content-addressed blobs plus per-run snapshot indexes
+        self.object_store_dir = os.path.join(self.files_backup_dir, "objects")
+        self.snapshot_dir = os.path.join(self.files_backup_dir, "snapshots")
+        self.file_index_file = os.path.join(self.files_backup_dir, "file_index.json")
+        # Shared by incremental runs, exclusive for garbage collection
+        self.object_lock_file = os.path.join(self.files_backup_dir, ".objects.lock")
+        # Every backup read goes through this, so throttling and throughput
+        # accounting cover hashing, archiving and blob copies alike
+        self.io_limiter = IORateLimiter(read_bytes_per_second)
         self._setup_directories()
         self._setup_logging()
+        # Indexed catalog of every backup; replaces the JSON manifest, which is imported once
+        catalog_file = os.path.join(self.backup_dir, "backup_catalog.db")
+        new_catalog = not os.path.exists(catalog_file)
+        self.catalog = BackupCatalog(catalog_file, legacy_manifest=self.manifest_file)
+        if new_catalog:
+            # The old manifest only listed the last few backups of each type;
+            # adopt the rest so retention can expire them too
+            self.adopt_untracked_backups()
 
     def _setup_directories(self):
         """Create necessary backup directories if they don't exist"""
         os.makedirs(self.db_backup_dir, exist_ok=True)
         os.makedirs(self.files_backup_dir, exist_ok=True)
+        os.makedirs(self.object_store_dir, exist_ok=True)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
 
     def _setup_logging(self):
         """Configure logging for backup operations"""
@@ -36,34 +145,56 @@ class BackupManager:
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         return f"{prefix}_{timestamp}"
 
-    def backup_database(self) -> Tuple[bool, str]:
-        """Create a backup of the PostgreSQL database"""
+    def backup_database(self, dump_format: str = 'directory', jobs: Optional[int] = None) -> Tuple[bool, str]:
+        """Create a backup of the PostgreSQL database
+
+        dump_format='directory' runs pg_dump --format=directory with `jobs`
+        parallel workers (one table per worker) and compressed table data;
+        dump_format='plain' writes the single-threaded .sql dump used before.
+        """
         try:
-            backup_file = os.path.join(
-                self.db_backup_dir,
-                f"{self._get_backup_filename('db')}.sql"
-            )
-            
+            if dump_format not in ('directory', 'plain'):
+                return False, f"Unsupported dump format: {dump_format}"
+
             # Use environment variables for database connection
             db_url = os.environ.get('DATABASE_URL')
             if not db_url:
                 return False, "DATABASE_URL environment variable not found"
 
+            if dump_format == 'directory':
+                # pg_dump creates the directory itself and refuses an existing one
+                backup_file = os.path.join(self.db_backup_dir, self._get_backup_filename('db'))
+                command = [
+                    'pg_dump',
+                    '--format=directory',
+                    f'--jobs={jobs or DB_DUMP_JOBS}',
+                    f'--compress={DB_DUMP_COMPRESSION}',
+                    '-f', backup_file,
+                    db_url
+                ]
+            else:
+                backup_file = os.path.join(
+                    self.db_backup_dir,
+                    f"{self._get_backup_filename('db')}.sql"
+                )
+                command = ['pg_dump', db_url, '-f', backup_file]
+
             # Execute pg_dump using subprocess
             result = subprocess.run(
-                ['pg_dump', db_url, '-f', backup_file],
+                command,
                 capture_output=True,
                 text=True
             )
 
             if result.returncode != 0:
+                if os.path.isdir(backup_file):
+                    shutil.rmtree(backup_file, ignore_errors=True)
                 return False, f"Database backup failed: {result.stderr}"
 
-            # Calculate checksum for verification
-            with open(backup_file, 'rb') as f:
-                checksum = hashlib.md5(f.read()).hexdigest()
+            # Calculate checksums for verification
+            checksum, sha256 = self._backup_checksums(backup_file)
 
-            self._update_manifest('database', backup_file, checksum)
+            self._record_backup('database', backup_file, checksum, sha256)
             logging.info(f"Database backup created successfully: {backup_file}")
             return True, backup_file
 
@@ -72,8 +203,14 @@ class BackupManager:
             logging.error(error_msg)
             return False, error_msg
 
-    def backup_files(self) -> Tuple[bool, str]:
-        """Backup user-uploaded files and images"""
+    def backup_files(self, incremental: bool = False) -> Tuple[bool, str]:
+        """Backup user-uploaded files and images
+
+        With incremental=True only new or changed files are stored (see
+        backup_files_incremental) and the returned path is a snapshot index.
+        """
+        if incremental:
+            return self.backup_files_incremental()
         try:
             backup_file = os.path.join(
                 self.files_backup_dir,
@@ -81,96 +218,360 @@ class BackupManager:
             )
 
             # Directories to backup
-            dirs_to_backup = ['user_images', 'wardrobe', 'merged_outfits']
-            
-            # Create a temporary directory for organizing files
-            temp_dir = os.path.join(self.files_backup_dir, 'temp')
-            os.makedirs(temp_dir, exist_ok=True)
+            dirs_to_backup = FILE_BACKUP_DIRS
+
+            # Stream source files straight into the archive, hashing the
+            # archive bytes as they are written
+            try:
+                with open(backup_file, 'wb') as raw:
+                    writer = _HashingWriter(raw)
+                    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                        for dir_name in dirs_to_backup:
+                            if not os.path.exists(dir_name):
+                                continue
+                            for root, _, files in os.walk(dir_name):
+                                for name in sorted(files):
+                                    path = os.path.join(root, name)
+                                    info = zipfile.ZipInfo.from_file(path, Path(path).as_posix())
+                                    info.compress_type = zipfile.ZIP_DEFLATED
+                                    with open(path, 'rb') as source, archive.open(info, 'w') as target:
+                                        for block in self._read_blocks(source):
+                                            target.write(block)
+            except Exception:
+                if os.path.exists(backup_file):
+                    os.remove(backup_file)
+                raise
+
+            checksum, sha256 = writer.md5.hexdigest(), writer.sha256.hexdigest()
+            self._record_backup('files', backup_file, checksum, sha256)
+            logging.info(f"Files backup created successfully: {backup_file}")
+            return True, backup_file
 
+        except Exception as e:
+            error_msg = f"Files backup failed: {str(e)}"
+            logging.error(error_msg)
+            return False, error_msg
+
+    def _object_path(self, digest: str) -> str:
+        """Location of a blob in the content-addressed store"""
+        return os.path.join(self.object_store_dir, digest[:2], digest)
+
+    def _read_blocks(self, f):
+        """Yield fixed-size blocks from an open file, throttled by the I/O rate limiter"""
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            self.io_limiter.consume(len(block))
+            yield block
+
+    def _file_checksums(self, path: str) -> Tuple[str, str]:
+        """(MD5, SHA-256) of a file computed in fixed-size blocks"""
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in self._read_blocks(f):
+                md5.update(block)
+                sha256.update(block)
+        return md5.hexdigest(), sha256.hexdigest()
+
+    def _directory_checksums(self, path: str) -> Tuple[str, str]:
+        """(MD5, SHA-256) over every file in a directory dump, in sorted path order"""
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                rel_path = os.path.relpath(file_path, path).encode('utf-8')
+                md5.update(rel_path)
+                sha256.update(rel_path)
+                with open(file_path, 'rb') as f:
+                    for block in self._read_blocks(f):
+                        md5.update(block)
+                        sha256.update(block)
+        return md5.hexdigest(), sha256.hexdigest()
+
+    def _backup_checksums(self, path: str) -> Tuple[str, str]:
+        """Checksums of a backup, which is a single file or a directory-format dump"""
+        if os.path.isdir(path):
+            return self._directory_checksums(path)
+        return self._file_checksums(path)
+
+    def _hash_file(self, path: str) -> str:
+        """SHA-256 of a file, read block by block"""
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in self._read_blocks(f):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def _load_file_index(self) -> dict:
+        """Load the path -> (size, mtime, hash) index from the previous incremental run"""
+        if os.path.exists(self.file_index_file):
+            with open(self.file_index_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _write_json_atomic(self, path: str, data: dict):
+        """Write JSON through a temp file so readers never see a partial file"""
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _object_store_lock(self, exclusive: bool):
+        """Hold the object store lock across processes, e.g. the daemon and manage.py
+
+        Incremental runs take it shared so they can overlap each other;
+        garbage collection takes it exclusively, so it never sees blobs
+        whose snapshot has not been cataloged yet.
+        """
+        with open(self.object_lock_file, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
             try:
-                # Copy directories to temp location
-                for dir_name in dirs_to_backup:
-                    if os.path.exists(dir_name):
-                        shutil.copytree(
-                            dir_name,
-                            os.path.join(temp_dir, dir_name),
-                            dirs_exist_ok=True
-                        )
-
-                # Create zip archive
-                shutil.make_archive(
-                    backup_file[:-4],  # Remove .zip extension
-                    'zip',
-                    temp_dir
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _store_object(self, source_path: str, digest: str) -> bool:
+        """Copy a file into the object store unless its content is already there"""
+        object_path = self._object_path(digest)
+        if os.path.exists(object_path):
+            return False
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(source_path, 'rb') as source, open(tmp_path, 'wb') as target:
+                for block in self._read_blocks(source):
+                    target.write(block)
+            os.replace(tmp_path, object_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return True
+
+    def backup_files_incremental(self) -> Tuple[bool, str]:
+        """Back up only new or changed files into a content-addressed store
+
+        Files whose size and mtime match the previous run reuse their recorded
+        hash without being read; changed files are hashed and stored once per
+        distinct content. Each run writes a small snapshot index mapping
+        relative paths to blob hashes.
+        """
+        try:
+            with self._object_store_lock(exclusive=False):
+                previous_index = self._load_file_index()
+                file_index = {}
+                snapshot_files = {}
+                stats = {'files': 0, 'hashed': 0, 'stored': 0, 'stored_bytes': 0, 'total_bytes': 0}
+
+                for dir_name in FILE_BACKUP_DIRS:
+                    if not os.path.exists(dir_name):
+                        continue
+                    for root, _, files in os.walk(dir_name):
+                        for name in files:
+                            path = os.path.join(root, name)
+                            rel_path = Path(path).as_posix()
+                            stat = os.stat(path)
+
+                            previous = previous_index.get(rel_path)
+                            if (previous and previous['size'] == stat.st_size
+                                    and previous['mtime_ns'] == stat.st_mtime_ns
+                                    and os.path.exists(self._object_path(previous['hash']))):
+                                digest = previous['hash']
+                            else:
+                                digest = self._hash_file(path)
+                                stats['hashed'] += 1
+                                if self._store_object(path, digest):
+                                    stats['stored'] += 1
+                                    stats['stored_bytes'] += stat.st_size
+
+                            file_index[rel_path] = {
+                                'size': stat.st_size,
+                                'mtime_ns': stat.st_mtime_ns,
+                                'hash': digest
+                            }
+                            snapshot_files[rel_path] = {'hash': digest, 'size': stat.st_size}
+                            stats['files'] += 1
+                            stats['total_bytes'] += stat.st_size
+
+                snapshot_file = os.path.join(
+                    self.snapshot_dir,
+                    # Suffix keeps runs within the same second from overwriting each other
+                    f"{self._get_backup_filename('files')}_{uuid.uuid4().hex[:8]}.json"
                 )
+                self._write_json_atomic(snapshot_file, {
+                    'timestamp': datetime.datetime.now().isoformat(),
+                    'directories': FILE_BACKUP_DIRS,
+                    'files': snapshot_files,
+                    'stats': stats
+                })
+                # Only advance the index once the snapshot referencing its blobs exists
+                self._write_json_atomic(self.file_index_file, file_index)
+
+                # Calculate checksums of the snapshot index for verify_backup
+                checksum, sha256 = self._file_checksums(snapshot_file)
+
+                self._record_backup('files_incremental', snapshot_file, checksum, sha256)
+                logging.info(
+                    f"Incremental files backup created: {snapshot_file} "
+                    f"({stats['files']} files, {stats['stored']} new blobs, {stats['stored_bytes']} bytes stored)"
+                )
+                return True, snapshot_file
+
+        except Exception as e:
+            error_msg = f"Incremental files backup failed: {str(e)}"
+            logging.error(error_msg)
+            return False, error_msg
 
-                # Calculate checksum
-                with open(backup_file, 'rb') as f:
-                    checksum = hashlib.md5(f.read()).hexdigest()
+    def restore_snapshot(self, snapshot_file: str) -> Tuple[bool, str]:
+        """Restore backed-up directories from an incremental snapshot index"""
+        try:
+            verified, msg = self.verify_backup('files_incremental', snapshot_file)
+            if not verified:
+                return False, f"Backup verification failed: {msg}"
 
-                self._update_manifest('files', backup_file, checksum)
-                logging.info(f"Files backup created successfully: {backup_file}")
-                return True, backup_file
+            with open(snapshot_file, 'r') as f:
+                snapshot = json.load(f)
 
+            missing = [
+                rel_path for rel_path, entry in snapshot['files'].items()
+                if not os.path.exists(self._object_path(entry['hash']))
+            ]
+            if missing:
+                return False, f"Snapshot is missing {len(missing)} blobs, e.g. {missing[0]}"
+
+            # Stage the whole tree first so a failure leaves the live directories untouched
+            temp_dir = os.path.join(self.files_backup_dir, 'temp_restore')
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            try:
+                for rel_path, entry in snapshot['files'].items():
+                    target = os.path.join(temp_dir, rel_path)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(self._object_path(entry['hash']), target)
+
+                for dir_name in snapshot.get('directories', FILE_BACKUP_DIRS):
+                    source_dir = os.path.join(temp_dir, dir_name)
+                    if os.path.exists(source_dir):
+                        if os.path.exists(dir_name):
+                            shutil.rmtree(dir_name)
+                        shutil.move(source_dir, dir_name)
             finally:
-                # Clean up temp directory
                 shutil.rmtree(temp_dir, ignore_errors=True)
 
+            # Restored files have new mtimes; force the next run to rehash them
+            if os.path.exists(self.file_index_file):
+                os.remove(self.file_index_file)
+
+            logging.info(f"Files restored successfully from snapshot {snapshot_file}")
+            return True, "Files restored successfully"
+
         except Exception as e:
-            error_msg = f"Files backup failed: {str(e)}"
+            error_msg = f"Snapshot restore failed: {str(e)}"
             logging.error(error_msg)
             return False, error_msg
 
-    def _update_manifest(self, backup_type: str, filepath: str, checksum: str):
-        """Update the backup manifest file"""
-        manifest = self._load_manifest()
-        
-        backup_entry = {
-            'filepath': filepath,
-            'timestamp': datetime.datetime.now().isoformat(),
-            'checksum': checksum,
-            'type': backup_type
-        }
-
-        if backup_type not in manifest:
-            manifest[backup_type] = []
-        
-        manifest[backup_type].append(backup_entry)
-        
-        # Keep only last 5 backups in manifest
-        manifest[backup_type] = manifest[backup_type][-5:]
-
-        with open(self.manifest_file, 'w') as f:
-            json.dump(manifest, f, indent=2)
-
-    def _load_manifest(self) -> dict:
-        """Load the backup manifest file"""
-        if os.path.exists(self.manifest_file):
-            with open(self.manifest_file, 'r') as f:
-                return json.load(f)
-        return {}
+    def _collect_garbage(self) -> int:
+        """Delete blobs no longer referenced by any cataloged snapshot
+
+        Runs under the exclusive object store lock, so incremental backups
+        in flight finish and catalog their snapshot before the referenced
+        set is read. Temp files are never touched.
+        """
+        with self._object_store_lock(exclusive=True):
+            referenced = set()
+            for entry in self.catalog.find('files_incremental'):
+                if os.path.exists(entry['filepath']):
+                    with open(entry['filepath'], 'r') as f:
+                        referenced.update(item['hash'] for item in json.load(f)['files'].values())
+
+            removed = 0
+            for root, _, files in os.walk(self.object_store_dir):
+                for name in files:
+                    if name.endswith('.tmp') or name in referenced:
+                        continue
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+    def _record_backup(self, backup_type: str, filepath: str, checksum: str, sha256: Optional[str] = None,
+                       created_at: Optional[datetime.datetime] = None):
+        """Add a finished backup to the catalog
+
+        checksum is the MD5 kept for older tooling; sha256 is preferred by
+        verify_backup when present.
+        """
+        if os.path.isdir(filepath):
+            size_bytes = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, files in os.walk(filepath) for name in files
+            )
+        else:
+            size_bytes = os.path.getsize(filepath)
+        self.catalog.add(backup_type, filepath, checksum, sha256, size_bytes, created_at)
+
+    def _untracked_backups(self) -> List[Tuple[str, str]]:
+        """(type, path) of backups on disk that the catalog has no entry for"""
+        found = []
+        for name in sorted(os.listdir(self.db_backup_dir)):
+            if name.startswith('db_') and not name.endswith('.tmp'):
+                found.append(('database', os.path.join(self.db_backup_dir, name)))
+        for name in sorted(os.listdir(self.files_backup_dir)):
+            if name.startswith('files_') and name.endswith('.zip'):
+                found.append(('files', os.path.join(self.files_backup_dir, name)))
+        for name in sorted(os.listdir(self.snapshot_dir)):
+            if name.startswith('files_') and name.endswith('.json'):
+                found.append(('files_incremental', os.path.join(self.snapshot_dir, name)))
+        return [(backup_type, path) for backup_type, path in found if self.catalog.get(path) is None]
+
+    def adopt_untracked_backups(self) -> Tuple[bool, str]:
+        """Catalog backups on disk that the catalog does not know about
+
+        Runs automatically when the catalog is first created, since the legacy
+        manifest only listed the newest few backups per type; without an
+        entry, retention would never expire the older ones. The creation time
+        comes from the timestamp in the backup's name, else its mtime.
+        """
+        try:
+            adopted = 0
+            for backup_type, path in self._untracked_backups():
+                match = BACKUP_TIMESTAMP_PATTERN.search(os.path.basename(path))
+                if match:
+                    created_at = datetime.datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+                else:
+                    created_at = datetime.datetime.fromtimestamp(os.path.getmtime(path))
+                checksum, sha256 = self._backup_checksums(path)
+                self._record_backup(backup_type, path, checksum, sha256, created_at)
+                adopted += 1
+
+            logging.info(f"Adopted {adopted} untracked backups into the catalog")
+            return True, f"Adopted {adopted} untracked backups"
+
+        except Exception as e:
+            error_msg = f"Adopting untracked backups failed: {str(e)}"
+            logging.error(error_msg)
+            return False, error_msg
 
     def verify_backup(self, backup_type: str, backup_file: str) -> Tuple[bool, str]:
         """Verify the integrity of a backup file"""
         try:
-            manifest = self._load_manifest()
-            
-            # Find backup entry in manifest
-            backup_entry = None
-            for entry in manifest.get(backup_type, []):
-                if entry['filepath'] == backup_file:
-                    backup_entry = entry
-                    break
-
+            # Indexed lookup by path in the catalog
+            backup_entry = self.catalog.get(backup_file, backup_type)
             if not backup_entry:
-                return False, "Backup not found in manifest"
-
-            # Calculate current checksum
-            with open(backup_file, 'rb') as f:
-                current_checksum = hashlib.md5(f.read()).hexdigest()
-
-            # Compare with stored checksum
-            if current_checksum != backup_entry['checksum']:
+                return False, "Backup not found in catalog"
+            if not os.path.exists(backup_file):
+                return False, "Backup file is missing"
+
+            # Calculate current checksums with chunked reads
+            current_md5, current_sha256 = self._backup_checksums(backup_file)
+
+            # Compare with stored checksum, preferring SHA-256 for newer entries
+            if 'sha256' in backup_entry:
+                matches = current_sha256 == backup_entry['sha256']
+            else:
+                matches = current_md5 == backup_entry['checksum']
+            if not matches:
                 return False, "Backup file integrity check failed"
 
             return True, "Backup verified successfully"
@@ -180,8 +581,12 @@ class BackupManager:
             logging.error(error_msg)
             return False, error_msg
 
-    def restore_database(self, backup_file: str) -> Tuple[bool, str]:
-        """Restore database from backup"""
+    def restore_database(self, backup_file: str, jobs: Optional[int] = None) -> Tuple[bool, str]:
+        """Restore database from backup
+
+        Directory-format dumps are restored by pg_restore with `jobs` parallel
+        workers; plain .sql dumps are replayed through psql.
+        """
         try:
             # Verify backup first
             verified, msg = self.verify_backup('database', backup_file)
@@ -192,9 +597,23 @@ class BackupManager:
             if not db_url:
                 return False, "DATABASE_URL environment variable not found"
 
-            # Execute psql to restore
+            if os.path.isdir(backup_file):
+                # Drop and recreate dumped objects so the restore can target a live database
+                command = [
+                    'pg_restore',
+                    f'--jobs={jobs or DB_DUMP_JOBS}',
+                    '--clean',
+                    '--if-exists',
+                    '--no-owner',
+                    '-d', db_url,
+                    backup_file
+                ]
+            else:
+                # Execute psql to restore
+                command = ['psql', db_url, '-f', backup_file]
+
             result = subprocess.run(
-                ['psql', db_url, '-f', backup_file],
+                command,
                 capture_output=True,
                 text=True
             )
@@ -212,6 +631,8 @@ class BackupManager:
 
     def restore_files(self, backup_file: str) -> Tuple[bool, str]:
         """Restore files from backup"""
+        if backup_file.endswith('.json'):
+            return self.restore_snapshot(backup_file)
         try:
             # Verify backup first
             verified, msg = self.verify_backup('files', backup_file)
@@ -248,34 +669,232 @@ class BackupManager:
             logging.error(error_msg)
             return False, error_msg
 
-    def list_backups(self) -> dict:
-        """List all available backups"""
-        return self._load_manifest()
+    @staticmethod
+    def _normalize_member(path: str) -> Optional[str]:
+        """Normalize a relative path, rejecting anything outside the backed-up directories"""
+        normalized = Path(os.path.normpath(path)).as_posix()
+        if normalized.startswith(('../', '/')) or normalized == '..':
+            return None
+        if normalized.split('/', 1)[0] not in FILE_BACKUP_DIRS:
+            return None
+        return normalized
+
+    def _resolve_restore_paths(self, user_ids: Optional[Iterable[int]],
+                               item_ids: Optional[Iterable[int]]) -> List[str]:
+        """Image paths belonging to users' saved outfits (and their items) or to specific items"""
+        from data_manager import get_db_connection
+
+        paths = []
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            try:
+                if item_ids:
+                    cur.execute(
+                        "SELECT image_path FROM user_clothing_items WHERE id = ANY(%s)",
+                        ([int(i) for i in item_ids],)
+                    )
+                    paths.extend(row[0] for row in cur.fetchall())
+                if user_ids:
+                    user_ids = [int(u) for u in user_ids]
+                    cur.execute(
+                        "SELECT image_path FROM saved_outfits WHERE user_id = ANY(%s)",
+                        (user_ids,)
+                    )
+                    paths.extend(row[0] for row in cur.fetchall())
+                    cur.execute("""
+                        SELECT DISTINCT i.image_path
+                        FROM saved_outfits so
+                        JOIN user_clothing_items i ON i.id = ANY(so.item_ids)
+                        WHERE so.user_id = ANY(%s)
+                    """, (user_ids,))
+                    paths.extend(row[0] for row in cur.fetchall())
+            finally:
+                cur.close()
+        return [path for path in paths if path]
+
+    def _crc32_file(self, path: str) -> int:
+        crc = 0
+        with open(path, 'rb') as f:
+            for block in self._read_blocks(f):
+                crc = zlib.crc32(block, crc)
+        return crc
+
+    @staticmethod
+    def _write_atomic(target: str, source):
+        """Copy a readable stream to target through a temp file in the same directory"""
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as out:
+                shutil.copyfileobj(source, out, HASH_BLOCK_SIZE)
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def restore_files_selective(self, backup_file: str, paths: Optional[Iterable[str]] = None,
+                                user_ids: Optional[Iterable[int]] = None,
+                                item_ids: Optional[Iterable[int]] = None,
+                                max_workers: int = RESTORE_WORKERS) -> Tuple[bool, str]:
+        """Restore only the requested files from a zip backup or incremental snapshot
+
+        Targets are relative paths (a directory selects everything under it),
+        the images of specific users' saved outfits and their items, or
+        specific item IDs; with no targets everything is restored. Only
+        matching members are read, they are written in parallel, and files
+        whose current contents already match the backup are left alone.
+        Nothing outside the selected files is deleted or rewritten.
+        """
+        try:
+            backup_type = 'files_incremental' if backup_file.endswith('.json') else 'files'
+            verified, msg = self.verify_backup(backup_type, backup_file)
+            if not verified:
+                return False, f"Backup verification failed: {msg}"
+
+            targets = list(paths or [])
+            if user_ids or item_ids:
+                targets.extend(self._resolve_restore_paths(user_ids, item_ids))
+                if not targets:
+                    return True, "No files found for the requested users or items"
+            selectors = {self._normalize_member(target) for target in targets}
+            selectors.discard(None)
+            if targets and not selectors:
+                return False, "No valid restore paths requested"
+
+            def selected(member: str) -> bool:
+                return not selectors or any(
+                    member == selector or member.startswith(selector.rstrip('/') + '/')
+                    for selector in selectors
+                )
+
+            # Pick the members to restore plus how to check and write each one
+            open_archives = []
+            if backup_type == 'files_incremental':
+                with open(backup_file, 'r') as f:
+                    snapshot = json.load(f)
+                members = {
+                    member: entry for member, entry in snapshot['files'].items()
+                    if self._normalize_member(member) == member and selected(member)
+                }
+
+                def is_current(member: str) -> bool:
+                    entry = members[member]
+                    return (os.path.isfile(member) and os.path.getsize(member) == entry['size']
+                            and self._hash_file(member) == entry['hash'])
+
+                def restore_member(member: str):
+                    with open(self._object_path(members[member]['hash']), 'rb') as source:
+                        self._write_atomic(member, source)
+            else:
+                with zipfile.ZipFile(backup_file) as archive:
+                    members = {
+                        info.filename: info for info in archive.infolist()
+                        if not info.is_dir()
+                        and self._normalize_member(info.filename) == info.filename
+                        and selected(info.filename)
+                    }
+                # ZipFile handles are not shared across threads
+                local = threading.local()
+
+                def is_current(member: str) -> bool:
+                    info = members[member]
+                    return (os.path.isfile(member) and os.path.getsize(member) == info.file_size
+                            and self._crc32_file(member) == info.CRC)
+
+                def restore_member(member: str):
+                    if not hasattr(local, 'archive'):
+                        local.archive = zipfile.ZipFile(backup_file)
+                        open_archives.append(local.archive)
+                    with local.archive.open(members[member]) as source:
+                        self._write_atomic(member, source)
+
+            def process(member: str) -> str:
+                if is_current(member):
+                    return 'skipped'
+                restore_member(member)
+                return 'restored'
+
+            counts = {'restored': 0, 'skipped': 0, 'failed': 0}
+            failures = []
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {member: executor.submit(process, member) for member in members}
+                    for member, future in futures.items():
+                        try:
+                            counts[future.result()] += 1
+                        except Exception as e:
+                            counts['failed'] += 1
+                            failures.append(f"{member}: {str(e)}")
+            finally:
+                for archive in open_archives:
+                    archive.close()
+
+            # Restored files have new mtimes; the next incremental run rehashes them
+            if counts['restored'] and os.path.exists(self.file_index_file):
+                os.remove(self.file_index_file)
+
+            summary = f"Restored {counts['restored']} files, skipped {counts['skipped']} unchanged"
+            if failures:
+                summary += f", {counts['failed']} failed"
+            if failures:
+                logging.error(f"Selective restore from {backup_file} had failures: {'; '.join(failures[:5])}")
+                return False, summary
+            logging.info(f"Selective restore from {backup_file}: {summary}")
+            return True, summary
+
+        except Exception as e:
+            error_msg = f"Selective restore failed: {str(e)}"
+            logging.error(error_msg)
+            return False, error_msg
 
-    def cleanup_old_backups(self, days_to_keep: int = 30) -> Tuple[bool, str]:
-        """Remove backups older than specified days"""
+    def list_backups(self, backup_type: Optional[str] = None,
+                     since: Optional[datetime.datetime] = None,
+                     until: Optional[datetime.datetime] = None) -> dict:
+        """List backups grouped by type, optionally filtered by type and time window"""
+        backups = {}
+        for entry in self.catalog.find(backup_type, since, until):
+            backups.setdefault(entry['type'], []).append(entry)
+        return backups
+
+    def _remove_backup_path(self, filepath: str):
+        if os.path.isdir(filepath):
+            # Directory-format database dump
+            shutil.rmtree(filepath)
+        elif os.path.exists(filepath):
+            os.remove(filepath)
+
+    def cleanup_old_backups(self, days_to_keep: int = 7, weeks_to_keep: int = 4,
+                            months_to_keep: int = 12) -> Tuple[bool, str]:
+        """Expire backups using grandfather-father-son retention
+
+        Per backup type, the newest backup of each of the last `days_to_keep`
+        days, `weeks_to_keep` weeks and `months_to_keep` months is kept, as
+        is the newest backup overall. Only expired catalog entries are
+        deleted; files the catalog does not know about are never touched.
+        """
         try:
-            manifest = self._load_manifest()
-            cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days_to_keep)
-            
-            for backup_type in manifest:
-                manifest[backup_type] = [
-                    entry for entry in manifest[backup_type]
-                    if datetime.datetime.fromisoformat(entry['timestamp']) > cutoff_date
-                ]
-                
-                # Remove files not in manifest
-                backup_dir = self.db_backup_dir if backup_type == 'database' else self.files_backup_dir
-                for file in os.listdir(backup_dir):
-                    file_path = os.path.join(backup_dir, file)
-                    if not any(entry['filepath'] == file_path for entry in manifest[backup_type]):
-                        os.remove(file_path)
-
-            # Update manifest
-            with open(self.manifest_file, 'w') as f:
-                json.dump(manifest, f, indent=2)
-
-            return True, f"Cleaned up backups older than {days_to_keep} days"
+            expired = []
+            for backup_type in self.catalog.types():
+                _, expire = self.catalog.plan_retention(
+                    backup_type, days_to_keep, weeks_to_keep, months_to_keep
+                )
+                expired.extend(expire)
+
+            # Drop the entries first so a crash can only leave an orphaned file,
+            # never a catalog entry pointing at a deleted backup
+            self.catalog.remove(entry['filepath'] for entry in expired)
+            for entry in expired:
+                try:
+                    self._remove_backup_path(entry['filepath'])
+                except OSError as e:
+                    logging.error(f"Failed to delete expired backup {entry['filepath']}: {str(e)}")
+
+            # Drop blobs that no retained snapshot references
+            self._collect_garbage()
+
+            logging.info(f"Expired {len(expired)} backups")
+            return True, (f"Removed {len(expired)} backups outside the {days_to_keep} daily / "
+                          f"{weeks_to_keep} weekly / {months_to_keep} monthly retention")
 
         except Exception as e:
             error_msg = f"Backup cleanup failed: {str(e)}"
@@ -0,0 +1,220 @@
+import os
+import re
+import time
+import shutil
+import signal
+import logging
+import datetime
+import subprocess
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from backup_manager import BackupManager
+
+# Defaults for the backup daemon; each is overridable on the command line
+DATABASE_SCHEDULE = os.environ.get('BACKUP_DATABASE_SCHEDULE', '0 3 * * *')
+FILES_SCHEDULE = os.environ.get('BACKUP_FILES_SCHEDULE', '0 * * * *')
+CLEANUP_SCHEDULE = os.environ.get('BACKUP_CLEANUP_SCHEDULE', '30 4 * * *')
+# Read cap for backup I/O in MB/s; 0 disables throttling
+BACKUP_IO_RATE_MB = float(os.environ.get('BACKUP_IO_RATE_MB', 20))
+BACKUP_NICE = int(os.environ.get('BACKUP_NICE', 10))
+
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+}
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """Expand one cron field (*, a, a-b, */n, a-b/n, comma lists) into its values"""
+    values = set()
+    for part in field.split(','):
+        range_part, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if range_part == '*':
+            start, end = low, high
+        elif '-' in range_part:
+            start, end = (int(v) for v in range_part.split('-', 1))
+        else:
+            start = int(range_part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Cron field '{field}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week)
+
+    Also accepts the @hourly/@daily/@weekly/@monthly/@yearly aliases and
+    fixed intervals such as '@every 30m'. Day-of-week uses 0 or 7 for Sunday;
+    when both day fields are restricted a day matching either one runs,
+    as in cron.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        self.interval: Optional[datetime.timedelta] = None
+
+        every = re.fullmatch(r'@every\s+(\d+)([smhd])', self.expression)
+        if every:
+            seconds = int(every.group(1)) * INTERVAL_UNITS[every.group(2)]
+            if seconds <= 0:
+                raise ValueError(f"Interval must be positive: {expression}")
+            self.interval = datetime.timedelta(seconds=seconds)
+            return
+
+        fields = CRON_ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected 5 cron fields, got {len(fields)}: {expression}")
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {day % 7 for day in _parse_cron_field(fields[4], 0, 7)}
+        # As in cron, a day field starting with '*' (e.g. */2) counts as
+        # unrestricted when deciding whether to OR the two day fields
+        self._any_day = fields[2].startswith('*')
+        self._any_weekday = fields[4].startswith('*')
+
+    def _day_matches(self, moment: datetime.datetime) -> bool:
+        in_days = moment.day in self.days
+        # Python counts Monday as 0, cron counts Sunday as 0
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, moment: datetime.datetime) -> datetime.datetime:
+        """First time strictly after moment that the schedule fires"""
+        if self.interval is not None:
+            return moment + self.interval
+
+        candidate = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        # Skip whole months, days and hours at a time; any valid expression
+        # matches within a few years, so this bound only trips on e.g. Feb 31
+        limit = candidate + datetime.timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.year * 12 + candidate.month, 12)
+                candidate = candidate.replace(year=year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + datetime.timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += datetime.timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+
+def lower_process_priority(nice: int = BACKUP_NICE, idle_io: bool = True) -> List[str]:
+    """Drop this process's CPU and disk priority; children such as pg_dump inherit both"""
+    applied = []
+    if nice and hasattr(os, 'nice'):
+        try:
+            os.nice(nice)
+            applied.append(f"nice +{nice}")
+        except OSError as e:
+            logging.warning(f"Could not lower CPU priority: {str(e)}")
+    if idle_io and shutil.which('ionice'):
+        # Idle class: the process only gets disk time nobody else wants
+        result = subprocess.run(
+            ['ionice', '-c', '3', '-p', str(os.getpid())],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode == 0:
+            applied.append("ionice idle")
+        else:
+            logging.warning(f"Could not lower I/O priority: {result.stderr.strip()}")
+    return applied
+
+
+class BackupScheduler:
+    """Long-running loop that runs backup jobs on cron schedules
+
+    Jobs run one at a time in the calling thread, so a slow database dump
+    never overlaps a file backup. A job that is still running when its next
+    slot comes around skips the missed slots instead of running back to back.
+    Each run's duration, bytes read and throughput are recorded in the
+    backup catalog.
+    """
+
+    def __init__(self, manager: 'BackupManager'):
+        self.manager = manager
+        self.jobs: Dict[str, Tuple[CronSchedule, Callable[[], Tuple[bool, str]]]] = {}
+        self.next_runs: Dict[str, datetime.datetime] = {}
+        self._stop = threading.Event()
+
+    def add_job(self, name: str, schedule: str, action: Callable[[], Tuple[bool, str]]):
+        cron = CronSchedule(schedule)
+        self.jobs[name] = (cron, action)
+        self.next_runs[name] = cron.next_after(datetime.datetime.now())
+
+    def stop(self, *_):
+        """Finish the current job and exit; usable as a signal handler"""
+        self._stop.set()
+
+    def run_job(self, name: str) -> Tuple[bool, str]:
+        """Run one job now and record its metrics"""
+        _, action = self.jobs[name]
+        limiter = self.manager.io_limiter
+        bytes_before = limiter.bytes_read
+        started_at = datetime.datetime.now()
+        start = time.monotonic()
+        try:
+            success, message = action()
+        except Exception as e:
+            success, message = False, f"{name} failed: {str(e)}"
+        duration = time.monotonic() - start
+        bytes_read = limiter.bytes_read - bytes_before
+
+        backup_bytes = None
+        if success:
+            entry = self.manager.catalog.get(message)
+            backup_bytes = entry['size_bytes'] if entry else None
+
+        self.manager.catalog.record_run(name, started_at, duration, bytes_read,
+                                        backup_bytes, success, message)
+        rate = bytes_read / duration / (1024 * 1024) if duration > 0 else 0.0
+        log = logging.info if success else logging.error
+        log(f"Backup job {name} {'succeeded' if success else 'failed'} in {duration:.1f}s "
+            f"({bytes_read} bytes read, {rate:.2f} MB/s): {message}")
+        return success, message
+
+    def run_pending(self, now: Optional[datetime.datetime] = None) -> List[str]:
+        """Run every job whose next slot has passed, in schedule order"""
+        now = now or datetime.datetime.now()
+        due = sorted((when, name) for name, when in self.next_runs.items() if when <= now)
+        for _, name in due:
+            if self._stop.is_set():
+                break
+            self.run_job(name)
+            cron, _ = self.jobs[name]
+            self.next_runs[name] = cron.next_after(datetime.datetime.now())
+        return [name for _, name in due]
+
+    def run_forever(self):
+        """Sleep until the next due job, run it, repeat until stop() is called"""
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.stop)
+        for name, when in sorted(self.next_runs.items(), key=lambda item: item[1]):
+            logging.info(f"Backup job {name} scheduled ({self.jobs[name][0].expression}), next run {when}")
+
+        while not self._stop.is_set():
+            self.run_pending()
+            if not self.next_runs:
+                break
+            delay = (min(self.next_runs.values()) - datetime.datetime.now()).total_seconds()
+            # Wake at least once a minute so clock changes are picked up
+            self._stop.wait(min(max(delay, 0), 60))
+        logging.info("Backup scheduler stopped")
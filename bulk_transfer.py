@@ -0,0 +1,300 @@
+import os
+import io
+import csv
+import logging
+import threading
+from typing import Tuple, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from data_manager import (get_db_connection, sync_seasonal_scores, notify_catalog_change,
+                          rebuild_inbox_counts, _rebuild_profiles)
+from style_assistant import SEASON_SCORE_COLUMNS
+
+# Rows per streamed Parquet batch / COPY chunk
+CHUNK_ROWS = 50000
+# Bytes per read from the COPY stream
+READ_BLOCK_SIZE = 1 << 20
+
+# Exportable tables with their column layout. Array and timestamp columns are
+# kept in their PostgreSQL text form so CSV and Parquet round-trip through COPY.
+TABLE_SCHEMAS: Dict[str, pa.Schema] = {
+    'user_clothing_items': pa.schema([
+        ('id', pa.int32()),
+        ('type', pa.string()),
+        ('color', pa.string()),
+        ('style', pa.string()),
+        ('gender', pa.string()),
+        ('size', pa.string()),
+        ('image_path', pa.string()),
+        ('hyperlink', pa.string()),
+        ('tags', pa.string()),
+        ('season', pa.string()),
+        ('notes', pa.string()),
+        ('price', pa.string()),
+        ('created_at', pa.string()),
+    ] + [(column, pa.int16()) for column in SEASON_SCORE_COLUMNS.values()]),
+    'saved_outfits': pa.schema([
+        ('id', pa.int32()),
+        ('outfit_id', pa.string()),
+        ('user_id', pa.int32()),
+        ('image_path', pa.string()),
+        ('tags', pa.string()),
+        ('season', pa.string()),
+        ('notes', pa.string()),
+        ('created_at', pa.string()),
+        ('item_ids', pa.string()),
+        ('preference_delta', pa.string()),
+    ]),
+    'item_price_history': pa.schema([
+        ('id', pa.int32()),
+        ('item_id', pa.int32()),
+        ('price', pa.string()),
+        ('created_at', pa.string()),
+    ]),
+    'item_color_history': pa.schema([
+        ('id', pa.int32()),
+        ('item_id', pa.int32()),
+        ('old_color', pa.string()),
+        ('new_color', pa.string()),
+        ('changed_at', pa.string()),
+    ]),
+}
+
+SUPPORTED_FORMATS = ('csv', 'parquet')
+
+
+def _copy_out_sql(table: str) -> str:
+    """Build the COPY ... TO STDOUT statement for a table"""
+    columns = ', '.join(TABLE_SCHEMAS[table].names)
+    return f"COPY (SELECT {columns} FROM {table} ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+
+def _copy_in_sql(table: str, columns: List[str]) -> str:
+    """Build the COPY ... FROM STDIN statement for a table"""
+    return f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, HEADER true)"
+
+
+def _import_columns(table: str, source_path: str, fmt: str) -> List[str]:
+    """Known columns present in an import file, so exports made before a column existed still load"""
+    if fmt == 'csv':
+        with open(source_path, 'r', newline='') as f:
+            header = next(csv.reader(f), [])
+    else:
+        header = pq.ParquetFile(source_path).schema_arrow.names
+    known = TABLE_SCHEMAS[table].names
+    unknown = [column for column in header if column not in known]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table}: {', '.join(unknown)}")
+    if 'id' not in header:
+        raise ValueError(f"Import file for {table} has no id column")
+    return header
+
+
+def _validate(table: str, fmt: str):
+    """Reject unknown tables and formats before touching the database"""
+    if table not in TABLE_SCHEMAS:
+        raise ValueError(f"Unsupported table: {table}")
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _export_parquet(cur, table: str, dest_path: str) -> int:
+    """Stream COPY output through a pipe into a Parquet writer batch by batch"""
+    schema = TABLE_SCHEMAS[table]
+    read_fd, write_fd = os.pipe()
+    copy_error = []
+
+    def _produce():
+        with os.fdopen(write_fd, 'wb') as writer:
+            try:
+                cur.copy_expert(_copy_out_sql(table), writer, size=READ_BLOCK_SIZE)
+            except Exception as e:
+                copy_error.append(e)
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+
+    rows = 0
+    with os.fdopen(read_fd, 'rb') as reader:
+        try:
+            stream = pa_csv.open_csv(
+                reader,
+                read_options=pa_csv.ReadOptions(block_size=READ_BLOCK_SIZE),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=schema,
+                    strings_can_be_null=True,
+                    quoted_strings_can_be_null=False
+                )
+            )
+            with pq.ParquetWriter(dest_path, schema) as parquet_writer:
+                for batch in stream:
+                    parquet_writer.write_batch(batch.select(schema.names))
+                    rows += batch.num_rows
+        finally:
+            # Drain the pipe so the producer can never block on a full buffer
+            while reader.read(READ_BLOCK_SIZE):
+                pass
+            producer.join()
+
+    if copy_error:
+        raise copy_error[0]
+    return rows
+
+
+def export_table(table: str, dest_path: str, fmt: str = 'csv') -> Tuple[bool, str]:
+    """Stream a table to CSV or Parquet using COPY ... TO STDOUT"""
+    try:
+        _validate(table, fmt)
+        os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            try:
+                if fmt == 'csv':
+                    with open(dest_path, 'wb') as f:
+                        cur.copy_expert(_copy_out_sql(table), f, size=READ_BLOCK_SIZE)
+                    rows = max(cur.rowcount, 0)
+                else:
+                    rows = _export_parquet(cur, table, dest_path)
+            finally:
+                cur.close()
+
+        logging.info(f"Exported {rows} rows from {table} to {dest_path}")
+        return True, f"Exported {rows} rows from {table}"
+
+    except Exception as e:
+        error_msg = f"Export of {table} failed: {str(e)}"
+        logging.error(error_msg)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        return False, error_msg
+
+
+def _load_table(cur, table: str, source_path: str, fmt: str) -> int:
+    """COPY one file into a table on an open cursor; the caller owns the transaction"""
+    columns = _import_columns(table, source_path, fmt)
+    rows = 0
+    if fmt == 'csv':
+        # COPY maps fields by position, so the file's header order is used as-is
+        with open(source_path, 'rb') as f:
+            cur.copy_expert(_copy_in_sql(table, columns), f, size=READ_BLOCK_SIZE)
+        rows = max(cur.rowcount, 0)
+    else:
+        # Each Parquet batch is re-encoded as CSV and sent as its own
+        # COPY chunk inside the same transaction
+        parquet_file = pq.ParquetFile(source_path)
+        for batch in parquet_file.iter_batches(batch_size=CHUNK_ROWS, columns=columns):
+            buffer = io.BytesIO()
+            pa_csv.write_csv(batch, buffer)
+            buffer.seek(0)
+            cur.copy_expert(_copy_in_sql(table, columns), buffer, size=READ_BLOCK_SIZE)
+            rows += batch.num_rows
+
+    # Keep SERIAL sequences ahead of imported ids
+    cur.execute(f"""
+        SELECT setval(pg_get_serial_sequence('{table}', 'id'),
+                      COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)
+    """)
+    return rows
+
+
+def _after_import(tables: List[str]):
+    """Refresh derived state that COPY bypasses"""
+    if 'user_clothing_items' in tables:
+        # Score the imported items, then have in-process caches rebuild
+        sync_seasonal_scores()
+        notify_catalog_change('reload', [])
+
+
+def _import_tables(sources: Dict[str, str], fmt: str, truncate: bool) -> Dict[str, int]:
+    """Load several tables in one transaction, parents first; returns rows per table"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            if truncate:
+                # One statement, so FK-linked tables empty together; CASCADE also
+                # clears dependents that are not being imported (e.g. shared_outfits)
+                cur.execute(f"TRUNCATE {', '.join(sources)} CASCADE")
+            rows = {}
+            for table in [t for t in TABLE_SCHEMAS if t in sources]:
+                rows[table] = _load_table(cur, table, sources[table], fmt)
+            if 'saved_outfits' in sources:
+                # The cascade empties shared_outfits without firing its unread
+                # trigger, and COPY skips the per-save profile increments
+                rebuild_inbox_counts(cur)
+                _rebuild_profiles(cur)
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+def import_table(table: str, source_path: str, fmt: str = 'csv', truncate: bool = False) -> Tuple[bool, str]:
+    """Stream a CSV or Parquet file into a table using COPY ... FROM STDIN
+
+    With truncate=True the table is emptied with TRUNCATE ... CASCADE, which
+    also empties tables referencing it (history and share rows); use
+    import_all to reload parents and children together. Importing
+    saved_outfits recounts unread shares and rebuilds preference profiles
+    in the same transaction.
+    """
+    try:
+        _validate(table, fmt)
+        if not os.path.exists(source_path):
+            return False, f"Import file not found: {source_path}"
+
+        rows = _import_tables({table: source_path}, fmt, truncate)[table]
+        _after_import([table])
+
+        logging.info(f"Imported {rows} rows into {table} from {source_path}")
+        return True, f"Imported {rows} rows into {table}"
+
+    except Exception as e:
+        error_msg = f"Import into {table} failed: {str(e)}"
+        logging.error(error_msg)
+        return False, error_msg
+
+
+def export_all(dest_dir: str, fmt: str = 'csv', tables: Optional[List[str]] = None) -> Dict[str, Tuple[bool, str]]:
+    """Export every wardrobe and outfit table into a directory"""
+    results = {}
+    for table in tables or list(TABLE_SCHEMAS):
+        dest_path = os.path.join(dest_dir, f"{table}.{fmt}")
+        results[table] = export_table(table, dest_path, fmt)
+    return results
+
+
+def import_all(source_dir: str, fmt: str = 'csv', tables: Optional[List[str]] = None,
+               truncate: bool = False) -> Dict[str, Tuple[bool, str]]:
+    """Import every wardrobe and outfit table found in a directory
+
+    All tables load in a single transaction, parents first, so either the
+    whole set is imported or nothing changes.
+    """
+    sources = {}
+    for table in tables or list(TABLE_SCHEMAS):
+        source_path = os.path.join(source_dir, f"{table}.{fmt}")
+        if os.path.exists(source_path):
+            sources[table] = source_path
+    if not sources:
+        return {}
+
+    try:
+        for table in sources:
+            _validate(table, fmt)
+        rows = _import_tables(sources, fmt, truncate)
+        _after_import(list(sources))
+    except Exception as e:
+        error_msg = f"Import failed, no tables were changed: {str(e)}"
+        logging.error(error_msg)
+        return {table: (False, error_msg) for table in sources}
+
+    for table, count in rows.items():
+        logging.info(f"Imported {count} rows into {table} from {sources[table]}")
+    return {table: (True, f"Imported {count} rows into {table}") for table, count in rows.items()}
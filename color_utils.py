@@ -1,6 +1,5 @@
 from PIL import Image
 import numpy as np
-from sklearn.cluster import KMeans
 import os
 import streamlit as st
 import colorsys
@@ -176,6 +175,8 @@ def get_pants_colors(image_path):
             return None
             
         # Use K-means to find the dominant color from all regions
+        # sklearn is imported lazily; it dominates this module's import time
+        from sklearn.cluster import KMeans
         colors_array = np.array(colors)
         kmeans = KMeans(n_clusters=1, random_state=42)
         kmeans.fit(colors_array)
@@ -230,6 +231,7 @@ def get_color_palette(image_path, n_colors=1, item_type=None):
             pixels = np.array(img)
             pixels = pixels.reshape(-1, 3)
             
+            from sklearn.cluster import KMeans
             kmeans = KMeans(n_clusters=n_colors, random_state=42)
             kmeans.fit(pixels)
             colors = kmeans.cluster_centers_
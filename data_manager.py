@@ -4,53 +4,62 @@ import pandas as pd
 import os
 from PIL import Image
 import uuid
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MultiLabelBinarizer, StandardScaler
-from sklearn.decomposition import TruncatedSVD
-from scipy.sparse import csr_matrix
-from sklearn.neighbors import NearestNeighbors
 import logging
 import random
+import threading
 from datetime import datetime, timedelta
-import joblib
 import psycopg2
 from psycopg2.pool import SimpleConnectionPool
-from psycopg2.extras import execute_values, execute_batch
+from psycopg2.extras import execute_values, execute_batch, Json
 from contextlib import contextmanager
 import time
 from functools import wraps
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
 from concurrent.futures import ThreadPoolExecutor
+from style_assistant import SEASON_SCORE_COLUMNS, seasonal_scores_for, trends_fingerprint
 
 # Initialize connection pool
 MIN_CONNECTIONS = 1
 MAX_CONNECTIONS = 20
 POOL_TIMEOUT = 30
 STATEMENT_TIMEOUT = 30000  # 30 seconds statement timeout
+ITEMS_PAGE_SIZE = int(os.environ.get('ITEMS_PAGE_SIZE', 24))  # Default wardrobe grid page size
+SHARED_INBOX_PAGE_SIZE = int(os.environ.get('SHARED_INBOX_PAGE_SIZE', 12))  # Shared outfits per inbox page
 
 # Statement cache for prepared statements
 PREPARED_STATEMENTS = {
     'insert_item': """
         INSERT INTO user_clothing_items 
-        (type, color, style, gender, size, image_path, hyperlink, price)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        (type, color, style, gender, size, image_path, hyperlink, price,
+         spring_score, summer_score, fall_score, winter_score)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         RETURNING id
     """,
     'update_item': """
         UPDATE user_clothing_items 
-        SET color = %s, style = %s, gender = %s, size = %s, hyperlink = %s, price = %s
+        SET color = %s, style = %s, gender = %s, size = %s, hyperlink = %s, price = %s,
+            spring_score = %s, summer_score = %s, fall_score = %s, winter_score = %s
         WHERE id = %s
         RETURNING id
     """,
     'delete_item': "DELETE FROM user_clothing_items WHERE id = %s",
     'select_items': """
-        SELECT id, type, color, style, gender, size, image_path, hyperlink, tags, season, notes, price
+        SELECT id, type, color, style, gender, size, image_path, hyperlink, tags, season, notes, price,
+               spring_score, summer_score, fall_score, winter_score
         FROM user_clothing_items
         ORDER BY type, created_at DESC
     """
 }
 
+# Column order returned by the item loaders
+ITEM_COLUMNS = ['id', 'type', 'color', 'style', 'gender', 'size', 'image_path', 'hyperlink', 'tags', 'season', 'notes', 'price'] \
+    + list(SEASON_SCORE_COLUMNS.values())
+
+def _seasonal_score_values(color: str, style: str) -> Tuple[int, ...]:
+    """Seasonal scores in SEASON_SCORE_COLUMNS order for an item's color/style"""
+    scores = seasonal_scores_for(color, style)
+    return tuple(scores[season] for season in SEASON_SCORE_COLUMNS)
+
 def create_connection_pool():
     """Create and return a connection pool with optimized settings and enhanced SSL configuration"""
     try:
@@ -77,15 +86,26 @@ def create_connection_pool():
         logging.error(f"Error creating connection pool: {str(e)}")
         raise
 
-# Create the connection pool
-connection_pool = create_connection_pool()
+# Connection pool, created on first use so importing this module stays cheap
+connection_pool = None
+_pool_lock = threading.Lock()
+
+def get_connection_pool() -> SimpleConnectionPool:
+    """Return the shared pool, creating it on first use"""
+    global connection_pool
+    if connection_pool is None:
+        with _pool_lock:
+            if connection_pool is None:
+                connection_pool = create_connection_pool()
+    return connection_pool
 
 @contextmanager
 def get_db_connection():
     """Context manager for handling database connections from the pool with timeout"""
+    pool = get_connection_pool()
     conn = None
     try:
-        conn = connection_pool.getconn()
+        conn = pool.getconn()
         if conn:
             conn.set_session(autocommit=False)  # Explicit transaction control
             yield conn
@@ -101,71 +121,44 @@ def get_db_connection():
                 conn.rollback()  # Ensure no hanging transactions
             except Exception:
                 pass
-            connection_pool.putconn(conn)
+            pool.putconn(conn)
 
-def create_user_items_table():
-    """Create necessary database tables with indexes"""
-    with get_db_connection() as conn:
-        cur = conn.cursor()
+# Catalog change notification for in-process caches
+_catalog_listeners = []
+_catalog_version = 0
+
+def register_catalog_listener(callback):
+    """Register a callback(event, item_ids) fired after catalog writes commit"""
+    if callback not in _catalog_listeners:
+        _catalog_listeners.append(callback)
+
+def get_catalog_version() -> int:
+    """Return the in-process catalog version, bumped on every item write"""
+    return _catalog_version
+
+def notify_catalog_change(event: str, item_ids):
+    """Bump the catalog version and notify listeners of an add, update or delete
+
+    event 'reload' (with no item ids) means rows changed outside the normal
+    write path, e.g. a bulk import, and listeners should rebuild entirely.
+    """
+    global _catalog_version
+    if not isinstance(item_ids, (list, tuple, set)):
+        item_ids = [item_ids]
+    item_ids = [int(i) for i in item_ids]
+    _catalog_version += 1
+    for callback in list(_catalog_listeners):
         try:
-            # Create tables with proper indexes
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS user_clothing_items (
-                    id SERIAL PRIMARY KEY,
-                    type VARCHAR(50),
-                    color VARCHAR(50),
-                    style VARCHAR(255),
-                    gender VARCHAR(50),
-                    size VARCHAR(50),
-                    image_path VARCHAR(255),
-                    hyperlink VARCHAR(255),
-                    tags TEXT[],
-                    season VARCHAR(10),
-                    notes TEXT,
-                    price DECIMAL(10, 2),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Add indexes for frequently queried columns
-            cur.execute('CREATE INDEX IF NOT EXISTS idx_type ON user_clothing_items(type)')
-            cur.execute('CREATE INDEX IF NOT EXISTS idx_style ON user_clothing_items(style)')
-            cur.execute('CREATE INDEX IF NOT EXISTS idx_tags ON user_clothing_items USING gin(tags)')
-            
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS saved_outfits (
-                    id SERIAL PRIMARY KEY,
-                    outfit_id VARCHAR(50),
-                    user_id INTEGER,
-                    image_path VARCHAR(255),
-                    tags TEXT[],
-                    season VARCHAR(10),
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            ''')
-            
-            # Add indexes for saved_outfits
-            cur.execute('CREATE INDEX IF NOT EXISTS idx_outfit_id ON saved_outfits(outfit_id)')
-            cur.execute('CREATE INDEX IF NOT EXISTS idx_outfit_tags ON saved_outfits USING gin(tags)')
-            
-            cur.execute('''
-                CREATE TABLE IF NOT EXISTS cleanup_settings (
-                    id SERIAL PRIMARY KEY,
-                    max_age_hours INT,
-                    cleanup_interval_hours INT,
-                    batch_size INT,
-                    max_workers INT,
-                    last_cleanup TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            conn.commit()
-        finally:
-            cur.close()
+            callback(event, item_ids)
+        except Exception as e:
+            logging.error(f"Catalog listener failed for {event}: {str(e)}")
+
+def create_user_items_table():
+    """Create necessary database tables with indexes by applying pending migrations"""
+    from migrations import run_migrations
+    success, message = run_migrations()
+    if not success:
+        raise RuntimeError(message)
 
 def retry_on_error(max_retries=3, delay=1):
     """Decorator for retrying database operations with exponential backoff and enhanced error handling"""
@@ -217,19 +210,187 @@ def load_clothing_items():
     with get_db_connection() as conn:
         cur = conn.cursor()
         try:
-            cur.execute("""
-                SELECT id, type, color, style, gender, size, image_path, hyperlink, tags, season, notes, price
-                FROM user_clothing_items
-                ORDER BY type, created_at DESC
-            """)
+            cur.execute(PREPARED_STATEMENTS['select_items'])
             user_items = cur.fetchall()
             
-            columns = ['id', 'type', 'color', 'style', 'gender', 'size', 'image_path', 'hyperlink', 'tags', 'season', 'notes', 'price']
+            columns = ITEM_COLUMNS
             items_df = pd.DataFrame.from_records(user_items, columns=columns)
             return items_df
         finally:
             cur.close()
 
+@retry_on_error()
+def load_clothing_items_by_ids(item_ids: List[int]) -> pd.DataFrame:
+    """Load a subset of clothing items by id in a single query"""
+    columns = ITEM_COLUMNS
+    if not item_ids:
+        return pd.DataFrame(columns=columns)
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(f"""
+                SELECT {', '.join(columns)}
+                FROM user_clothing_items
+                WHERE id = ANY(%s)
+            """, ([int(i) for i in item_ids],))
+            return pd.DataFrame.from_records(cur.fetchall(), columns=columns)
+        finally:
+            cur.close()
+
+def _refresh_seasonal_scores(cur, only_missing: bool) -> List[int]:
+    """Recompute stored seasonal scores in one batched UPDATE, returning touched ids"""
+    where = f"WHERE {' OR '.join(f'{c} IS NULL' for c in SEASON_SCORE_COLUMNS.values())}" if only_missing else ""
+    cur.execute(f"SELECT id, color, style FROM user_clothing_items {where}")
+    rows = [(item_id, *_seasonal_score_values(color, style)) for item_id, color, style in cur.fetchall()]
+    if rows:
+        assignments = ', '.join(f"{c} = v.{c}" for c in SEASON_SCORE_COLUMNS.values())
+        execute_values(cur, f"""
+            UPDATE user_clothing_items AS i
+            SET {assignments}
+            FROM (VALUES %s) AS v (id, {', '.join(SEASON_SCORE_COLUMNS.values())})
+            WHERE i.id = v.id
+        """, rows, page_size=1000)
+    return [row[0] for row in rows]
+
+@retry_on_error()
+def sync_seasonal_scores(force: bool = False) -> Tuple[bool, str]:
+    """Bring stored seasonal scores in line with the current SEASONAL_TRENDS table
+
+    Every item is rescored when the trend fingerprint has changed (or force is
+    set); otherwise only items with missing scores, e.g. from bulk imports.
+    """
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            fingerprint = trends_fingerprint()
+            cur.execute("SELECT fingerprint FROM seasonal_trend_state FOR UPDATE")
+            result = cur.fetchone()
+            trends_changed = force or not result or result[0] != fingerprint
+
+            item_ids = _refresh_seasonal_scores(cur, only_missing=not trends_changed)
+            if trends_changed:
+                cur.execute("""
+                    INSERT INTO seasonal_trend_state (id, fingerprint)
+                    VALUES (TRUE, %s)
+                    ON CONFLICT (id) DO UPDATE
+                    SET fingerprint = EXCLUDED.fingerprint, updated_at = CURRENT_TIMESTAMP
+                """, (fingerprint,))
+            conn.commit()
+            if item_ids:
+                notify_catalog_change('update', item_ids)
+            return True, f"Rescored {len(item_ids)} items"
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Error syncing seasonal scores: {str(e)}")
+            return False, f"Seasonal score sync failed: {str(e)}"
+        finally:
+            cur.close()
+
+@retry_on_error()
+def load_clothing_items_page(item_type: Optional[str] = None, after: Optional[Tuple[Optional[str], int]] = None,
+                             limit: int = ITEMS_PAGE_SIZE) -> Tuple[pd.DataFrame, Optional[Tuple[Optional[str], int]]]:
+    """Load one keyset-paginated page of items, ordered by type then newest first
+
+    ``after`` is the (type, id) cursor returned with the previous page. The
+    returned cursor is None when there are no further items. Items without
+    a type come last, as ORDER BY type puts NULLs last.
+    """
+    # Every branch is a range on idx_items_type_id (type, id DESC), so a page
+    # starts at the cursor instead of scanning the index from the beginning;
+    # one extra row is fetched to learn whether another page exists
+    select = f"SELECT {', '.join(ITEM_COLUMNS)} FROM user_clothing_items"
+    wanted = int(limit) + 1
+
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            if item_type:
+                if after is None:
+                    cur.execute(f"{select} WHERE type = %s ORDER BY id DESC LIMIT %s", (item_type, wanted))
+                else:
+                    cur.execute(f"{select} WHERE type = %s AND id < %s ORDER BY id DESC LIMIT %s",
+                                (item_type, int(after[1]), wanted))
+                rows = cur.fetchall()
+            else:
+                rows = []
+                after_type = after[0] if after is not None else None
+                if after is None:
+                    cur.execute(f"{select} WHERE type IS NOT NULL ORDER BY type, id DESC LIMIT %s", (wanted,))
+                    rows = cur.fetchall()
+                elif after_type is not None:
+                    # The leading type >= bound is what makes the range sargable
+                    cur.execute(f"""
+                        {select}
+                        WHERE type >= %s AND (type > %s OR id < %s)
+                        ORDER BY type, id DESC
+                        LIMIT %s
+                    """, (after_type, after_type, int(after[1]), wanted))
+                    rows = cur.fetchall()
+
+                if len(rows) < wanted:
+                    # Typed items are exhausted; continue with the untyped ones
+                    if after is not None and after_type is None:
+                        cur.execute(f"{select} WHERE type IS NULL AND id < %s ORDER BY id DESC LIMIT %s",
+                                    (int(after[1]), wanted))
+                    else:
+                        cur.execute(f"{select} WHERE type IS NULL ORDER BY id DESC LIMIT %s",
+                                    (wanted - len(rows),))
+                    rows.extend(cur.fetchall())
+        finally:
+            cur.close()
+
+    has_more = len(rows) > limit
+    page_df = pd.DataFrame.from_records(rows[:limit], columns=ITEM_COLUMNS)
+    next_cursor = None
+    if has_more:
+        last = page_df.iloc[-1]
+        last_type = None if pd.isna(last['type']) else last['type']
+        next_cursor = (last_type, int(last['id']))
+    return page_df, next_cursor
+
+@retry_on_error()
+def get_catalog_aggregates() -> Dict:
+    """Compute wardrobe statistics (type/style/gender/color counts and price totals) in SQL"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT type, COUNT(*) FROM user_clothing_items GROUP BY type")
+            type_counts = dict(cur.fetchall())
+
+            # Comma-separated style/gender lists are exploded server-side
+            multi_value_counts = {}
+            for column in ('style', 'gender'):
+                cur.execute(f"""
+                    SELECT TRIM(value), COUNT(*)
+                    FROM user_clothing_items,
+                         unnest(string_to_array({column}, ',')) AS value
+                    WHERE TRIM(value) <> ''
+                    GROUP BY TRIM(value)
+                """)
+                multi_value_counts[column] = dict(cur.fetchall())
+
+            cur.execute("SELECT color, COUNT(*) FROM user_clothing_items GROUP BY color")
+            color_counts = dict(cur.fetchall())
+
+            cur.execute("""
+                SELECT COUNT(*), COUNT(price), COALESCE(SUM(price), 0), AVG(price)
+                FROM user_clothing_items
+            """)
+            item_count, priced_count, price_total, price_average = cur.fetchone()
+
+            return {
+                'item_count': item_count,
+                'type_counts': type_counts,
+                'style_counts': multi_value_counts['style'],
+                'gender_counts': multi_value_counts['gender'],
+                'color_counts': color_counts,
+                'priced_count': priced_count,
+                'price_total': float(price_total),
+                'price_average': float(price_average) if price_average is not None else None
+            }
+        finally:
+            cur.close()
+
 @retry_on_error()
 def add_user_clothing_item(item_type, color, styles, genders, sizes, image_file, hyperlink="", price=None):
     """Add clothing item with prepared statement and improved color detection"""
@@ -252,15 +413,18 @@ def add_user_clothing_item(item_type, color, styles, genders, sizes, image_file,
     with get_db_connection() as conn:
         cur = conn.cursor()
         try:
+            color_value = f"{color[0]},{color[1]},{color[2]}"
+            style_value = ','.join(styles)
             cur.execute(PREPARED_STATEMENTS['insert_item'], (
                 item_type, 
-                f"{color[0]},{color[1]},{color[2]}", 
-                ','.join(styles),
+                color_value, 
+                style_value,
                 ','.join(genders),
                 ','.join(sizes),
                 image_path,
                 hyperlink,
-                price
+                price,
+                *_seasonal_score_values(color_value, style_value)
             ))
             new_id = cur.fetchone()[0]
             
@@ -272,6 +436,7 @@ def add_user_clothing_item(item_type, color, styles, genders, sizes, image_file,
                 """, (new_id, price))
             
             conn.commit()
+            notify_catalog_change('add', new_id)
             return True, f"New {item_type} added successfully with ID: {new_id}"
         except Exception as e:
             conn.rollback()
@@ -376,6 +541,7 @@ def update_item_details(item_id, tags=None, season=None, notes=None):
                 
                 if cur.fetchone():
                     conn.commit()
+                    notify_catalog_change('update', params[-1])
                     return True, f"Item {item_id} updated successfully"
                 return False, f"Item {item_id} not found"
         finally:
@@ -402,18 +568,22 @@ def edit_clothing_item(item_id, color, styles, genders, sizes, hyperlink, price=
             if price is not None:
                 record_price_change(item_id, price)
             
+            new_color = f"{color[0]},{color[1]},{color[2]}"
+            style_value = ','.join(styles)
             cur.execute(PREPARED_STATEMENTS['update_item'], (
-                f"{color[0]},{color[1]},{color[2]}",
-                ','.join(styles),
+                new_color,
+                style_value,
                 ','.join(genders),
                 ','.join(sizes),
                 hyperlink,
                 price,
+                *_seasonal_score_values(new_color, style_value),
                 int(item_id) if hasattr(item_id, 'item') else item_id
             ))
             
             if cur.fetchone():
                 conn.commit()
+                notify_catalog_change('update', item_id)
                 return True, f"Item with ID {item_id} updated successfully"
             return False, f"Item with ID {item_id} not found"
         finally:
@@ -436,6 +606,7 @@ def delete_clothing_item(item_id):
                 
                 cur.execute(PREPARED_STATEMENTS['delete_item'], (item_id,))
                 conn.commit()
+                notify_catalog_change('delete', item_id)
                 return True, f"Item with ID {item_id} deleted successfully"
             
             return False, f"Item with ID {item_id} not found"
@@ -500,8 +671,9 @@ def save_outfit(outfit):
                         INSERT INTO saved_outfits 
                         (outfit_id, user_id, image_path, created_at)
                         VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
-                        RETURNING outfit_id
+                        RETURNING id
                     """, (outfit_id, user_id, outfit_path))
+                    attach_outfit_items(cur, cur.fetchone()[0], user_id, outfit)
 
                     # If outfit contains tags or season, update those as well
                     if 'tags' in outfit:
@@ -607,87 +779,214 @@ def load_saved_outfits(user_id: int = None):
             cur.close()
 
 @retry_on_error()
-def share_outfit(outfit_id: int, shared_by_user_id: int, shared_with_user_id: int) -> Tuple[bool, str]:
-    """Share an outfit with another user"""
+def share_outfit_bulk(outfit_id: int, owner_id: int, recipient_ids: List[int]) -> Tuple[bool, str, Dict[int, str]]:
+    """Share an outfit with many users in one statement
+    
+    Returns (success, message, statuses) where statuses maps each recipient
+    ID to 'shared', 'already_shared' or 'invalid_recipient' (unknown user or
+    the owner). Nothing is shared unless the owner owns the outfit.
+    """
+    recipient_ids = sorted({int(r) for r in recipient_ids})
+    if not recipient_ids:
+        return False, "No recipients selected", {}
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
-            
-            # Verify the outfit exists and belongs to the sharing user
-            cur.execute("""
-                SELECT id FROM saved_outfits 
-                WHERE id = %s AND user_id = %s
-            """, (outfit_id, shared_by_user_id))
-            
-            if not cur.fetchone():
-                return False, "Outfit not found or you don't have permission to share it"
-            
-            # Check if outfit is already shared with this user
-            cur.execute("""
-                SELECT id FROM shared_outfits 
-                WHERE outfit_id = %s 
-                AND shared_with_user_id = %s
-            """, (outfit_id, shared_with_user_id))
-            
-            if cur.fetchone():
-                return False, "Outfit already shared with this user"
-            
-            # Share the outfit
-            cur.execute("""
-                INSERT INTO shared_outfits 
-                (outfit_id, shared_by_user_id, shared_with_user_id)
-                VALUES (%s, %s, %s)
-                RETURNING id
-            """, (outfit_id, shared_by_user_id, shared_with_user_id))
-            
-            conn.commit()
-            return True, "Outfit shared successfully"
+            try:
+                # Ownership check, recipient validation and the insert run as
+                # one statement; the unique (outfit_id, shared_with_user_id)
+                # index turns duplicates into no-ops instead of errors
+                cur.execute("""
+                    WITH owned AS (
+                        SELECT id FROM saved_outfits
+                        WHERE id = %(outfit_id)s AND user_id = %(owner_id)s
+                    ),
+                    recipients AS (
+                        SELECT unnest(%(recipient_ids)s::integer[]) AS user_id
+                    ),
+                    valid AS (
+                        SELECT r.user_id FROM recipients r
+                        JOIN users u ON u.id = r.user_id
+                        WHERE r.user_id <> %(owner_id)s
+                    ),
+                    inserted AS (
+                        INSERT INTO shared_outfits (outfit_id, shared_by_user_id, shared_with_user_id)
+                        SELECT owned.id, %(owner_id)s, valid.user_id
+                        FROM owned CROSS JOIN valid
+                        ON CONFLICT (outfit_id, shared_with_user_id) DO NOTHING
+                        RETURNING shared_with_user_id
+                    )
+                    SELECT r.user_id,
+                           EXISTS (SELECT 1 FROM owned),
+                           v.user_id IS NOT NULL,
+                           i.shared_with_user_id IS NOT NULL
+                    FROM recipients r
+                    LEFT JOIN valid v ON v.user_id = r.user_id
+                    LEFT JOIN inserted i ON i.shared_with_user_id = r.user_id
+                """, {'outfit_id': outfit_id, 'owner_id': owner_id, 'recipient_ids': recipient_ids})
+                rows = cur.fetchall()
+                conn.commit()
+            finally:
+                cur.close()
+        
+        if not rows or not rows[0][1]:
+            return False, "Outfit not found or you don't have permission to share it", {}
         
+        statuses = {}
+        for recipient_id, _, valid, inserted in rows:
+            if not valid:
+                statuses[recipient_id] = 'invalid_recipient'
+            elif inserted:
+                statuses[recipient_id] = 'shared'
+            else:
+                statuses[recipient_id] = 'already_shared'
+        shared = sum(1 for status in statuses.values() if status == 'shared')
+        return True, f"Outfit shared with {shared} of {len(statuses)} users", statuses
+    
     except Exception as e:
         logging.error(f"Error sharing outfit: {str(e)}")
-        return False, f"Error sharing outfit: {str(e)}"
+        return False, f"Error sharing outfit: {str(e)}", {}
+
+def share_outfit(outfit_id: int, shared_by_user_id: int, shared_with_user_id: int) -> Tuple[bool, str]:
+    """Share an outfit with another user"""
+    success, message, statuses = share_outfit_bulk(outfit_id, shared_by_user_id, [shared_with_user_id])
+    if not success:
+        return False, message
+    status = statuses.get(int(shared_with_user_id))
+    if status == 'already_shared':
+        return False, "Outfit already shared with this user"
+    if status == 'invalid_recipient':
+        return False, "Cannot share with this user"
+    return True, "Outfit shared successfully"
 
 @retry_on_error()
-def get_shared_outfits(user_id: int) -> List[Dict]:
-    """Get outfits shared with the user"""
+def get_shared_outfits_page(user_id: int, before: Optional[Tuple[datetime, int]] = None,
+                            limit: Optional[int] = SHARED_INBOX_PAGE_SIZE) -> Tuple[List[Dict], Optional[Tuple[datetime, int]]]:
+    """Load one keyset-paginated page of outfits shared with the user, newest first
+    
+    ``before`` is the (shared_at, share id) cursor returned with the previous
+    page; the returned cursor is None when there are no older shares.
+    With limit=None every remaining share is returned.
+    """
+    conditions = ["so.shared_with_user_id = %s"]
+    params = [user_id]
+    if before is not None:
+        conditions.append("(so.shared_at, so.id) < (%s, %s)")
+        params.extend([before[0], int(before[1])])
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
-            
-            cur.execute("""
-                SELECT 
-                    so.outfit_id,
-                    so.shared_by_user_id,
-                    u.name as shared_by_name,
-                    so.shared_at,
-                    s.image_path,
-                    s.tags,
-                    s.season,
-                    s.notes
-                FROM shared_outfits so
-                JOIN users u ON so.shared_by_user_id = u.id
-                JOIN saved_outfits s ON so.outfit_id = s.id
-                WHERE so.shared_with_user_id = %s
-                ORDER BY so.shared_at DESC
-            """, (user_id,))
-            
-            shared_outfits = cur.fetchall()
-            if shared_outfits:
-                return [{
-                    'outfit_id': outfit[0],
-                    'shared_by_user_id': outfit[1],
-                    'shared_by_name': outfit[2],
-                    'shared_at': outfit[3].strftime("%Y-%m-%d %H:%M:%S"),
-                    'image_path': outfit[4],
-                    'tags': outfit[5] if outfit[5] else [],
-                    'season': outfit[6],
-                    'notes': outfit[7]
-                } for outfit in shared_outfits]
-            return []
+            try:
+                # Walks idx_shared_outfits_inbox; one extra row tells whether another page exists
+                cur.execute(f"""
+                    SELECT 
+                        so.id,
+                        so.outfit_id,
+                        so.shared_by_user_id,
+                        u.username as shared_by_name,
+                        so.shared_at,
+                        so.read_at,
+                        s.image_path,
+                        s.tags,
+                        s.season,
+                        s.notes
+                    FROM shared_outfits so
+                    JOIN users u ON so.shared_by_user_id = u.id
+                    JOIN saved_outfits s ON so.outfit_id = s.id
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY so.shared_at DESC, so.id DESC
+                    LIMIT %s
+                """, params + [int(limit) + 1 if limit is not None else None])
+                rows = cur.fetchall()
+            finally:
+                cur.close()
         
+        shared_outfits = [{
+            'share_id': outfit[0],
+            'outfit_id': outfit[1],
+            'shared_by_user_id': outfit[2],
+            'shared_by_name': outfit[3],
+            'shared_at': outfit[4].strftime("%Y-%m-%d %H:%M:%S"),
+            'unread': outfit[5] is None,
+            'image_path': outfit[6],
+            'tags': outfit[7] if outfit[7] else [],
+            'season': outfit[8],
+            'notes': outfit[9]
+        } for outfit in rows[:limit]]
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = (last[4], last[0])
+        return shared_outfits, next_cursor
+    
     except Exception as e:
         logging.error(f"Error getting shared outfits: {str(e)}")
-        return []
+        return [], None
+
+def get_shared_outfits(user_id: int) -> List[Dict]:
+    """Get every outfit shared with the user, newest first
+
+    Use get_shared_outfits_page to show the inbox a page at a time.
+    """
+    shared_outfits, _ = get_shared_outfits_page(user_id, None, limit=None)
+    return shared_outfits
+
+def rebuild_inbox_counts(cur) -> None:
+    """Recount unread shares per recipient on the caller's cursor
+
+    The trigger keeps user_inbox_counts in step row by row; TRUNCATE fires
+    no row triggers, so bulk reloads recount from scratch instead.
+    """
+    cur.execute("DELETE FROM user_inbox_counts")
+    cur.execute("""
+        INSERT INTO user_inbox_counts (user_id, unread_count)
+        SELECT shared_with_user_id, COUNT(*)
+        FROM shared_outfits
+        WHERE read_at IS NULL
+        GROUP BY shared_with_user_id
+    """)
+
+@retry_on_error()
+def get_unread_share_count(user_id: int) -> int:
+    """Unread shared outfits for a user, read from the trigger-maintained counter"""
+    try:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT unread_count FROM user_inbox_counts WHERE user_id = %s", (user_id,))
+                row = cur.fetchone()
+                return row[0] if row else 0
+            finally:
+                cur.close()
+    except Exception as e:
+        logging.error(f"Error getting unread share count: {str(e)}")
+        return 0
+
+@retry_on_error()
+def mark_shares_read(user_id: int, share_ids: Optional[List[int]] = None) -> Tuple[bool, str]:
+    """Mark the given shares (or all of the user's shares) as read"""
+    try:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            try:
+                if share_ids is None:
+                    cur.execute("""
+                        UPDATE shared_outfits SET read_at = CURRENT_TIMESTAMP
+                        WHERE shared_with_user_id = %s AND read_at IS NULL
+                    """, (user_id,))
+                else:
+                    cur.execute("""
+                        UPDATE shared_outfits SET read_at = CURRENT_TIMESTAMP
+                        WHERE shared_with_user_id = %s AND id = ANY(%s) AND read_at IS NULL
+                    """, (user_id, [int(i) for i in share_ids]))
+                updated = cur.rowcount
+                conn.commit()
+                return True, f"Marked {updated} shared outfits as read"
+            finally:
+                cur.close()
+    except Exception as e:
+        logging.error(f"Error marking shares read: {str(e)}")
+        return False, f"Error marking shares read: {str(e)}"
 
 @retry_on_error()
 def remove_shared_outfit(outfit_id: int, shared_by_user_id: int, shared_with_user_id: int) -> Tuple[bool, str]:
@@ -721,10 +1020,10 @@ def get_sharable_users(current_user_id: int) -> List[Dict]:
             cur = conn.cursor()
             
             cur.execute("""
-                SELECT id, name, email 
+                SELECT id, username, email 
                 FROM users 
                 WHERE id != %s
-                ORDER BY name
+                ORDER BY username
             """, (current_user_id,))
             
             users = cur.fetchall()
@@ -744,12 +1043,24 @@ def delete_saved_outfit(outfit_id):
     with get_db_connection() as conn:
         cur = conn.cursor()
         try:
-            cur.execute("SELECT image_path FROM saved_outfits WHERE outfit_id = %s", (outfit_id,))
+            cur.execute("""
+                SELECT image_path, user_id, preference_delta
+                FROM saved_outfits
+                WHERE outfit_id = %s
+            """, (outfit_id,))
             outfit = cur.fetchone()
             
             if outfit and outfit[0]:
-                image_path = outfit[0]
+                image_path, user_id, preference_delta = outfit
                 cur.execute("DELETE FROM saved_outfits WHERE outfit_id = %s", (outfit_id,))
+                if user_id:
+                    if preference_delta is not None:
+                        # Subtract exactly what saving added, whatever the items look like now
+                        _apply_profile_delta(cur, user_id, preference_delta['colors'],
+                                             preference_delta['styles'], -1)
+                    else:
+                        # Saved before deltas were recorded; recompute the profile instead
+                        _rebuild_profiles(cur, user_id)
                 conn.commit()
                 
                 if os.path.exists(image_path):
@@ -760,6 +1071,184 @@ def delete_saved_outfit(outfit_id):
         finally:
             cur.close()
 
+def _count_item_preferences(rows) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Tally color and style counters from (color, style) rows"""
+    colors, styles = {}, {}
+    for color, style in rows:
+        color = str(color)
+        colors[color] = colors.get(color, 0) + 1
+        for token in str(style).split(','):
+            styles[token] = styles.get(token, 0) + 1
+    return colors, styles
+
+def _outfit_preference_counts(cur, item_ids, image_path) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Color/style counts for one saved outfit's items"""
+    if item_ids is not None:
+        cur.execute("SELECT color, style FROM user_clothing_items WHERE id = ANY(%s)", (list(item_ids),))
+    else:
+        # Outfits saved before item_ids existed are matched by image path
+        cur.execute("SELECT color, style FROM user_clothing_items WHERE image_path = %s", (image_path,))
+    return _count_item_preferences(cur.fetchall())
+
+def _apply_profile_delta(cur, user_id, colors: Dict[str, int], styles: Dict[str, int], sign: int):
+    """Add (sign=1) or remove (sign=-1) an outfit's counts from a user's profile"""
+    cur.execute("""
+        INSERT INTO user_preference_profiles (user_id)
+        VALUES (%s)
+        ON CONFLICT (user_id) DO NOTHING
+    """, (user_id,))
+    cur.execute("""
+        SELECT color_preferences, style_preferences
+        FROM user_preference_profiles
+        WHERE user_id = %s
+        FOR UPDATE
+    """, (user_id,))
+    current_colors, current_styles = cur.fetchone()
+
+    def merge(current, delta):
+        merged = dict(current or {})
+        for key, count in delta.items():
+            merged[key] = merged.get(key, 0) + sign * count
+            if merged[key] <= 0:
+                del merged[key]
+        return merged
+
+    cur.execute("""
+        UPDATE user_preference_profiles
+        SET color_preferences = %s,
+            style_preferences = %s,
+            outfit_count = GREATEST(outfit_count + %s, 0),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = %s
+    """, (Json(merge(current_colors, colors)), Json(merge(current_styles, styles)), sign, user_id))
+
+def attach_outfit_items(cur, saved_outfit_pk: int, user_id: int, outfit: Dict) -> List[int]:
+    """Record which catalog items a saved outfit uses and fold them into the user's profile
+
+    Runs on the caller's cursor so the profile update commits atomically
+    with the saved_outfits insert.
+    """
+    image_paths = [
+        outfit[item_type]['image_path']
+        for item_type in ['shirt', 'pants', 'shoes']
+        if isinstance(outfit.get(item_type), dict) and outfit[item_type].get('image_path')
+    ]
+    item_ids = []
+    if image_paths:
+        cur.execute("SELECT id FROM user_clothing_items WHERE image_path = ANY(%s)", (image_paths,))
+        item_ids = [row[0] for row in cur.fetchall()]
+
+    colors, styles = _outfit_preference_counts(cur, item_ids, None)
+    # Store the exact delta so deleting the outfit later undoes precisely this
+    cur.execute(
+        "UPDATE saved_outfits SET item_ids = %s, preference_delta = %s WHERE id = %s",
+        (item_ids, Json({'colors': colors, 'styles': styles}), saved_outfit_pk)
+    )
+    if user_id:
+        _apply_profile_delta(cur, user_id, colors, styles, 1)
+    return item_ids
+
+@retry_on_error()
+def get_preference_profile(user_id: int) -> Dict:
+    """Read a user's materialized color/style preference counters"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT color_preferences, style_preferences
+                FROM user_preference_profiles
+                WHERE user_id = %s
+            """, (user_id,))
+            result = cur.fetchone()
+            if not result or not (result[0] or result[1]):
+                return {}
+            return {
+                'color_preferences': result[0] or {},
+                'style_preferences': result[1] or {}
+            }
+        finally:
+            cur.close()
+
+def _rebuild_profiles(cur, user_id: int = None) -> int:
+    """Recompute profiles from the outfits' stored deltas on the caller's cursor
+
+    Outfits saved before deltas were recorded get one backfilled from their
+    items' current values first, so later deletes subtract the same counts.
+    """
+    user_filter = "so.user_id = %s" if user_id else "so.user_id IS NOT NULL"
+    params = (user_id,) if user_id else ()
+
+    cur.execute(f"""
+        SELECT so.id, i.color, i.style
+        FROM saved_outfits so
+        LEFT JOIN user_clothing_items i
+          ON (so.item_ids IS NOT NULL AND i.id = ANY(so.item_ids))
+          OR (so.item_ids IS NULL AND i.image_path = so.image_path)
+        WHERE so.preference_delta IS NULL AND {user_filter}
+    """, params)
+    rows_by_outfit = {}
+    for outfit_pk, color, style in cur.fetchall():
+        rows = rows_by_outfit.setdefault(outfit_pk, [])
+        if color is not None:
+            rows.append((color, style))
+    if rows_by_outfit:
+        backfill = []
+        for outfit_pk, rows in rows_by_outfit.items():
+            colors, styles = _count_item_preferences(rows)
+            backfill.append((outfit_pk, Json({'colors': colors, 'styles': styles})))
+        execute_values(cur, """
+            UPDATE saved_outfits SET preference_delta = v.delta
+            FROM (VALUES %s) AS v(id, delta)
+            WHERE saved_outfits.id = v.id
+        """, backfill, template="(%s, %s::jsonb)")
+
+    cur.execute(f"""
+        SELECT so.user_id, so.preference_delta
+        FROM saved_outfits so
+        WHERE {user_filter}
+    """, params)
+    totals = {}
+    for owner_id, delta in cur.fetchall():
+        colors, styles, outfit_count = totals.setdefault(owner_id, ({}, {}, [0]))
+        outfit_count[0] += 1
+        for key, count in delta['colors'].items():
+            colors[key] = colors.get(key, 0) + count
+        for key, count in delta['styles'].items():
+            styles[key] = styles.get(key, 0) + count
+
+    if user_id:
+        cur.execute("DELETE FROM user_preference_profiles WHERE user_id = %s", (user_id,))
+    else:
+        cur.execute("DELETE FROM user_preference_profiles")
+
+    profiles = [
+        (owner_id, Json(colors), Json(styles), outfit_count[0])
+        for owner_id, (colors, styles, outfit_count) in totals.items()
+    ]
+    if profiles:
+        execute_values(cur, """
+            INSERT INTO user_preference_profiles
+            (user_id, color_preferences, style_preferences, outfit_count)
+            VALUES %s
+        """, profiles)
+    return len(profiles)
+
+@retry_on_error()
+def rebuild_preference_profiles(user_id: int = None) -> Tuple[bool, str]:
+    """Recompute preference profiles from saved outfits for one user or everyone"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            rebuilt = _rebuild_profiles(cur, user_id)
+            conn.commit()
+            return True, f"Rebuilt {rebuilt} preference profiles"
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Error rebuilding preference profiles: {str(e)}")
+            return False, f"Profile rebuild failed: {str(e)}"
+        finally:
+            cur.close()
+
 
 @retry_on_error()
 def get_cleanup_settings():
@@ -866,17 +1355,6 @@ def cleanup_orphaned_entries():
                 for item_id, item_type, path in orphaneditems:
                     logging.info(f"Orphaned {item_type} (ID: {item_id}): {path}")
                 
-                # Move orphaned entries to audit table for reference
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS orphaned_items_audit (
-                        id SERIAL PRIMARY KEY,
-                        original_id INTEGER,
-                        type VARCHAR(50),
-                        image_path VARCHAR(255),
-                        removed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
                 # Insert into audit table and mark as orphaned
                 execute_values(cur, """
                     INSERT INTO orphaned_items_audit (original_id, type, image_path)
@@ -1009,6 +1487,7 @@ def update_item_image(item_id: int, new_image_path: str) -> Tuple[bool, str]:
                 )
                 
                 conn.commit()
+                notify_catalog_change('update', item_id)
                 
                 # Delete the old image if it exists
                 if old_image_path and os.path.exists(old_image_path):
@@ -1156,17 +1635,6 @@ def cleanup_orphaned_entries():
                 for item_id, item_type, path in orphaned_items:
                     logging.info(f"Orphaned {item_type} (ID: {item_id}): {path}")
                 
-                # Move orphaned entries to audit table for reference
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS orphaned_items_audit (
-                        id SERIAL PRIMARY KEY,
-                        original_id INTEGER,
-                        type VARCHAR(50),
-                        image_path VARCHAR(255),
-                        removed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
                 # Insert into audit table and mark as orphaned
                 execute_values(cur, """
                     INSERT INTO orphaned_items_audit (original_id, type, image_path)
@@ -1315,17 +1783,6 @@ def cleanup_orphaned_entries():
                 for item_id, item_type, path in orphaned_items:
                     logging.info(f"Orphaned {item_type} (ID: {item_id}): {path}")
                 
-                # Move orphaned entries to audit table for reference
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS orphaned_items_audit (
-                        id SERIAL PRIMARY KEY,
-                        original_id INTEGER,
-                        type VARCHAR(50),
-                        image_path VARCHAR(255),
-                        removed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
                 # Insert into audit table and mark as orphaned
                 execute_values(cur, """
                     INSERT INTO orphaned_items_audit (original_id, type, image_path)
@@ -1340,6 +1797,7 @@ def cleanup_orphaned_entries():
                 """, ([item[0] for item in orphaned_items],))
                 
                 conn.commit()
+                notify_catalog_change('update', [item[0] for item in orphaned_items])
                 return True, f"Processed {len(orphaned_items)} orphaned entries"
             
             return True, "No orphaned entries found"
@@ -1394,6 +1852,7 @@ def bulk_delete_items(item_ids: List[int]) -> Tuple[bool, str, Dict]:
                         """, tuple(batch))
                         items = cur.fetchall()
 
+                        deleted_ids = []
                         for item_id, image_path in items:
                             try:
                                 # Delete the image file if it exists
@@ -1407,6 +1866,7 @@ def bulk_delete_items(item_ids: List[int]) -> Tuple[bool, str, Dict]:
                                 """, (item_id,))
 
                                 stats["deleted"] += 1
+                                deleted_ids.append(item_id)
                                 logging.info(f"Successfully deleted item {item_id}")
 
                             except Exception as e:
@@ -1416,6 +1876,8 @@ def bulk_delete_items(item_ids: List[int]) -> Tuple[bool, str, Dict]:
                                 logging.error(error_msg)
 
                         conn.commit()
+                        if deleted_ids:
+                            notify_catalog_change('delete', deleted_ids)
                     except Exception as e:
                         conn.rollback()
                         raise
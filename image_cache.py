@@ -0,0 +1,112 @@
+import os
+import io
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PIL import Image
+
+# Total encoded bytes kept in memory across full files and thumbnails
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+# Bounding box for grid/recommendation thumbnails
+THUMBNAIL_SIZE = (400, 400)
+
+
+class ImageByteCache:
+    """LRU of encoded image bytes bounded by total size, keyed by path and mtime
+
+    Keys include the file's mtime and size, so an edited or replaced image is
+    re-read on its next use and the stale entry simply ages out.
+    """
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_key(path: str) -> Optional[Tuple[str, float, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), stat.st_mtime, stat.st_size)
+
+    def _get(self, key) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def _put(self, key, data: bytes):
+        # Anything larger than the whole budget is served but never cached
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def file_bytes(self, path: str) -> Optional[bytes]:
+        """Raw file contents, e.g. for download buttons; None if the file is missing"""
+        file_key = self._file_key(path)
+        if file_key is None:
+            return None
+        key = ('file',) + file_key
+        data = self._get(key)
+        if data is None:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                # Removed or replaced between the stat and the read
+                logging.warning(f"Image {path} could not be read: {str(e)}")
+                return None
+            self._put(key, data)
+        return data
+
+    def thumbnail_bytes(self, path: str, size: Tuple[int, int] = THUMBNAIL_SIZE) -> Optional[bytes]:
+        """PNG-encoded thumbnail of an image, falling back to the raw file if it cannot be decoded"""
+        file_key = self._file_key(path)
+        if file_key is None:
+            return None
+        key = ('thumbnail', tuple(size)) + file_key
+        data = self._get(key)
+        if data is None:
+            try:
+                with Image.open(path) as img:
+                    img.thumbnail(size, Image.Resampling.LANCZOS)
+                    buffer = io.BytesIO()
+                    img.save(buffer, 'PNG', optimize=False)
+                    data = buffer.getvalue()
+            except Exception as e:
+                logging.error(f"Failed to build thumbnail for {path}: {str(e)}")
+                return self.file_bytes(path)
+            self._put(key, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+image_cache = ImageByteCache()
+
+
+def file_bytes(path: str) -> Optional[bytes]:
+    """Cached raw bytes of an image file"""
+    return image_cache.file_bytes(path)
+
+
+def thumbnail_bytes(path: str, size: Tuple[int, int] = THUMBNAIL_SIZE) -> Optional[bytes]:
+    """Cached PNG thumbnail bytes of an image file"""
+    return image_cache.thumbnail_bytes(path, size)
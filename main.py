@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 import time
 from contextlib import contextmanager
 import uuid
+import io
 
 # Initialize logging first
 logger = logging.getLogger(__name__)
@@ -16,30 +17,32 @@ logging.basicConfig(
 try:
     import streamlit as st
     import pandas as pd
-    import numpy as np
     from PIL import Image, ImageDraw, ImageFont
-    from sklearn.preprocessing import LabelEncoder
-    from sklearn.metrics.pairwise import cosine_similarity
 except ImportError as e:
     logger.error(f"Failed to import required packages: {str(e)}")
     raise
 
 # Import local modules
-from auth_utils import (init_auth_tables, init_session_state, create_user, 
+from auth_utils import (init_session_state, create_user, get_client_ip, start_session,
                        authenticate_user, logout_user, is_admin, require_admin)
 from data_manager import (
     load_clothing_items, save_outfit, load_saved_outfits,
-    edit_clothing_item, delete_clothing_item, create_user_items_table,
+    edit_clothing_item, delete_clothing_item,
     add_user_clothing_item, update_outfit_details,
     get_outfit_details, update_item_details, delete_saved_outfit,
     get_price_history, update_item_image, get_db_connection,
     share_outfit, get_shared_outfits, remove_shared_outfit, get_sharable_users,
-    bulk_delete_items
+    bulk_delete_items, attach_outfit_items, get_catalog_version,
+    sync_seasonal_scores, load_clothing_items_page, ITEMS_PAGE_SIZE,
+    get_catalog_aggregates, get_shared_outfits_page, get_unread_share_count, mark_shares_read
 )
 from color_utils import get_color_palette, display_color_palette, rgb_to_hex, parse_color_string, get_color_name
 from outfit_generator import generate_outfit, is_valid_image
-from style_assistant import get_style_recommendation, format_clothing_items
-from recommendation_engine import PersonalizedRecommender
+from style_assistant import get_style_recommendation, get_compiled_catalog
+from render_cache import RenderCache
+from migrations import run_migrations
+from text_layout import get_font, wrap_text
+from image_cache import file_bytes, thumbnail_bytes
 
 
 # Configure Streamlit page settings
@@ -50,56 +53,68 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+MANNEQUIN_TEMPLATE = 'manikin temp.png'
+mannequin_cache = RenderCache("style_recipes", "mannequin_outfit", max_entries=64)
+
 def create_mannequin_outfit_image(recommended_items, weather=None, template_size=(800, 1000)):
     """Create a visualization of the outfit using the mannequin template and clothing templates"""
     from clothing_templates import get_template_for_item, apply_color_to_template, get_item_position, parse_color_string
 
-    # Load the mannequin template
-    template = Image.open('manikin temp.png')
-
-    # Resize the template while maintaining aspect ratio
-    template.thumbnail(template_size, Image.Resampling.LANCZOS)
-
-    # Create a new image with white background
-    final_image = Image.new('RGBA', template_size, 'white')
-
-    # Calculate position to center the template
-    x_offset = (template_size[0] - template.width) // 2
-    y_offset = (template_size[1] - template.height) // 2
-
-    # Paste the mannequin template
-    final_image.paste(template, (x_offset, y_offset), template)
+    template_size = tuple(template_size)
 
     # Define layering order
     layer_order = ['pants', 'shirt', 'shoes']
 
-    # Layer clothing items in the correct order
+    # Resolve each layer to (item type, template, color) up front; this is the cache key
+    layers = []
     for layer_type in layer_order:
         for item in recommended_items:
             if item['type'] == layer_type:
                 # Get appropriate template based on item type and weather
                 template_path = get_template_for_item(item['type'], weather)
                 if template_path and os.path.exists(template_path):
-                    # Parse color and apply to template
-                    color = parse_color_string(item['color'])
-                    colored_item = apply_color_to_template(template_path, color)
+                    layers.append((item['type'], template_path, parse_color_string(item['color'])))
 
-                    # Get position for this item type
-                    pos = get_item_position(item['type'], template_size)
+    # Template mtimes make edited template artwork invalidate old renders
+    template_versions = tuple(
+        (path, os.path.getmtime(path))
+        for path in sorted({MANNEQUIN_TEMPLATE} | {layer[1] for layer in layers})
+        if os.path.exists(path)
+    )
 
-                    # Resize colored item to match template proportions
-                    colored_item.thumbnail((template_size[0] // 2, template_size[1] // 2), Image.Resampling.LANCZOS)
+    def render():
+        # Load the mannequin template
+        template = Image.open(MANNEQUIN_TEMPLATE)
 
-                    # Paste the colored item onto the final image
-                    final_image.paste(colored_item, pos, colored_item)
+        # Resize the template while maintaining aspect ratio
+        template.thumbnail(template_size, Image.Resampling.LANCZOS)
 
-    # Save the visualization
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_path = f"style_recipes/mannequin_outfit_{timestamp}.png"
-    os.makedirs("style_recipes", exist_ok=True)
+        # Create a new image with white background
+        final_image = Image.new('RGBA', template_size, 'white')
 
-    final_image.save(output_path, 'PNG')
-    return output_path
+        # Calculate position to center the template
+        x_offset = (template_size[0] - template.width) // 2
+        y_offset = (template_size[1] - template.height) // 2
+
+        # Paste the mannequin template
+        final_image.paste(template, (x_offset, y_offset), template)
+
+        # Layer clothing items in the correct order
+        for item_type, template_path, color in layers:
+            colored_item = apply_color_to_template(template_path, color)
+
+            # Get position for this item type
+            pos = get_item_position(item_type, template_size)
+
+            # Resize colored item to match template proportions
+            colored_item.thumbnail((template_size[0] // 2, template_size[1] // 2), Image.Resampling.LANCZOS)
+
+            # Paste the colored item onto the final image
+            final_image.paste(colored_item, pos, colored_item)
+
+        return final_image
+
+    return mannequin_cache.get_or_render((tuple(layers), template_size, template_versions), render)
 
 
 def create_style_recipe_image(recommendation, template_size=(1000, 1200)):
@@ -108,15 +123,10 @@ def create_style_recipe_image(recommendation, template_size=(1000, 1200)):
     image = Image.new('RGB', template_size, 'white')
     draw = ImageDraw.Draw(image)
 
-    # Try to load a nice font, fallback to default if not available
-    try:
-        title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 48)
-        heading_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36)
-        body_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-    except:
-        title_font = ImageFont.load_default()
-        heading_font = ImageFont.load_default()
-        body_font = ImageFont.load_default()
+    # Fonts are loaded once per process by the registry
+    title_font = get_font('title')
+    heading_font = get_font('heading')
+    body_font = get_font('body')
 
     # Add decorative header
     header_gradient = Image.new('RGB', (template_size[0], 100), '#ff6b6b')
@@ -160,22 +170,7 @@ def create_style_recipe_image(recommendation, template_size=(1000, 1200)):
 
         # Section content with wrapped text
         y_offset += 70
-        words = content.split()
-        lines = []
-        current_line = []
-
-        for word in words:
-            current_line.append(word)
-            text_width = draw.textlength(" ".join(current_line), font=body_font)
-            if text_width > template_size[0] - 100:
-                current_line.pop()
-                lines.append(" ".join(current_line))
-                current_line = [word]
-
-        if current_line:
-            lines.append(" ".join(current_line))
-
-        for line in lines:
+        for line in wrap_text(content, 'body', template_size[0] - 100):
             draw.text((75, y_offset), line, font=body_font, fill='black')
             y_offset += 35
 
@@ -226,13 +221,52 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+@st.cache_resource(show_spinner=False)
+def initialize_schema():
+    """Apply schema migrations and resync derived columns once per process rather than on every rerun"""
+    success, message = run_migrations()
+    if not success:
+        st.error(message)
+        st.stop()
+    # Rescore items in case SEASONAL_TRENDS changed since the last deploy
+    sync_seasonal_scores()
+    return True
+
 # Initialize authentication
-init_auth_tables()
+initialize_schema()
 init_session_state()
 
-# Initialize recommendation engine
-if 'recommender' not in st.session_state:
-    st.session_state.recommender = PersonalizedRecommender()
+# Seconds a cached catalog aggregate may outlive a change made by another process
+CATALOG_CACHE_TTL = 300
+
+@st.cache_resource
+def get_shared_recommender():
+    """One recommender per process; its feature cache follows catalog changes itself"""
+    # Imported here so scipy and the feature cache load on first use, not at startup
+    from recommendation_engine import PersonalizedRecommender
+    return PersonalizedRecommender()
+
+@st.cache_data(ttl=CATALOG_CACHE_TTL, show_spinner=False)
+def cached_catalog_aggregates(catalog_version):
+    """Wardrobe statistics shared by all sessions; catalog_version is part of the cache key"""
+    aggregates = get_catalog_aggregates()
+    # Bucket stored RGB strings by their nearest color name
+    color_name_counts = {}
+    for color, count in aggregates['color_counts'].items():
+        name = get_color_name(parse_color_string(color))
+        color_name_counts[name] = color_name_counts.get(name, 0) + count
+    aggregates['color_name_counts'] = color_name_counts
+    return aggregates
+
+def show_image(path, thumbnail=False, **kwargs) -> bool:
+    """Render an image from the byte cache, or a placeholder if the file is gone"""
+    data = thumbnail_bytes(path) if thumbnail else file_bytes(path)
+    if data is None:
+        # The file can disappear between an os.path.exists check and the read
+        st.caption("🖼️ Image not available")
+        return False
+    st.image(data, **kwargs)
+    return True
 
 # Add login/signup button to sidebar
 with st.sidebar:
@@ -241,6 +275,16 @@ with st.sidebar:
         if st.button("📤 Logout"):
             logout_user()
             st.rerun()
+        if is_admin(st.session_state.user):
+            with st.expander("🔐 Auth service"):
+                from auth_service import get_auth_service
+                auth_metrics = get_auth_service().metrics()
+                st.caption(f"{auth_metrics['in_flight']} in flight · {auth_metrics['workers']} workers · "
+                           f"{auth_metrics['rejected']} rejected · {auth_metrics['timeouts']} timed out")
+                for operation, op_stats in auth_metrics['operations'].items():
+                    st.caption(f"{operation}: {op_stats['count']} calls, "
+                               f"p50 {op_stats['hash_p50_ms']:.0f} ms, p95 {op_stats['hash_p95_ms']:.0f} ms, "
+                               f"queue p95 {op_stats['wait_p95_ms']:.0f} ms")
     else:
         if st.button("👤 Login/Signup"):
             st.session_state.show_auth = True
@@ -260,13 +304,13 @@ if not st.session_state.user and st.session_state.get('show_auth', False):
                 login_submitted = st.form_submit_button("Login")
 
                 if login_submitted:
-                    success, user_data = authenticate_user(login_email, login_password)
+                    success, user_data = authenticate_user(login_email, login_password, get_client_ip())
                     if success:
-                        st.session_state.user = user_data
+                        start_session(user_data)
                         st.session_state.show_auth = False
                         st.rerun()
                     else:
-                        st.error("Invalid email or password")
+                        st.error(user_data.get('error', "Invalid email or password"))
 
         with tab2:
             with st.form("signup_form"):
@@ -284,9 +328,9 @@ if not st.session_state.user and st.session_state.get('show_auth', False):
                         st.error("Password must be at least 8 characters long")
                     else:
                         if create_user(new_username, new_email, new_password, role):
-                            success, user_data = authenticate_user(new_email, new_password)
+                            success, user_data = authenticate_user(new_email, new_password, get_client_ip())
                             if success:
-                                st.session_state.user = user_data
+                                start_session(user_data)
                                 st.session_state.show_auth = False
                                 st.rerun()
                         else:
@@ -443,7 +487,7 @@ def main_page():
             # Display outfit image in the left column
             with outfit_col:
                 if 'merged_image_path' in outfit and outfit['merged_image_path'] and os.path.exists(outfit['merged_image_path']):
-                    st.image(outfit['merged_image_path'], use_column_width=True)
+                    show_image(outfit['merged_image_path'], use_column_width=True)
 
                 if missing_items:
                     st.warning(f"Missing items: {', '.join(missing_items)}")
@@ -620,27 +664,24 @@ def main_page():
                                     combined_text = f"{item_type} - {color_name} {hex_code}"
                                     draw.text((x1, text_y), combined_text, fill='black', font=font)
 
-                            # Save the new image with palette
-                            temp_path = f"temp_download_{filename}"
-                            new_img.save(temp_path)
+                            # Encode the image with palette in memory
+                            buffer = io.BytesIO()
+                            new_img.save(buffer, 'PNG')
 
                             # Provide download button for the modified image
-                            with open(temp_path, 'rb') as file:
-                                btn = st.download_button(
-                                    label="Download Outfit with Color Palette",
-                                    data=file,
-                                    file_name=filename,
-                                    mime="image/png"
-                                )
-
-                            # Clean up temporary file
-                            os.remove(temp_path)
+                            btn = st.download_button(
+                                label="Download Outfit with Color Palette",
+                                data=buffer.getvalue(),
+                                file_name=filename,
+                                mime="image/png"
+                            )
                     else:
                         # Fallback to original image if color extraction fails
-                        with open(outfit['merged_image_path'], 'rb') as file:
+                        original_bytes = file_bytes(outfit['merged_image_path'])
+                        if original_bytes is not None:
                             btn = st.download_button(
                                 label="Download Outfit",
-                                data=file,
+                                data=original_bytes,
                                 file_name=filename,
                                 mime="image/png"
                             )
@@ -726,12 +767,12 @@ def main_page():
 
         if generate_button:
             with st.spinner("🎨 Creating your style recipe..."):
-                # Format clothing items for recommendation
-                formatted_items = format_clothing_items(items_df)
+                # Columnar view of the catalog, reused until an item changes
+                catalog = get_compiled_catalog(items_df, get_catalog_version())
 
                 # Get rule-based recommendation
                 recommendation = get_style_recommendation(
-                    formatted_items,
+                    catalog,
                     occasion=occasion,
                     weather=weather,
                     preferences=preferences
@@ -792,17 +833,18 @@ def main_page():
                 with col1:
                     st.markdown("### 👔 OutfitVisualization")                    # Generate mannequin-based visualization using initial weather input
                     mannequinimage_path = create_mannequin_outfit_image(recommendation['recommended_items'],weather=weather.lower() if weather and not manual_selection else None)
-                    if os.path.exists(mannequinimage_path):
-                        st.image(mannequinimage_path, use_column_width=True)
+                    # None if the render is missing or vanished after it was written
+                    mannequin_bytes = file_bytes(mannequinimage_path)
+                    if mannequin_bytes is not None:
+                        st.image(mannequin_bytes, use_column_width=True)
 
                         # Add download button for the mannequin visualization
-                        with open(mannequinimage_path, 'rb') as file:
-                            st.download_button(
-                                label="📥 Download Outfit Visualization",
-                                data=file,
-                                file_name=os.path.basename(mannequinimage_path),
-                                mime="image/png"
-                            )
+                        st.download_button(
+                            label="📥 Download Outfit Visualization",
+                            data=mannequin_bytes,
+                            file_name=os.path.basename(mannequinimage_path),
+                            mime="image/png"
+                        )
                     else:
                         st.error("Failed to generate outfit visualization")
 
@@ -811,17 +853,17 @@ def main_page():
                     # Generate traditional style recipe image
                     recipe_image_path = create_style_recipe_image(recommendation)
 
-                    if os.path.exists(recipe_image_path):
-                        st.image(recipe_image_path, use_column_width=True)
+                    recipe_bytes = file_bytes(recipe_image_path)
+                    if recipe_bytes is not None:
+                        st.image(recipe_bytes, use_column_width=True)
 
                         # Add download button for the recipe image
-                        with open(recipe_image_path, 'rb') as file:
-                            st.download_button(
-                                label="📥 Download Style Recipe",
-                                data=file,
-                                file_name=f"style_recipe_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
-                                mime="image/png"
-                            )
+                        st.download_button(
+                            label="📥 Download Style Recipe",
+                            data=recipe_bytes,
+                            file_name=f"style_recipe_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
+                            mime="image/png"
+                        )
 
                     else:
                         st.error("Failed to generate style recipe image")
@@ -842,7 +884,7 @@ def main_page():
                         with col:
                             with st.container():
                                 if item.get('image_path') and os.path.exists(item['image_path']):
-                                    st.image(item['image_path'], use_column_width=True)
+                                    show_image(item['image_path'], thumbnail=True, use_column_width=True)
                                     st.markdown(f"**{item['type'].capitalize()}** ✨")
                                     st.markdown(f"Style: {item['style']} 🎯")
 
@@ -946,27 +988,24 @@ def main_page():
                                         combined_text = f"{item_type} - {color_name} {hex_code}"
                                         draw.text((x1, text_y), combined_text, fill='black', font=font)
 
-                                # Save the new image with palette
-                                temp_path = f"temp_download_{filename}"
-                                new_img.save(temp_path)
+                                # Encode the image with palette in memory
+                                buffer = io.BytesIO()
+                                new_img.save(buffer, 'PNG')
 
                                 # Provide download button for the modified image
-                                with open(temp_path, 'rb') as file:
-                                    btn = st.download_button(
-                                        label="Download Outfit with Color Palette",
-                                        data=file,
-                                        file_name=filename,
-                                        mime="image/png"
-                                    )
-
-                                # Clean up temporary file
-                                os.remove(temp_path)
+                                btn = st.download_button(
+                                    label="Download Outfit with Color Palette",
+                                    data=buffer.getvalue(),
+                                    file_name=filename,
+                                    mime="image/png"
+                                )
                         else:
                             # Fallback to original image if color extraction fails
-                            with open(outfit['merged_image_path'], 'rb') as file:
+                            original_bytes = file_bytes(outfit['merged_image_path'])
+                            if original_bytes is not None:
                                 btn = st.download_button(
                                     label="Download Outfit",
-                                    data=file,
+                                    data=original_bytes,
                                     file_name=filename,
                                     mime="image/png"
                                 )
@@ -994,7 +1033,7 @@ def main_page():
         if st.button("Get Personalized Suggestions", type="primary"):
             with st.spinner("✨ Creating personalized outfit suggestions..."):
                 # Get personalized outfit suggestion
-                outfit, missing_items = st.session_state.recommender.generate_personalized_outfit(
+                outfit, missing_items = get_shared_recommender().generate_personalized_outfit(
                     st.session_state.user['id'],
                     occasion=occasion
                 )
@@ -1005,7 +1044,7 @@ def main_page():
 
                     with col1:
                         if 'merged_image_path' in outfit:
-                            st.image(outfit['merged_image_path'], use_column_width=True)
+                            show_image(outfit['merged_image_path'], use_column_width=True)
 
                         if missing_items:
                             st.warning(f"Missing recommended items: {', '.join(missing_items)}")
@@ -1013,7 +1052,7 @@ def main_page():
                     with col2:
                         st.markdown("### Why this outfit?")
                         # Get user preferences to explain the recommendation
-                        preferences = st.session_state.recommender.get_user_preferences(st.session_state.user['id'])
+                        preferences = get_shared_recommender().get_user_preferences(st.session_state.user['id'])
 
                         if preferences:
                             if preferences.get('color_preferences'):
@@ -1046,14 +1085,14 @@ def main_page():
         if not items_df.empty:
             # Get a random item to show similar items for
             sample_item = items_df.sample(n=1).iloc[0]
-            similar_items = st.session_state.recommender.get_similar_items(sample_item.name)
+            similar_items = get_shared_recommender().get_similar_items(sample_item['id'])
 
             if similar_items:
                 cols = st.columns(len(similar_items))
                 for col, item in zip(cols, similar_items):
                     with col:
                         if item.get('image_path') and os.path.exists(item['image_path']):
-                            st.image(item['image_path'], caption=f"{item['type'].capitalize()}\n{item['style']}")
+                            show_image(item['image_path'], thumbnail=True, caption=f"{item['type'].capitalize()}\n{item['style']}")
                             st.progress(float(item['similarity']))
 
     if st.session_state.user and is_admin(st.session_state.user) and len(available_tabs) > 3:
@@ -1095,32 +1134,34 @@ def personal_wardrobe_page():
     """Display and manage personal wardrobe items"""
     st.title("My Items")
 
-    # Load existing items
-    items_df = load_clothing_items()
+    # Catalog statistics are cached across sessions until the catalog changes
+    stats = cached_catalog_aggregates(get_catalog_version())
 
     # Create tabs for List View and Statistics
     list_view, statistics = st.tabs(["List View", "📊 Statistics"])
 
     with statistics:
-        if not items_df.empty:
+        if stats['item_count']:
             st.markdown("### Items by Type")
-            # Count items by type
-            type_counts = items_df['type'].value_counts()
-            st.bar_chart(type_counts)
+            st.bar_chart(pd.Series(stats['type_counts']).sort_values(ascending=False))
 
             st.markdown("### Items by Style")
-            # Count items by style (handle multiple styles per item)
-            style_counts = pd.Series([style.strip()
-                                    for styles in items_df['style'].str.split(',')
-                                    for style in styles]).value_counts()
-            st.bar_chart(style_counts)
+            st.bar_chart(pd.Series(stats['style_counts']).sort_values(ascending=False))
 
             st.markdown("### Items by Gender")
-            # Count items by gender (handle multiple genders per item)
-            gender_counts = pd.Series([gender.strip()
-                                     for genders in items_df['gender'].str.split(',')
-                                     for gender in genders]).value_counts()
-            st.bar_chart(gender_counts)
+            st.bar_chart(pd.Series(stats['gender_counts']).sort_values(ascending=False))
+
+            st.markdown("### Items by Color")
+            st.bar_chart(pd.Series(stats['color_name_counts']).sort_values(ascending=False))
+
+            st.markdown("### Wardrobe Value")
+            value_col, average_col = st.columns(2)
+            with value_col:
+                st.metric("Total Value", f"${stats['price_total']:.2f}")
+            with average_col:
+                average = stats['price_average']
+                st.metric("Average Price", f"${average:.2f}" if average is not None else "N/A",
+                          help=f"Based on {stats['priced_count']} priced items")
         else:
             st.info("Add some items to see statistics!")
 
@@ -1200,24 +1241,19 @@ def personal_wardrobe_page():
             if os.path.exists(temp_path):
                 os.remove(temp_path)
 
-    # Load existing items
-    items_df = load_clothing_items()
+    # Add type filter
+    selected_type = st.selectbox(
+        "Filter by Type",
+        ["All", "Shirt", "Pants", "Shoes"],
+        format_func=lambda x: x if x == "All" else f"{x}s"
+    )
 
-    if not items_df.empty:
-        # Add type filter
-        selected_type = st.selectbox(
-            "Filter by Type",
-            ["All", "Shirt", "Pants", "Shoes"],
-            format_func=lambda x: x if x == "All" else f"{x}s"
-        )
+    # Load only the visible page of items
+    filter_type = selected_type.lower() if selected_type != "All" else None
+    filtered_df, pager_key, next_cursor = load_items_page("wardrobe", filter_type)
 
-        # Filter items based on selection
-        if selected_type != "All":
-            filtered_df = items_df[items_df['type'] == selected_type.lower()]
-            display_types = [selected_type.lower()]
-        else:
-            filtered_df = items_df
-            display_types = ["shirt", "pants", "shoes"]
+    if not filtered_df.empty:
+        display_types = [filter_type] if filter_type else ["shirt", "pants", "shoes"]
 
         # Display items by type
         for item_type in display_types:
@@ -1231,7 +1267,7 @@ def personal_wardrobe_page():
                     col = cols[int(idx) % 3]
                     with col:
                         if item.get('image_path') and os.path.exists(item['image_path']):
-                            st.image(item['image_path'], use_column_width=True)
+                            show_image(item['image_path'], thumbnail=True, use_column_width=True)
 
                             # Show current color
                             current_color = parse_color_string(item['color'])
@@ -1408,6 +1444,8 @@ def personal_wardrobe_page():
 
                             # Add a separator between items
                             st.markdown("---")
+
+        display_page_controls(pager_key, next_cursor)
     else:
         st.info("Your wardrobe is empty. Start by adding some items!")
 
@@ -1697,7 +1735,7 @@ def bulk_delete_page():
                     col = cols[int(idx) % 3]
                     with col:
                         if item.get('image_path') and os.path.exists(item['image_path']):
-                            st.image(item['image_path'], use_column_width=True)
+                            show_image(item['image_path'], thumbnail=True, use_column_width=True)
 
                             # Show current color
                             current_color = parse_color_string(item['color'])
@@ -2000,6 +2038,7 @@ def save_outfit(outfit, user_id):
                     RETURNING id
                 """, (outfit['merged_image_path'], datetime.now(), user_id))
                 outfit_id = cur.fetchone()[0]
+                attach_outfit_items(cur, outfit_id, user_id, outfit)
                 conn.commit()
                 return outfit['merged_image_path'], "Outfit saved successfully"
     except Exception as e:
@@ -2070,40 +2109,63 @@ def my_items_page():
             else:
                 st.error(message)
 
-    # Load all clothing items
-    items_df = load_clothing_items()
-    if items_df.empty:
-        st.info("No items found. Start by adding some clothing items!")
-        return
-
     # Dropdown for filtering items
     item_filter = st.selectbox(
         "Filter Items",
         ["All Items", "Shirts", "Pants", "Shoes"],
         key="item_filter"
     )
+    filter_types = {"All Items": None, "Shirts": "shirt", "Pants": "pants", "Shoes": "shoes"}
 
-    # Filter and display items based on selection
-    if item_filter == "All Items":
-        display_items_grid(items_df)
-    elif item_filter == "Shirts":
-        shirts_df = items_df[items_df['type'] == 'shirt']
-        if shirts_df.empty:
-            st.info("No shirts found.")
-        else:
-            display_items_grid(shirts_df)
-    elif item_filter == "Pants":
-        pants_df = items_df[items_df['type'] == 'pants']
-        if pants_df.empty:
-            st.info("No pants found.")
+    # Fetch and display only the current page of items
+    page_df, pager_key, next_cursor = load_items_page("my_items", filter_types[item_filter])
+    if page_df.empty:
+        if item_filter == "All Items":
+            st.info("No items found. Start by adding some clothing items!")
         else:
-            display_items_grid(pants_df)
-    else:  # Shoes
-        shoes_df = items_df[items_df['type'] == 'shoes']
-        if shoes_df.empty:
-            st.info("No shoes found.")
-        else:
-            display_items_grid(shoes_df)
+            st.info(f"No {item_filter.lower()} found.")
+        return
+
+    display_items_grid(page_df)
+    display_page_controls(pager_key, next_cursor)
+
+def load_items_page(grid_key, item_type=None):
+    """Fetch the current keyset page for a wardrobe grid, returning (page, pager key, next cursor)"""
+    page_size_options = sorted({12, 24, 48, 96, ITEMS_PAGE_SIZE})
+    page_size = st.selectbox(
+        "Items per page",
+        page_size_options,
+        index=page_size_options.index(ITEMS_PAGE_SIZE),
+        key=f"{grid_key}_page_size"
+    )
+
+    # Cursors of the pages visited so far; the last one is the current page
+    pager_key = f"{grid_key}_cursors_{item_type}_{page_size}"
+    if pager_key not in st.session_state:
+        st.session_state[pager_key] = [None]
+    cursors = st.session_state[pager_key]
+
+    page_df, next_cursor = load_clothing_items_page(item_type, cursors[-1], page_size)
+    if page_df.empty and len(cursors) > 1:
+        # The current page emptied out (e.g. after deletes); step back
+        cursors.pop()
+        page_df, next_cursor = load_clothing_items_page(item_type, cursors[-1], page_size)
+    return page_df, pager_key, next_cursor
+
+def display_page_controls(pager_key, next_cursor):
+    """Render previous/next buttons for a keyset-paginated grid"""
+    cursors = st.session_state[pager_key]
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("◀ Previous", key=f"{pager_key}_prev", disabled=len(cursors) <= 1):
+            cursors.pop()
+            st.rerun()
+    with page_col:
+        st.markdown(f"Page {len(cursors)}")
+    with next_col:
+        if st.button("Next ▶", key=f"{pager_key}_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
 
 def display_items_grid(items_df):
     """Display clothing items in a grid layout"""
@@ -2112,7 +2174,7 @@ def display_items_grid(items_df):
         col = cols[idx % 3]
         with col:
             if os.path.exists(item['image_path']):
-                st.image(item['image_path'], use_column_width=True)
+                show_image(item['image_path'], thumbnail=True, use_column_width=True)
 
                 # Item details
                 st.write(f"**Type:** {item['type'].capitalize()}")
@@ -2144,18 +2206,80 @@ def saved_outfits_page():
     st.title("Saved Outfits")
     # Add your saved outfits logic here
 
+def shared_with_me_page():
+    """Inbox of outfits other users shared, newest first, one keyset page at a time"""
+    st.title("Shared With Me")
+    if not st.session_state.user:
+        st.warning("Please login to see outfits shared with you")
+        return
+    user_id = st.session_state.user['id']
+
+    pager_key = f"shared_inbox_cursors_{user_id}"
+    if pager_key not in st.session_state:
+        st.session_state[pager_key] = [None]
+    cursors = st.session_state[pager_key]
+
+    shared, next_cursor = get_shared_outfits_page(user_id, cursors[-1])
+    if not shared and len(cursors) > 1:
+        cursors.pop()
+        shared, next_cursor = get_shared_outfits_page(user_id, cursors[-1])
+    if not shared:
+        st.info("Nobody has shared an outfit with you yet.")
+        return
+
+    if st.button("✔️ Mark all as read"):
+        mark_shares_read(user_id)
+        st.rerun()
+
+    cols = st.columns(3)
+    for idx, outfit in enumerate(shared):
+        with cols[idx % 3]:
+            if outfit['image_path'] and os.path.exists(outfit['image_path']):
+                show_image(outfit['image_path'], thumbnail=True, use_column_width=True)
+            badge = " 🆕" if outfit['unread'] else ""
+            st.write(f"**From:** {outfit['shared_by_name']}{badge}")
+            st.caption(f"Shared {outfit['shared_at']}")
+            if outfit['season']:
+                st.write(f"**Season:** {outfit['season']}")
+            if outfit['tags']:
+                st.write(f"**Tags:** {', '.join(outfit['tags'])}")
+
+    display_page_controls(pager_key, next_cursor)
+
+    # Shares count as read once they have been shown
+    unread_ids = [outfit['share_id'] for outfit in shared if outfit['unread']]
+    if unread_ids:
+        mark_shares_read(user_id, unread_ids)
+
 if __name__ == "__main__":
-    create_user_items_table()
     show_first_visit_tips()
 
     st.sidebar.title("Navigation")
-    page = st.sidebar.radio("Go to", ["Home", "My Items", "Saved Outfits", "Bulk Delete"])
-
-    if page == "Home":
-        main_page()
-    elif page == "My Items":
-        my_items_page()
-    elif page == "Saved Outfits":
-        saved_outfits_page()
-    elif page == "Bulk Delete":
-        bulk_delete_page()
\ No newline at end of file
+    nav_pages = ["Home", "My Items", "Saved Outfits", "Shared With Me", "Bulk Delete"]
+    # The radio is drawn into this slot after the page, so the unread badge
+    # reflects shares the page has just marked read; the keyed widget state
+    # already holds the selection when the run starts
+    nav_slot = st.sidebar.container()
+    page = st.session_state.get('nav_page', nav_pages[0])
+
+    try:
+        if page == "Home":
+            main_page()
+        elif page == "My Items":
+            my_items_page()
+        elif page == "Saved Outfits":
+            saved_outfits_page()
+        elif page == "Shared With Me":
+            shared_with_me_page()
+        elif page == "Bulk Delete":
+            bulk_delete_page()
+    finally:
+        # Primary-key lookup of the maintained counter, cheap enough for every rerun
+        unread_shares = get_unread_share_count(st.session_state.user['id']) if st.session_state.user else 0
+        with nav_slot:
+            st.radio(
+                "Go to",
+                nav_pages,
+                key='nav_page',
+                format_func=lambda name: f"{name} ({unread_shares})" if name == "Shared With Me" and unread_shares else name
+            )
\ No newline at end of file
@@ -0,0 +1,203 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+
+def migrate(args) -> bool:
+    """Apply pending schema migrations, or list them with --list"""
+    from migrations import run_migrations, pending_migrations
+    if args.list:
+        pending = pending_migrations()
+        for version, name in pending:
+            print(f"pending {version:>4}  {name}")
+        if not pending:
+            print("Schema is up to date")
+        return True
+    success, message = run_migrations()
+    print(message)
+    return success
+
+
+def rebuild_profiles(args) -> bool:
+    """Recompute materialized preference profiles from saved outfits"""
+    from data_manager import rebuild_preference_profiles
+    success, message = rebuild_preference_profiles(args.user_id)
+    print(message)
+    return success
+
+
+def refresh_seasonal_scores(args) -> bool:
+    """Recompute stored seasonal trend scores after SEASONAL_TRENDS changes"""
+    from data_manager import sync_seasonal_scores
+    success, message = sync_seasonal_scores(force=args.force)
+    print(message)
+    return success
+
+
+def purge_sessions(args) -> bool:
+    """Delete expired and revoked login sessions"""
+    from session_store import get_session_store
+    success, message = get_session_store().purge_expired()
+    print(message)
+    return success
+
+
+# Modules main.py imports at startup, profiled by default
+STARTUP_MODULES = ['auth_utils', 'data_manager', 'color_utils', 'outfit_generator',
+                   'style_assistant', 'render_cache', 'text_layout', 'image_cache']
+
+
+def profile_imports(args) -> bool:
+    """Report the slowest imports on a cold interpreter using -X importtime"""
+    modules = args.module or STARTUP_MODULES
+    code = '; '.join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "Import failed")
+        return False
+
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    total_ms = sum(self_us for _, self_us, _ in timings) / 1000
+    print(f"Cold import of {', '.join(modules)}: {total_ms:.0f} ms across {len(timings)} modules")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(timings, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    return True
+
+
+def backup_daemon(args) -> bool:
+    """Run database, file and retention jobs on cron schedules with throttled I/O"""
+    from backup_manager import BackupManager
+    from backup_scheduler import BackupScheduler, lower_process_priority
+
+    applied = lower_process_priority(args.nice, idle_io=not args.no_ionice)
+    rate = int(args.io_rate * 1024 * 1024) or None
+    manager = BackupManager(read_bytes_per_second=rate)
+    scheduler = BackupScheduler(manager)
+
+    jobs = {
+        'database': (args.database, manager.backup_database),
+        'files': (args.files, lambda: manager.backup_files(incremental=not args.full_files)),
+        'cleanup': (args.cleanup, manager.cleanup_old_backups),
+    }
+    try:
+        for name, (schedule, action) in jobs.items():
+            if schedule and schedule.lower() != 'off':
+                scheduler.add_job(name, schedule, action)
+    except ValueError as e:
+        print(f"Invalid schedule: {e}")
+        return False
+
+    throttle = f"{args.io_rate:g} MB/s" if rate else "unthrottled"
+    print(f"Backup priority: {', '.join(applied) or 'unchanged'}; reads {throttle}")
+    if args.once:
+        return all([scheduler.run_job(name)[0] for name in scheduler.jobs])
+    scheduler.run_forever()
+    return True
+
+
+def backup_runs(args) -> bool:
+    """Show duration and throughput of recent scheduled backup runs"""
+    from backup_manager import BackupManager
+    runs = BackupManager().catalog.recent_runs(args.job, args.limit)
+    if not runs:
+        print("No backup runs recorded")
+        return True
+    print(f"{'started':<20} {'job':<9} {'status':<7} {'seconds':>8} {'MB read':>9} {'MB/s':>7}")
+    for run in runs:
+        throughput = (run['throughput_bps'] or 0) / (1024 * 1024)
+        print(f"{run['started_at'][:19]:<20} {run['job']:<9} {'ok' if run['success'] else 'FAILED':<7} "
+              f"{run['duration_seconds']:>8.1f} {run['bytes_read'] / (1024 * 1024):>9.1f} {throughput:>7.2f}")
+    return True
+
+
+def adopt_backups(args) -> bool:
+    """Catalog backups found on disk but missing from the catalog, e.g. copied back in by hand"""
+    from backup_manager import BackupManager
+    success, message = BackupManager().adopt_untracked_backups()
+    print(message)
+    return success
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Outfit Wizard maintenance commands")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help="Apply pending schema migrations")
+    migrate_parser.add_argument('--list', action='store_true', help="Only list pending migrations")
+    migrate_parser.set_defaults(handler=migrate)
+
+    rebuild = subparsers.add_parser('rebuild-profiles', help="Rebuild user preference profiles")
+    rebuild.add_argument('--user-id', type=int, default=None,
+                         help="Only rebuild this user's profile")
+    rebuild.set_defaults(handler=rebuild_profiles)
+
+    seasonal = subparsers.add_parser('refresh-seasonal-scores', help="Recompute stored seasonal trend scores")
+    seasonal.add_argument('--force', action='store_true',
+                          help="Rescore every item even if the trend table is unchanged")
+    seasonal.set_defaults(handler=refresh_seasonal_scores)
+
+    sessions = subparsers.add_parser('purge-sessions', help="Delete expired and revoked login sessions")
+    sessions.set_defaults(handler=purge_sessions)
+
+    profile = subparsers.add_parser('profile-imports', help="Report cold-start import costs")
+    profile.add_argument('--module', action='append',
+                         help="Module to import (repeatable); defaults to main.py's startup modules")
+    profile.add_argument('--top', type=int, default=25, help="Number of slowest imports to list")
+    profile.set_defaults(handler=profile_imports)
+
+    from backup_scheduler import (DATABASE_SCHEDULE, FILES_SCHEDULE, CLEANUP_SCHEDULE,
+                                  BACKUP_IO_RATE_MB, BACKUP_NICE)
+    daemon = subparsers.add_parser('backup-daemon', help="Run scheduled backups in the background")
+    daemon.add_argument('--database', default=DATABASE_SCHEDULE,
+                        help="Cron schedule for database dumps, or 'off'")
+    daemon.add_argument('--files', default=FILES_SCHEDULE,
+                        help="Cron schedule for file backups, or 'off'")
+    daemon.add_argument('--cleanup', default=CLEANUP_SCHEDULE,
+                        help="Cron schedule for retention cleanup, or 'off'")
+    daemon.add_argument('--full-files', action='store_true',
+                        help="Write full zip archives instead of incremental snapshots")
+    daemon.add_argument('--io-rate', type=float, default=BACKUP_IO_RATE_MB,
+                        help="Maximum backup read rate in MB/s (0 for unlimited)")
+    daemon.add_argument('--nice', type=int, default=BACKUP_NICE,
+                        help="CPU niceness increment for the daemon and pg_dump")
+    daemon.add_argument('--no-ionice', action='store_true',
+                        help="Keep normal disk priority instead of the idle I/O class")
+    daemon.add_argument('--once', action='store_true',
+                        help="Run every enabled job immediately, then exit")
+    daemon.set_defaults(handler=backup_daemon)
+
+    runs = subparsers.add_parser('backup-runs', help="Show recent scheduled backup runs")
+    runs.add_argument('--job', choices=['database', 'files', 'cleanup'], default=None)
+    runs.add_argument('--limit', type=int, default=20)
+    runs.set_defaults(handler=backup_runs)
+
+    adopt = subparsers.add_parser('adopt-backups',
+                                  help="Catalog backup files on disk that the catalog does not list")
+    adopt.set_defaults(handler=adopt_backups)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    sys.exit(0 if args.handler(args) else 1)
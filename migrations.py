@@ -0,0 +1,287 @@
+import logging
+from typing import List, Tuple
+
+from data_manager import get_db_connection
+
+# Arbitrary key for pg_advisory_xact_lock so concurrent processes migrate one at a time
+MIGRATION_LOCK_KEY = 7261001
+
+# Ordered, append-only list of (version, name, statements). Never edit an applied
+# migration; add a new one instead. Statements use IF NOT EXISTS so databases
+# created by the old per-request DDL adopt the versioned history cleanly.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, 'baseline_schema', [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            username VARCHAR(64) UNIQUE NOT NULL,
+            email VARCHAR(120) UNIQUE NOT NULL,
+            password_hash BYTEA NOT NULL,
+            role VARCHAR(10) NOT NULL DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            full_name VARCHAR(100),
+            bio TEXT,
+            profile_picture_path VARCHAR(255),
+            preferences JSONB DEFAULT '{}',
+            last_login TIMESTAMP,
+            CHECK (role IN ('admin', 'user'))
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_clothing_items (
+            id SERIAL PRIMARY KEY,
+            type VARCHAR(50),
+            color VARCHAR(50),
+            style VARCHAR(255),
+            gender VARCHAR(50),
+            size VARCHAR(50),
+            image_path VARCHAR(255),
+            hyperlink VARCHAR(255),
+            tags TEXT[],
+            season VARCHAR(10),
+            notes TEXT,
+            price DECIMAL(10, 2),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_type ON user_clothing_items(type)",
+        "CREATE INDEX IF NOT EXISTS idx_style ON user_clothing_items(style)",
+        "CREATE INDEX IF NOT EXISTS idx_tags ON user_clothing_items USING gin(tags)",
+        """
+        CREATE TABLE IF NOT EXISTS saved_outfits (
+            id SERIAL PRIMARY KEY,
+            outfit_id VARCHAR(50),
+            user_id INTEGER,
+            image_path VARCHAR(255),
+            tags TEXT[],
+            season VARCHAR(10),
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_outfit_id ON saved_outfits(outfit_id)",
+        "CREATE INDEX IF NOT EXISTS idx_outfit_tags ON saved_outfits USING gin(tags)",
+        """
+        CREATE TABLE IF NOT EXISTS cleanup_settings (
+            id SERIAL PRIMARY KEY,
+            max_age_hours INT,
+            cleanup_interval_hours INT,
+            batch_size INT,
+            max_workers INT,
+            last_cleanup TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, 'history_sharing_and_audit_tables', [
+        """
+        CREATE TABLE IF NOT EXISTS item_price_history (
+            id SERIAL PRIMARY KEY,
+            item_id INTEGER NOT NULL REFERENCES user_clothing_items(id) ON DELETE CASCADE,
+            price DECIMAL(10, 2),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_price_history_item ON item_price_history(item_id, created_at DESC)",
+        """
+        CREATE TABLE IF NOT EXISTS item_color_history (
+            id SERIAL PRIMARY KEY,
+            item_id INTEGER NOT NULL REFERENCES user_clothing_items(id) ON DELETE CASCADE,
+            old_color VARCHAR(50),
+            new_color VARCHAR(50),
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_color_history_item ON item_color_history(item_id, changed_at DESC)",
+        """
+        CREATE TABLE IF NOT EXISTS shared_outfits (
+            id SERIAL PRIMARY KEY,
+            outfit_id INTEGER NOT NULL REFERENCES saved_outfits(id) ON DELETE CASCADE,
+            shared_by_user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            shared_with_user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            shared_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS orphaned_items_audit (
+            id SERIAL PRIMARY KEY,
+            original_id INTEGER,
+            type VARCHAR(50),
+            image_path VARCHAR(255),
+            removed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (3, 'preference_profiles', [
+        "ALTER TABLE saved_outfits ADD COLUMN IF NOT EXISTS item_ids INTEGER[]",
+        """
+        CREATE TABLE IF NOT EXISTS user_preference_profiles (
+            user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+            color_preferences JSONB NOT NULL DEFAULT '{}',
+            style_preferences JSONB NOT NULL DEFAULT '{}',
+            outfit_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (4, 'seasonal_trend_scores', [
+        "ALTER TABLE user_clothing_items ADD COLUMN IF NOT EXISTS spring_score SMALLINT",
+        "ALTER TABLE user_clothing_items ADD COLUMN IF NOT EXISTS summer_score SMALLINT",
+        "ALTER TABLE user_clothing_items ADD COLUMN IF NOT EXISTS fall_score SMALLINT",
+        "ALTER TABLE user_clothing_items ADD COLUMN IF NOT EXISTS winter_score SMALLINT",
+        """
+        CREATE TABLE IF NOT EXISTS seasonal_trend_state (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            fingerprint VARCHAR(64) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (5, 'items_keyset_index', [
+        "CREATE INDEX IF NOT EXISTS idx_items_type_id ON user_clothing_items(type, id DESC)",
+    ]),
+    (6, 'user_sessions', [
+        """
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            session_id VARCHAR(64) PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            last_seen_at TIMESTAMP,
+            revoked_at TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_user_sessions_user ON user_sessions(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions(expires_at)",
+    ]),
+    (7, 'unique_outfit_shares', [
+        # Keep the earliest share of any duplicated (outfit, recipient) pair
+        """
+        DELETE FROM shared_outfits a
+        USING shared_outfits b
+        WHERE a.outfit_id = b.outfit_id
+          AND a.shared_with_user_id = b.shared_with_user_id
+          AND a.id > b.id
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_shared_outfits_recipient ON shared_outfits(outfit_id, shared_with_user_id)",
+    ]),
+    (8, 'shared_outfit_inbox', [
+        "ALTER TABLE shared_outfits ADD COLUMN IF NOT EXISTS read_at TIMESTAMP",
+        # Keyset pagination needs a total order on (shared_at, id)
+        "UPDATE shared_outfits SET shared_at = CURRENT_TIMESTAMP WHERE shared_at IS NULL",
+        "ALTER TABLE shared_outfits ALTER COLUMN shared_at SET NOT NULL",
+        "CREATE INDEX IF NOT EXISTS idx_shared_outfits_inbox ON shared_outfits(shared_with_user_id, shared_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_shared_outfits_sender ON shared_outfits(shared_by_user_id)",
+        """
+        CREATE TABLE IF NOT EXISTS user_inbox_counts (
+            user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+            unread_count INTEGER NOT NULL DEFAULT 0 CHECK (unread_count >= 0)
+        )
+        """,
+        # Keep unread_count in step with shared_outfits so the badge is a primary-key lookup
+        """
+        CREATE OR REPLACE FUNCTION maintain_inbox_unread_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.read_at IS NULL THEN
+                UPDATE user_inbox_counts SET unread_count = unread_count - 1
+                WHERE user_id = OLD.shared_with_user_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.read_at IS NULL THEN
+                INSERT INTO user_inbox_counts (user_id, unread_count)
+                VALUES (NEW.shared_with_user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET unread_count = user_inbox_counts.unread_count + 1;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trg_shared_outfits_unread ON shared_outfits",
+        """
+        CREATE TRIGGER trg_shared_outfits_unread
+        AFTER INSERT OR DELETE OR UPDATE OF read_at, shared_with_user_id ON shared_outfits
+        FOR EACH ROW EXECUTE FUNCTION maintain_inbox_unread_count()
+        """,
+        """
+        INSERT INTO user_inbox_counts (user_id, unread_count)
+        SELECT shared_with_user_id, COUNT(*)
+        FROM shared_outfits
+        WHERE read_at IS NULL
+        GROUP BY shared_with_user_id
+        ON CONFLICT (user_id) DO UPDATE SET unread_count = excluded.unread_count
+        """,
+    ]),
+    (9, 'outfit_preference_delta', [
+        # Exact counts each outfit added to its owner's profile, subtracted on delete;
+        # NULL for older outfits until rebuild_preference_profiles backfills them
+        "ALTER TABLE saved_outfits ADD COLUMN IF NOT EXISTS preference_delta JSONB",
+    ]),
+]
+
+
+def _ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def get_applied_versions() -> List[int]:
+    """Versions recorded in schema_migrations, oldest first"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            _ensure_migrations_table(cur)
+            cur.execute("SELECT version FROM schema_migrations ORDER BY version")
+            versions = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            return versions
+        finally:
+            cur.close()
+
+
+def pending_migrations() -> List[Tuple[int, str]]:
+    """(version, name) of migrations not yet applied"""
+    applied = set(get_applied_versions())
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+def run_migrations() -> Tuple[bool, str]:
+    """Apply pending migrations in order, each in its own transaction"""
+    applied_now = []
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            for version, name, statements in MIGRATIONS:
+                # The advisory lock is held until this transaction ends, so a
+                # concurrent process waits here and then sees the row we insert
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+                _ensure_migrations_table(cur)
+                cur.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+                if cur.fetchone():
+                    conn.commit()
+                    continue
+
+                for statement in statements:
+                    cur.execute(statement)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name)
+                )
+                conn.commit()
+                applied_now.append(version)
+                logging.info(f"Applied migration {version}: {name}")
+
+            if applied_now:
+                return True, f"Applied {len(applied_now)} migrations (now at version {applied_now[-1]})"
+            return True, "Schema is up to date"
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Migration failed: {str(e)}")
+            return False, f"Migration failed: {str(e)}"
+        finally:
+            cur.close()
@@ -1,96 +1,349 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+from scipy.sparse import csr_matrix
+from typing import List, Dict, Tuple, Optional
 import logging
 from datetime import datetime
 import streamlit as st
-from data_manager import get_db_connection, load_clothing_items, load_saved_outfits
+from data_manager import (
+    load_clothing_items, load_saved_outfits,
+    load_clothing_items_by_ids, register_catalog_listener, get_preference_profile
+)
+
+# Feature layout: normalized R, G, B, then stable style and type codes
+FEATURE_COLUMNS = ['r', 'g', 'b', 'style', 'type']
+COLOR_COLUMNS = 3
+# Similarity blends color cosine with exact style/type matches. Codes are only
+# compared for equality, never as magnitudes, so their order does not matter.
+SIMILARITY_WEIGHTS = {'color': 0.5, 'style': 0.3, 'type': 0.2}
+ITEM_FIELDS = ['id', 'type', 'color', 'style', 'image_path', 'hyperlink', 'price']
+
+
+def _parse_rgb(color) -> Tuple[int, int, int]:
+    """Parse an 'r,g,b' or 'rgb(r,g,b)' string, falling back to black"""
+    try:
+        r, g, b = (int(c) for c in str(color).strip('rgb()').split(','))
+        return (r, g, b)
+    except (ValueError, TypeError):
+        return (0, 0, 0)
+
+
+class ItemFeatureCache:
+    """Process-wide float32 feature matrix over the catalog, kept current incrementally
+
+    Rows are encoded once when an item is first seen. Catalog writes in
+    data_manager mark items dirty; the next read refreshes only those rows.
+    Category codes come from append-only vocabularies so they never shift.
+    """
 
-class PersonalizedRecommender:
     def __init__(self):
-        self.label_encoders = {
-            'color': LabelEncoder(),
-            'style': LabelEncoder(),
-            'type': LabelEncoder()
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._buffer = np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+        self._unit = np.empty((0, COLOR_COLUMNS), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._row_of: Dict[int, int] = {}
+        self.items: Dict[int, Dict] = {}
+        self.vocabularies: Dict[str, Dict[str, int]] = {'style': {}, 'type': {}}
+        self.version = 0
+        self._loaded = False
+        self._pending: Dict[int, str] = {}
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Live feature rows (a view, do not mutate)"""
+        return self._buffer[:self._size]
+
+    @property
+    def normalized(self) -> np.ndarray:
+        """L2-normalized RGB of each row, maintained alongside the raw matrix"""
+        return self._unit[:self._size]
+
+    @property
+    def codes(self) -> np.ndarray:
+        """(style code, type code) of each row"""
+        return self.matrix[:, COLOR_COLUMNS:].astype(np.int64)
+
+    @property
+    def item_ids(self) -> np.ndarray:
+        """Item id for each matrix row"""
+        return self._ids[:self._size]
+
+    def row_of(self, item_id: int) -> Optional[int]:
+        """Matrix row for an item id, or None if unknown"""
+        return self._row_of.get(int(item_id))
+
+    def on_catalog_change(self, event: str, item_ids: List[int]):
+        """data_manager listener: defer work until the next read"""
+        if event == 'reload':
+            self.invalidate()
+            return
+        with self._lock:
+            for item_id in item_ids:
+                self._pending[item_id] = event
+
+    def _code(self, vocabulary: str, value) -> int:
+        """Return the stable code for a category value, adding it if new"""
+        vocab = self.vocabularies[vocabulary]
+        key = '' if value is None or (isinstance(value, float) and np.isnan(value)) else str(value)
+        if key not in vocab:
+            vocab[key] = len(vocab)
+        return vocab[key]
+
+    def _encode(self, item: Dict) -> np.ndarray:
+        """Encode one item into its feature row"""
+        r, g, b = _parse_rgb(item['color'])
+        return np.array([
+            r / 255.0, g / 255.0, b / 255.0,
+            self._code('style', item['style']),
+            self._code('type', item['type'])
+        ], dtype=np.float32)
+
+    def _grow(self, needed: int):
+        """Amortized growth of the row buffers"""
+        if needed <= len(self._buffer):
+            return
+        capacity = max(needed, 2 * len(self._buffer), 64)
+        buffer = np.empty((capacity, len(FEATURE_COLUMNS)), dtype=np.float32)
+        buffer[:self._size] = self.matrix
+        unit = np.empty((capacity, COLOR_COLUMNS), dtype=np.float32)
+        unit[:self._size] = self.normalized
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self._size] = self.item_ids
+        self._buffer, self._unit, self._ids = buffer, unit, ids
+
+    def _upsert(self, item: Dict):
+        item_id = int(item['id'])
+        row = self._row_of.get(item_id)
+        if row is None:
+            self._grow(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._row_of[item_id] = row
+            self._ids[row] = item_id
+        features = self._encode(item)
+        color = features[:COLOR_COLUMNS]
+        norm = np.linalg.norm(color)
+        self._buffer[row] = features
+        self._unit[row] = color / norm if norm > 0 else color
+        self.items[item_id] = item
+
+    def _remove(self, item_id: int):
+        row = self._row_of.pop(item_id, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            # Move the last row into the hole so the matrix stays dense
+            moved_id = int(self._ids[last])
+            self._buffer[row] = self._buffer[last]
+            self._unit[row] = self._unit[last]
+            self._ids[row] = moved_id
+            self._row_of[moved_id] = row
+        self._size = last
+        self.items.pop(item_id, None)
+
+    @staticmethod
+    def _records(items_df: pd.DataFrame) -> List[Dict]:
+        fields = [f for f in ITEM_FIELDS if f in items_df.columns]
+        return items_df[fields].to_dict('records')
+
+    def ensure_current(self) -> int:
+        """Load the catalog on first use and apply pending changes; returns the version"""
+        with self._lock:
+            if not self._loaded:
+                self._pending.clear()
+                for item in self._records(load_clothing_items()):
+                    self._upsert(item)
+                self._loaded = True
+                self.version += 1
+                return self.version
+
+            if self._pending:
+                pending, self._pending = self._pending, {}
+                for item_id, event in pending.items():
+                    if event == 'delete':
+                        self._remove(item_id)
+                upserts = [i for i, event in pending.items() if event != 'delete']
+                if upserts:
+                    fresh = self._records(load_clothing_items_by_ids(upserts))
+                    found = {int(item['id']) for item in fresh}
+                    for item in fresh:
+                        self._upsert(item)
+                    # Rows that vanished between the write and this refresh
+                    for item_id in set(upserts) - found:
+                        self._remove(item_id)
+                self.version += 1
+            return self.version
+
+    def invalidate(self):
+        """Drop everything and rebuild from the database on next read"""
+        with self._lock:
+            self._reset()
+
+
+class SimilarityIndex:
+    """Exact top-k search blending color cosine with style and type matches
+
+    Color similarity is the cosine of the RGB vectors; style and type add
+    their weight only on an exact code match, so the categorical codes
+    never dominate or depend on vocabulary order. Scores lie in [0, 1].
+    Scores are one matrix product per query chunk and selection uses
+    argpartition, so each query is O(n) rather than a full O(n log n) sort.
+    Incremental maintenance comes for free from ItemFeatureCache.
+    """
+
+    # Queries scored per matrix product; bounds the (catalog x chunk) buffer
+    QUERY_CHUNK = 256
+
+    def __init__(self, features: ItemFeatureCache):
+        self.features = features
+
+    def search(self, item_ids: List[int], k: int) -> Dict[int, List[Tuple[int, float]]]:
+        """Return up to k (item_id, similarity) neighbours for each known query id"""
+        with self.features._lock:
+            self.features.ensure_current()
+            unit = self.features.normalized.copy()
+            codes = self.features.codes
+            ids = self.features.item_ids.copy()
+            rows = {int(i): self.features.row_of(i) for i in item_ids}
+
+        queries = [(item_id, row) for item_id, row in rows.items() if row is not None]
+        results: Dict[int, List[Tuple[int, float]]] = {}
+        k = min(k, len(ids) - 1)
+        if k <= 0:
+            return {item_id: [] for item_id, _ in queries}
+
+        for start in range(0, len(queries), self.QUERY_CHUNK):
+            chunk = queries[start:start + self.QUERY_CHUNK]
+            query_rows = np.array([row for _, row in chunk])
+            scores = unit[query_rows] @ unit.T
+            scores *= SIMILARITY_WEIGHTS['color']
+            # Add the categorical weights in place through boolean masks, so the
+            # only temporaries are one-byte-per-cell masks, not float64 blocks
+            for column, feature in enumerate(('style', 'type')):
+                matches = codes[query_rows, column][:, None] == codes[:, column]
+                np.add(scores, np.float32(SIMILARITY_WEIGHTS[feature]), out=scores, where=matches)
+            # Never return an item as its own neighbour
+            scores[np.arange(len(chunk)), query_rows] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for i, (item_id, _) in enumerate(chunk):
+                results[item_id] = [
+                    (int(ids[col]), float(score))
+                    for col, score in zip(top[i], top_scores[i])
+                ]
+        return results
+
+
+class PreferenceScorer:
+    """Vectorized preference scoring over per-type one-hot/multi-hot item matrices
+
+    For each item type the scorer keeps a sparse one-hot color matrix and a
+    multi-hot style-token matrix. Preference dictionaries are projected onto
+    those vocabularies, so scoring is two sparse matrix-vector products plus
+    an occasion mask. Matrices are rebuilt only when the catalog version moves.
+    """
+
+    def __init__(self, features: ItemFeatureCache):
+        self.features = features
+        self._version = None
+        self._by_type: Dict[str, Dict] = {}
+
+    @staticmethod
+    def _build_type(items: List[Dict]) -> Dict:
+        colors: Dict[str, int] = {}
+        tokens: Dict[str, int] = {}
+        styles: Dict[str, int] = {}
+        color_cols, style_codes = [], []
+        token_rows, token_cols = [], []
+        for row, item in enumerate(items):
+            color_cols.append(colors.setdefault(str(item['color']), len(colors)))
+            style = str(item['style'])
+            style_codes.append(styles.setdefault(style, len(styles)))
+            for token in set(style.split(',')):
+                token_rows.append(row)
+                token_cols.append(tokens.setdefault(token, len(tokens)))
+
+        n = len(items)
+        return {
+            'ids': np.array([int(item['id']) for item in items], dtype=np.int64),
+            'colors': list(colors),
+            'tokens': list(tokens),
+            'styles': list(styles),
+            'style_codes': np.array(style_codes, dtype=np.int64),
+            'color_matrix': csr_matrix(
+                (np.ones(n, dtype=np.float32), (np.arange(n), color_cols)),
+                shape=(n, len(colors))
+            ),
+            'token_matrix': csr_matrix(
+                (np.ones(len(token_rows), dtype=np.float32), (token_rows, token_cols)),
+                shape=(n, len(tokens))
+            ),
         }
-        self.similarity_threshold = 0.3
 
-    def _encode_features(self, items_df: pd.DataFrame) -> np.ndarray:
-        """Encode categorical features to numerical values"""
-        encoded_features = []
-        
-        # Encode colors (convert RGB string to normalized values)
-        colors = items_df['color'].apply(lambda x: [int(c) for c in str(x).strip('rgb()').split(',')])
-        normalized_colors = np.array(colors.tolist()) / 255.0
-        encoded_features.append(normalized_colors)
-        
-        # Encode styles
-        styles = items_df['style'].fillna('')
-        self.label_encoders['style'].fit(styles)
-        encoded_styles = self.label_encoders['style'].transform(styles)
-        encoded_features.append(encoded_styles.reshape(-1, 1))
-        
-        # Encode item types
-        types = items_df['type'].fillna('')
-        self.label_encoders['type'].fit(types)
-        encoded_types = self.label_encoders['type'].transform(types)
-        encoded_features.append(encoded_types.reshape(-1, 1))
-        
-        # Combine all features
-        return np.hstack(encoded_features)
+    def _ensure_current(self):
+        with self.features._lock:
+            version = self.features.ensure_current()
+            if version == self._version:
+                return
+            grouped: Dict[str, List[Dict]] = {}
+            for item in self.features.items.values():
+                grouped.setdefault(item['type'], []).append(item)
+            self._by_type = {t: self._build_type(items) for t, items in grouped.items()}
+            self._version = version
+
+    def score(self, item_type: str, preferences: Dict, occasion: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (item_ids, scores) for every item of a type"""
+        self._ensure_current()
+        data = self._by_type.get(item_type)
+        if data is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.zeros(len(data['ids']), dtype=np.float32)
+
+        color_prefs = preferences.get('color_preferences')
+        if color_prefs:
+            weights = np.array([color_prefs.get(c, 0) for c in data['colors']], dtype=np.float32)
+            scores += data['color_matrix'] @ weights
+
+        style_prefs = preferences.get('style_preferences')
+        if style_prefs:
+            weights = np.array([style_prefs.get(t, 0) for t in data['tokens']], dtype=np.float32)
+            scores += data['token_matrix'] @ weights
+
+        if occasion:
+            # Evaluate the substring rule once per distinct style string
+            occasion = occasion.lower()
+            matches = np.array([occasion in style.lower() for style in data['styles']], dtype=bool)
+            scores[matches[data['style_codes']]] *= 1.5
+
+        return data['ids'], scores
+
+
+# Shared across sessions; kept in sync through data_manager write hooks
+feature_cache = ItemFeatureCache()
+register_catalog_listener(feature_cache.on_catalog_change)
+
+
+class PersonalizedRecommender:
+    def __init__(self, features: ItemFeatureCache = None):
+        self.features = features or feature_cache
+        self.index = SimilarityIndex(self.features)
+        self.scorer = PreferenceScorer(self.features)
+        self.similarity_threshold = 0.3
 
     def get_user_preferences(self, user_id: int) -> Dict:
-        """Get user's preferences based on saved outfits"""
+        """Get user's preferences from their materialized preference profile"""
         try:
-            with get_db_connection() as conn:
-                cur = conn.cursor()
-                
-                # Get user's saved outfits
-                cur.execute("""
-                    SELECT image_path, created_at 
-                    FROM saved_outfits 
-                    WHERE user_id = %s 
-                    ORDER BY created_at DESC
-                """, (user_id,))
-                saved_outfits = cur.fetchall()
-                
-                if not saved_outfits:
-                    return {}
-                
-                # Analyze color preferences
-                color_preferences = {}
-                style_preferences = {}
-                
-                # Load all clothing items
-                items_df = load_clothing_items()
-                
-                for outfit_path, _ in saved_outfits:
-                    # Extract item details from saved outfits
-                    outfit_items = items_df[items_df['image_path'].isin([outfit_path])]
-                    
-                    for _, item in outfit_items.iterrows():
-                        # Track color preferences
-                        color = str(item['color'])
-                        if color in color_preferences:
-                            color_preferences[color] += 1
-                        else:
-                            color_preferences[color] = 1
-                            
-                        # Track style preferences
-                        styles = str(item['style']).split(',')
-                        for style in styles:
-                            if style in style_preferences:
-                                style_preferences[style] += 1
-                            else:
-                                style_preferences[style] = 1
-                
-                return {
-                    'color_preferences': color_preferences,
-                    'style_preferences': style_preferences
-                }
-                
+            return get_preference_profile(user_id)
         except Exception as e:
             logging.error(f"Error getting user preferences: {str(e)}")
             return {}
@@ -101,13 +354,11 @@ class PersonalizedRecommender:
             # Get user preferences
             preferences = self.get_user_preferences(user_id)
             
-            # Load available items
-            items_df = load_clothing_items()
-            if items_df.empty:
-                return {}, ['No items available']
-            
-            # Convert items to feature matrix
-            feature_matrix = self._encode_features(items_df)
+            # Make sure the cached catalog is current
+            with self.features._lock:
+                self.features.ensure_current()
+                if not self.features.items:
+                    return {}, ['No items available']
             
             # Initialize outfit selection
             selected_outfit = {}
@@ -115,52 +366,29 @@ class PersonalizedRecommender:
             
             # Select items based on preferences and occasion
             for item_type in ['shirt', 'pants', 'shoes']:
-                type_items = items_df[items_df['type'] == item_type]
-                if type_items.empty:
+                item_ids, scores = self.scorer.score(item_type, preferences, occasion)
+                if len(item_ids) == 0:
                     missing_items.append(item_type)
                     continue
                 
-                # Calculate preference scores
-                scores = np.zeros(len(type_items))
-                
-                # Color preference score
-                if preferences.get('color_preferences'):
-                    for idx, item in type_items.iterrows():
-                        color = str(item['color'])
-                        scores[idx] += preferences['color_preferences'].get(color, 0)
-                
-                # Style preference score
-                if preferences.get('style_preferences'):
-                    for idx, item in type_items.iterrows():
-                        styles = str(item['style']).split(',')
-                        style_score = sum(preferences['style_preferences'].get(style, 0) for style in styles)
-                        scores[idx] += style_score
-                
-                # Occasion matching (if specified)
-                if occasion:
-                    for idx, item in type_items.iterrows():
-                        if occasion.lower() in str(item['style']).lower():
-                            scores[idx] *= 1.5  # Boost score for occasion-matching items
-                
-                # Select item with highest score
-                if any(scores > 0):
-                    best_idx = scores.argmax()
-                    selected_item = type_items.iloc[best_idx]
-                    selected_outfit[item_type] = {
-                        'image_path': selected_item['image_path'],
-                        'color': selected_item['color'],
-                        'price': float(selected_item['price']) if selected_item['price'] else 0,
-                        'hyperlink': selected_item['hyperlink'] if 'hyperlink' in selected_item else None
-                    }
+                # Select item with highest score, or randomly without preference data
+                if (scores > 0).any():
+                    best_id = item_ids[scores.argmax()]
                 else:
-                    # If no preference data, select randomly
-                    selected_item = type_items.sample(n=1).iloc[0]
-                    selected_outfit[item_type] = {
-                        'image_path': selected_item['image_path'],
-                        'color': selected_item['color'],
-                        'price': float(selected_item['price']) if selected_item['price'] else 0,
-                        'hyperlink': selected_item['hyperlink'] if 'hyperlink' in selected_item else None
-                    }
+                    best_id = np.random.choice(item_ids)
+                
+                # Read under the lock; a listener may have removed the item since scoring
+                with self.features._lock:
+                    selected_item = self.features.items.get(int(best_id))
+                if selected_item is None:
+                    missing_items.append(item_type)
+                    continue
+                selected_outfit[item_type] = {
+                    'image_path': selected_item['image_path'],
+                    'color': selected_item['color'],
+                    'price': float(selected_item['price']) if selected_item['price'] else 0,
+                    'hyperlink': selected_item.get('hyperlink')
+                }
             
             return selected_outfit, missing_items
             
@@ -170,35 +398,37 @@ class PersonalizedRecommender:
 
     def get_similar_items(self, item_id: int, n: int = 3) -> List[Dict]:
         """Get similar items based on features"""
+        return self.get_similar_items_batch([item_id], n).get(int(item_id), [])
+
+    def get_similar_items_batch(self, item_ids: List[int], n: int = 3) -> Dict[int, List[Dict]]:
+        """Get similar items for several items at once, keyed by query item id"""
         try:
-            items_df = load_clothing_items()
-            if items_df.empty or item_id not in items_df.index:
-                return []
-            
-            # Get item features
-            feature_matrix = self._encode_features(items_df)
-            item_features = feature_matrix[items_df.index == item_id]
-            
-            # Calculate similarity
-            similarities = cosine_similarity(item_features, feature_matrix)
-            similar_indices = similarities[0].argsort()[::-1][1:n+1]
-            
-            # Get similar items
-            similar_items = []
-            for idx in similar_indices:
-                if similarities[0][idx] >= self.similarity_threshold:
-                    item = items_df.iloc[idx]
+            neighbours = self.index.search(item_ids, n)
+            # Snapshot just the matched items while no refresh can swap them
+            with self.features._lock:
+                items = {
+                    match_id: self.features.items.get(match_id)
+                    for matches in neighbours.values() for match_id, _ in matches
+                }
+
+            similar = {}
+            for query_id, matches in neighbours.items():
+                similar_items = []
+                for match_id, similarity in matches:
+                    item = items.get(match_id)
+                    if item is None or similarity < self.similarity_threshold:
+                        continue
                     similar_items.append({
-                        'id': item.name,
+                        'id': match_id,
                         'type': item['type'],
                         'color': item['color'],
                         'style': item['style'],
                         'image_path': item['image_path'],
-                        'similarity': similarities[0][idx]
+                        'similarity': similarity
                     })
-            
-            return similar_items
+                similar[query_id] = similar_items
+            return similar
             
         except Exception as e:
             logging.error(f"Error finding similar items: {str(e)}")
-            return []
+            return {}
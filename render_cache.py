@@ -0,0 +1,90 @@
+import os
+import io
+import hashlib
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from PIL import Image
+
+
+class RenderCache:
+    """Deterministic cache of rendered PNGs: in-memory LRU in front of files on disk
+
+    Renders are stored under a filename derived from their cache key, so
+    identical requests share one file and different requests never clobber
+    each other the way timestamp-named files do.
+    """
+
+    def __init__(self, directory: str, prefix: str, max_entries: int = 64):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key: Hashable) -> str:
+        """Filesystem path a key's render is persisted under"""
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.directory, f"{self.prefix}_{digest}.png")
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Image.Image]) -> str:
+        """Return the path of the render for key, calling render() only on a full miss"""
+        path = self.path_for(key)
+        with self._lock:
+            data = self._entries.get(path)
+            if data is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+
+        if data is not None:
+            # The file may have been swept by cleanup since it was cached
+            if not os.path.exists(path):
+                self._write(path, data)
+            return path
+
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            with self._lock:
+                self.hits += 1
+        else:
+            buffer = io.BytesIO()
+            render().save(buffer, 'PNG')
+            data = buffer.getvalue()
+            self._write(path, data)
+            with self._lock:
+                self.misses += 1
+
+        self._remember(path, data)
+        return path
+
+    def clear(self):
+        """Drop in-memory entries; persisted files are left in place"""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, path: str, data: bytes):
+        with self._lock:
+            self._entries[path] = data
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _write(self, path: str, data: bytes):
+        """Write via a unique temp file and rename so concurrent writers never interleave"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Failed to persist render {path}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,273 @@
+import os
+import hmac
+import time
+import atexit
+import base64
+import hashlib
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+# HMAC key for session tokens; must be set (and shared by every app process)
+# for sessions to survive restarts and scaling out
+SESSION_SECRET = os.environ.get('SESSION_SECRET')
+SESSION_TTL_DAYS = int(os.environ.get('SESSION_TTL_DAYS', 14))
+# Resolved sessions kept in memory, and how long before one is re-checked
+# against the database so revocations from other processes are picked up
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 4096))
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', 60))
+# Seconds between batched last_login / last_seen_at writes
+LAST_LOGIN_FLUSH_SECONDS = float(os.environ.get('LAST_LOGIN_FLUSH_SECONDS', 30))
+
+
+class LastLoginBatcher:
+    """Coalesces last_login and session last_seen_at updates into periodic batch writes
+
+    Credential logins move users.last_login; resuming a session only moves
+    that session's last_seen_at.
+    """
+
+    def __init__(self, flush_interval: float = LAST_LOGIN_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._users: Dict[int, datetime] = {}
+        self._sessions: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def touch_login(self, user_id: int):
+        """Queue a password login; repeated touches before a flush collapse into one row"""
+        with self._lock:
+            self._users[user_id] = datetime.now()
+            self._start()
+
+    def touch_session(self, session_id: str):
+        """Queue a visit on an existing session"""
+        with self._lock:
+            self._sessions[session_id] = datetime.now()
+            self._start()
+
+    def _start(self):
+        # Called with the lock held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> int:
+        """Write pending updates in one statement per table; returns rows queued"""
+        with self._lock:
+            users, self._users = self._users, {}
+            sessions, self._sessions = self._sessions, {}
+        if not users and not sessions:
+            return 0
+
+        try:
+            from data_manager import get_db_connection
+            from psycopg2.extras import execute_values
+            with get_db_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    if users:
+                        execute_values(cur, """
+                            UPDATE users SET last_login = GREATEST(users.last_login, v.seen_at)
+                            FROM (VALUES %s) AS v(id, seen_at)
+                            WHERE users.id = v.id
+                        """, list(users.items()), template="(%s, %s::timestamp)")
+                    if sessions:
+                        execute_values(cur, """
+                            UPDATE user_sessions SET last_seen_at = v.seen_at
+                            FROM (VALUES %s) AS v(session_id, seen_at)
+                            WHERE user_sessions.session_id = v.session_id
+                        """, list(sessions.items()), template="(%s, %s::timestamp)")
+                    conn.commit()
+                finally:
+                    cur.close()
+        except Exception as e:
+            logging.error(f"Error flushing last login times: {str(e)}")
+            # Put the batch back unless newer touches have replaced it
+            with self._lock:
+                for user_id, seen_at in users.items():
+                    self._users.setdefault(user_id, seen_at)
+                for session_id, seen_at in sessions.items():
+                    self._sessions.setdefault(session_id, seen_at)
+            return 0
+        return len(users) + len(sessions)
+
+
+class SessionStore:
+    """Server-side sessions keyed by HMAC-signed tokens, with an in-process LRU in front
+
+    A token is "<session id>.<signature>". Forged or mangled tokens fail the
+    signature check without touching the database; valid ones are answered
+    from memory and re-read from the user_sessions table at most every
+    SESSION_CACHE_TTL seconds.
+    """
+
+    def __init__(self, secret: Optional[str] = SESSION_SECRET, ttl_days: int = SESSION_TTL_DAYS,
+                 cache_size: int = SESSION_CACHE_SIZE, cache_ttl: float = SESSION_CACHE_TTL):
+        if not secret:
+            logging.warning("SESSION_SECRET is not set; sessions will not survive a restart")
+            secret = secrets.token_hex(32)
+        self._key = secret.encode('utf-8')
+        self.ttl = timedelta(days=ttl_days)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[Dict, datetime, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.batcher = LastLoginBatcher()
+
+    def _sign(self, session_id: str) -> str:
+        digest = hmac.new(self._key, session_id.encode('utf-8'), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+    def _session_id(self, token: str) -> Optional[str]:
+        """Session ID of a correctly signed token, else None"""
+        session_id, _, signature = (token or '').partition('.')
+        if not session_id or not signature:
+            return None
+        if not hmac.compare_digest(signature, self._sign(session_id)):
+            return None
+        return session_id
+
+    def _remember(self, session_id: str, user: Dict, expires_at: datetime):
+        with self._lock:
+            self._cache[session_id] = (user, expires_at, time.monotonic())
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def create(self, user: Dict) -> Optional[str]:
+        """Persist a new session for an authenticated user and return its token"""
+        from data_manager import get_db_connection
+        session_id = secrets.token_urlsafe(24)
+        expires_at = datetime.now() + self.ttl
+        try:
+            with get_db_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute(
+                        "INSERT INTO user_sessions (session_id, user_id, expires_at) VALUES (%s, %s, %s)",
+                        (session_id, user['id'], expires_at)
+                    )
+                    conn.commit()
+                finally:
+                    cur.close()
+        except Exception as e:
+            logging.error(f"Error creating session: {str(e)}")
+            return None
+        self._remember(session_id, dict(user), expires_at)
+        return f"{session_id}.{self._sign(session_id)}"
+
+    def resolve(self, token: str) -> Optional[Dict]:
+        """User dict for a valid, unexpired and unrevoked session token"""
+        session_id = self._session_id(token)
+        if session_id is None:
+            return None
+
+        now = datetime.now()
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is not None:
+                self._cache.move_to_end(session_id)
+        if cached is not None:
+            user, expires_at, cached_at = cached
+            if expires_at > now and time.monotonic() - cached_at < self.cache_ttl:
+                return dict(user)
+
+        from data_manager import get_db_connection
+        try:
+            with get_db_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute("""
+                        SELECT u.id, u.username, u.role, s.expires_at
+                        FROM user_sessions s
+                        JOIN users u ON u.id = s.user_id
+                        WHERE s.session_id = %s AND s.revoked_at IS NULL AND s.expires_at > %s
+                    """, (session_id, now))
+                    row = cur.fetchone()
+                finally:
+                    cur.close()
+        except Exception as e:
+            logging.error(f"Error resolving session: {str(e)}")
+            return None
+
+        if row is None:
+            with self._lock:
+                self._cache.pop(session_id, None)
+            return None
+        user = {"id": row[0], "username": row[1], "role": row[2]}
+        self._remember(session_id, user, row[3])
+        self.batcher.touch_session(session_id)
+        return dict(user)
+
+    def revoke(self, token: str) -> bool:
+        """End a session everywhere; other processes notice within SESSION_CACHE_TTL"""
+        session_id = self._session_id(token)
+        if session_id is None:
+            return False
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+        from data_manager import get_db_connection
+        try:
+            with get_db_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute(
+                        "UPDATE user_sessions SET revoked_at = %s WHERE session_id = %s",
+                        (datetime.now(), session_id)
+                    )
+                    conn.commit()
+                    return cur.rowcount > 0
+                finally:
+                    cur.close()
+        except Exception as e:
+            logging.error(f"Error revoking session: {str(e)}")
+            return False
+
+    def purge_expired(self) -> Tuple[bool, str]:
+        """Delete expired and revoked sessions
+
+        Expiry times are written from the app clock, so they are compared
+        against it too rather than the database's CURRENT_TIMESTAMP.
+        """
+        from data_manager import get_db_connection
+        try:
+            with get_db_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute("""
+                        DELETE FROM user_sessions
+                        WHERE expires_at <= %s OR revoked_at IS NOT NULL
+                    """, (datetime.now(),))
+                    removed = cur.rowcount
+                    conn.commit()
+                finally:
+                    cur.close()
+        except Exception as e:
+            logging.error(f"Error purging sessions: {str(e)}")
+            return False, f"Error purging sessions: {str(e)}"
+        return True, f"Removed {removed} expired or revoked sessions"
+
+
+_session_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide session store shared by every Streamlit session"""
+    global _session_store
+    if _session_store is None:
+        with _store_lock:
+            if _session_store is None:
+                _session_store = SessionStore()
+    return _session_store
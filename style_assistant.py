@@ -1,4 +1,7 @@
-from typing import Dict, List, Optional, TypedDict, Literal
+import json
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional, TypedDict, Literal, Union
 
 Season = Literal['spring', 'summer', 'fall', 'winter']
 
@@ -62,13 +65,230 @@ def get_current_season() -> Season:
     else:
         return 'winter'
 
+# Occasions the rule engine understands; anything else falls back to casual
+VALID_OCCASIONS = ['formal', 'casual', 'sport', 'beach']
+
+# Tags that drive sleeve/leg length and athletic rules
+RULE_TAGS = ['short', 'shorts', 'long', 'athletic', 'sport']
+
+# Weather condition keywords
+WEATHER_CONDITIONS = {
+    'cold': ['cold', 'freezing', 'chilly', 'cool', 'windy'],
+    'warm': ['warm', 'hot', 'sunny'],
+    'rainy': ['rainy', 'rain', 'wet'],
+}
+
+
+# Per-season relevance score columns stored on user_clothing_items
+SEASON_SCORE_COLUMNS: Dict[Season, str] = {season: f"{season}_score" for season in SEASONAL_TRENDS}
+
+
+def seasonal_score(color: str, style: str, trend: SeasonalTrend) -> int:
+    """Score an item's match against one season's trend lists"""
+    color = str(color).lower()
+    style = str(style).lower()
+    score = 0
+    if any(trend_color.lower() in color for trend_color in trend['colors']):
+        score += 2
+    if any(trend_style.lower() in style for trend_style in trend['styles']):
+        score += 2
+    if any(trend_pattern.lower() in style for trend_pattern in trend['patterns']):
+        score += 1
+    return score
+
+
+def seasonal_scores_for(color: str, style: str) -> Dict[Season, int]:
+    """Score an item against every season, for storing at item write time"""
+    return {season: seasonal_score(color, style, trend) for season, trend in SEASONAL_TRENDS.items()}
+
+
+def trends_fingerprint() -> str:
+    """Hash of SEASONAL_TRENDS; stored scores are stale when this changes"""
+    return hashlib.sha256(json.dumps(SEASONAL_TRENDS, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class CompiledCatalog:
+    """Typed column store of the catalog with rule features precomputed
+
+    Items are held as NumPy columns (id, type, style, color, size, tags,
+    image path). Every rule in get_style_recommendation becomes a mask over
+    these columns, and dicts are only materialized for the rows finally
+    recommended.
+    """
+
+    def __init__(self, ids, types, styles, colors, sizes, tags, image_paths,
+                 seasonal_scores: Optional[Dict[Season, np.ndarray]] = None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.types = np.asarray(types, dtype=object)
+        self.styles = np.asarray(styles, dtype=object)
+        self.raw_colors = np.asarray(colors, dtype=object)
+        self.sizes = np.asarray(sizes, dtype=object)
+        self.image_paths = np.asarray(image_paths, dtype=object)
+        self.tag_lists = [t if isinstance(t, list) else [] for t in tags]
+
+        self.colors = np.char.lower(np.array([str(c) for c in colors], dtype=str))
+        styles_lower = np.char.lower(np.array([str(s) for s in styles], dtype=str))
+
+        self.occasion_match = {
+            occasion: np.char.find(styles_lower, occasion) >= 0
+            for occasion in VALID_OCCASIONS
+        }
+
+        self.has_tags = np.array([bool(t) for t in self.tag_lists], dtype=bool)
+        self.tags = {
+            tag: np.array([tag in t for t in self.tag_lists], dtype=bool)
+            for tag in RULE_TAGS
+        }
+
+        # Prefer the scores stored at item write time; fall back to matching
+        self.seasonal_scores = seasonal_scores or {
+            season: self._seasonal_scores(styles_lower, trend)
+            for season, trend in SEASONAL_TRENDS.items()
+        }
+
+    def _contains_any(self, column: np.ndarray, words: List[str]) -> np.ndarray:
+        match = np.zeros(len(column), dtype=bool)
+        for word in words:
+            match |= np.char.find(column, word.lower()) >= 0
+        return match
+
+    def _seasonal_scores(self, styles_lower: np.ndarray, trend: SeasonalTrend) -> np.ndarray:
+        """Vectorized equivalent of seasonal_score over every item"""
+        return (
+            2 * self._contains_any(self.colors, trend['colors'])
+            + 2 * self._contains_any(styles_lower, trend['styles'])
+            + self._contains_any(styles_lower, trend['patterns'])
+        ).astype(np.int8)
+
+    @classmethod
+    def from_items(cls, clothing_items: List[Dict]) -> 'CompiledCatalog':
+        """Build the column store from item dicts"""
+        return cls(
+            [item.get('id', 0) for item in clothing_items],
+            [item['type'] for item in clothing_items],
+            [item['style'] for item in clothing_items],
+            [item['color'] for item in clothing_items],
+            [item.get('size') for item in clothing_items],
+            [item.get('tags') for item in clothing_items],
+            [item.get('image_path') for item in clothing_items],
+        )
+
+    @classmethod
+    def from_frame(cls, items_df) -> 'CompiledCatalog':
+        """Build the column store straight from a clothing items DataFrame"""
+        tags = items_df['tags'].tolist() if 'tags' in items_df.columns else [None] * len(items_df)
+        seasonal_scores = None
+        score_columns = list(SEASON_SCORE_COLUMNS.values())
+        if set(score_columns).issubset(items_df.columns) and not items_df[score_columns].isna().any().any():
+            seasonal_scores = {
+                season: items_df[column].to_numpy(dtype=np.int8)
+                for season, column in SEASON_SCORE_COLUMNS.items()
+            }
+        return cls(
+            items_df['id'].to_numpy(),
+            items_df['type'].to_numpy(),
+            items_df['style'].to_numpy(),
+            items_df['color'].to_numpy(),
+            items_df['size'].to_numpy(),
+            tags,
+            items_df['image_path'].to_numpy(),
+            seasonal_scores,
+        )
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def is_type(self, item_type: str) -> np.ndarray:
+        return self.types == item_type
+
+    def item(self, row: int) -> Dict:
+        """Materialize one row as the dict shape format_clothing_items produces"""
+        return {
+            'id': int(self.ids[row]),
+            'type': self.types[row],
+            'style': self.styles[row],
+            'color': self.raw_colors[row],
+            'size': self.sizes[row],
+            'tags': self.tag_lists[row],
+            'image_path': self.image_paths[row]
+        }
+
+
+def compile_catalog(clothing_items: List[Dict]) -> CompiledCatalog:
+    """Precompute rule feature columns for a list of clothing items"""
+    return CompiledCatalog.from_items(clothing_items)
+
+
+_compiled_cache = {'version': None, 'catalog': None}
+
+
+def get_compiled_catalog(items_df, version=None) -> CompiledCatalog:
+    """Return the column store for items_df, reusing it while the catalog version is unchanged
+
+    Pass data_manager.get_catalog_version() as version; without one the
+    store is rebuilt every call. The cached ids are also checked against
+    items_df so rows added or removed by another process are picked up.
+    """
+    cached = _compiled_cache['catalog']
+    if (version is not None and _compiled_cache['version'] == version
+            and np.array_equal(cached.ids, items_df['id'].to_numpy())):
+        return cached
+    catalog = CompiledCatalog.from_frame(items_df)
+    if version is not None:
+        _compiled_cache['version'] = version
+        _compiled_cache['catalog'] = catalog
+    return catalog
+
+
+def _suitability_mask(catalog: CompiledCatalog, occasion: str, weather: str,
+                      is_cold: bool, is_warm: bool) -> np.ndarray:
+    """Evaluate the occasion and weather rules as one boolean mask"""
+    shirts = catalog.is_type('shirt')
+    pants = catalog.is_type('pants')
+    tags = catalog.tags
+
+    mask = catalog.occasion_match[occasion].copy()
+
+    # Occasion-specific rules
+    if occasion == 'formal':
+        mask &= ~((shirts & tags['short']) | (pants & tags['shorts']))
+    elif occasion == 'beach':
+        mask &= ~((shirts & tags['long']) | (pants & tags['long']))
+    elif occasion == 'sport':
+        mask &= ~(catalog.has_tags & ~tags['athletic'] & ~tags['sport'])
+
+    # Weather-based filtering
+    if is_cold or 'cool' in weather or 'windy' in weather:
+        mask &= ~((shirts & tags['short']) | (pants & tags['shorts']))
+    elif is_warm:
+        long_pants = pants & tags['long'] if occasion != 'formal' else np.zeros(len(catalog), dtype=bool)
+        mask &= ~((shirts & tags['long']) | long_pants)
+
+    return mask
+
+
+def _select_top_per_type(catalog: CompiledCatalog, mask: np.ndarray, seasonal: np.ndarray,
+                         item_types: List[str]) -> Dict[str, Optional[int]]:
+    """Pick the first matching row per type, seasonal-trend items first"""
+    candidates = np.flatnonzero(mask)
+    # Seasonal matches rank ahead of the rest; ties keep catalog order
+    order = candidates[np.argsort(seasonal[candidates] <= 0, kind='stable')]
+    selected = {}
+    for item_type in item_types:
+        rows = order[catalog.types[order] == item_type]
+        selected[item_type] = int(rows[0]) if len(rows) else None
+    return selected
+
+
 def get_style_recommendation(
-    clothing_items: List[Dict],
+    clothing_items: Union[List[Dict], CompiledCatalog],
     occasion: Optional[str] = None,
     weather: Optional[str] = None,
     preferences: Optional[str] = None
 ) -> StyleRecommendation:
     """Get style recommendations using a rule-based system with seasonal trends"""
+    catalog = clothing_items if isinstance(clothing_items, CompiledCatalog) else compile_catalog(clothing_items)
+
     # Initialize recommendation text
     recommendation_text = []
     recommended_items = []
@@ -87,86 +307,16 @@ def get_style_recommendation(
     occasion = occasion.lower() if occasion else "casual"
     weather = weather.lower() if weather else ""
 
-    # Weather condition check with comprehensive keywords
-    weather_conditions = {
-        'cold': ['cold', 'freezing', 'chilly', 'cool', 'windy'],  
-        'warm': ['warm', 'hot', 'sunny'],
-        'rainy': ['rainy', 'rain', 'wet'],
-    }
-    
-    is_cold = any(word in weather for word in weather_conditions['cold'])
-    is_warm = any(word in weather for word in weather_conditions['warm'])
-    is_rainy = any(word in weather for word in weather_conditions['rainy'])
+    is_cold = any(word in weather for word in WEATHER_CONDITIONS['cold'])
+    is_warm = any(word in weather for word in WEATHER_CONDITIONS['warm'])
+    is_rainy = any(word in weather for word in WEATHER_CONDITIONS['rainy'])
     
     # Strict occasion matching
-    valid_occasions = ['formal', 'casual', 'sport', 'beach']
-    if occasion not in valid_occasions:
+    if occasion not in VALID_OCCASIONS:
         occasion = 'casual'  
     
     # Filter items based on occasion and weather
-    suitable_items = []
-    for item in clothing_items:
-        item_type = item['type']
-        item_style = item['style'].lower()
-        item_tags = item.get('tags', []) if isinstance(item.get('tags'), list) else []
-        
-        # Skip items that don't match the occasion
-        if occasion not in item_style:
-            continue
-            
-        # Occasion-specific rules
-        if occasion == 'formal':
-            if item_type == 'shirt' and item_tags and 'short' in item_tags:
-                continue  
-            if item_type == 'pants' and item_tags and 'shorts' in item_tags:
-                continue  
-                
-        elif occasion == 'beach':
-            if item_type == 'shirt' and item_tags and 'long' in item_tags:
-                continue  
-            if item_type == 'pants' and item_tags and 'long' in item_tags:
-                continue  
-                
-        elif occasion == 'sport':
-            if item_tags and 'athletic' not in item_tags and 'sport' not in item_tags:
-                continue  
-        
-        # Weather-based filtering with improved conditions
-        if is_cold or 'cool' in weather or 'windy' in weather:
-            if item_type == 'shirt' and item_tags and 'short' in item_tags:
-                continue  
-            if item_type == 'pants' and item_tags and 'shorts' in item_tags:
-                continue  
-                
-        elif is_warm:
-            if item_type == 'shirt' and item_tags and 'long' in item_tags:
-                continue  
-            if item_type == 'pants' and item_tags and 'long' in item_tags and occasion != 'formal':
-                continue  
-        
-        suitable_items.append(item)
-    
-    # Prioritize items matching seasonal trends
-    prioritized_items = []
-    for item in clothing_items:
-        item_color = item['color'].lower()
-        item_style = item['style'].lower()
-
-        # Calculate seasonal relevance score
-        seasonal_score = 0
-        if any(trend_color.lower() in item_color for trend_color in seasonal_trend['colors']):
-            seasonal_score += 2
-        if any(trend_style.lower() in item_style for trend_style in seasonal_trend['styles']):
-            seasonal_score += 2
-        if any(trend_pattern.lower() in item_style for trend_pattern in seasonal_trend['patterns']):
-            seasonal_score += 1
-
-        if seasonal_score > 0:  # Prioritize items matching seasonal trends
-            prioritized_items.insert(0, item)
-        else:
-            prioritized_items.append(item)
-            
-    suitable_items = prioritized_items
+    suitable = _suitability_mask(catalog, occasion, weather, is_cold, is_warm)
 
     # Add weather-based recommendation text
     if is_cold or 'cool' in weather or 'windy' in weather:
@@ -188,20 +338,20 @@ def get_style_recommendation(
         if 'bright' in preferences:
             preferred_colors.extend(['red', 'yellow', 'blue', 'green'])
             
-        if preferred_colors:
-            suitable_items = [
-                item for item in suitable_items
-                if any(color in item['color'].lower() for color in preferred_colors)
-            ]
+        if preferred_colors and len(catalog):
+            color_match = np.zeros(len(catalog), dtype=bool)
+            for color in preferred_colors:
+                color_match |= np.char.find(catalog.colors, color) >= 0
+            suitable &= color_match
     
-    # Select items by type ensuring complete outfit from user's wardrobe
-    selected_items = {'shirt': None, 'pants': None, 'shoes': None}
-    for item_type in selected_items:
-        # Filter items by type from the user's wardrobe (suitable_items already contains user's items)
-        type_items = [item for item in suitable_items if item['type'] == item_type]
-        if type_items:
-            selected_items[item_type] = type_items[0]  
-            recommended_items.append(type_items[0])
+    # Select items by type ensuring complete outfit from user's wardrobe,
+    # prioritizing items that match the seasonal trends
+    selected_rows = _select_top_per_type(
+        catalog, suitable, catalog.seasonal_scores[current_season], ['shirt', 'pants', 'shoes']
+    )
+    for row in selected_rows.values():
+        if row is not None:
+            recommended_items.append(catalog.item(row))
     
     # Generate style tips based on occasion
     if occasion == 'formal':
@@ -0,0 +1,52 @@
+import auth_service
+from auth_service import SlidingWindowRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sliding_window_limits_and_recovers(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(auth_service.time, 'monotonic', clock)
+    limiter = SlidingWindowRateLimiter(limit=2, window=60)
+
+    assert limiter.hit('a') == (True, 0.0)
+    clock.now += 10
+    assert limiter.hit('a') == (True, 0.0)
+    allowed, retry_after = limiter.hit('a')
+    assert not allowed
+    assert retry_after == 50
+
+    # Other keys have their own window
+    assert limiter.hit('b')[0]
+
+    # The first hit leaves the window exactly 60 seconds after it was made
+    clock.now += 50
+    assert limiter.hit('a')[0]
+    assert not limiter.hit('a')[0]
+
+
+def test_rejected_hits_do_not_extend_the_window(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(auth_service.time, 'monotonic', clock)
+    limiter = SlidingWindowRateLimiter(limit=1, window=30)
+
+    assert limiter.hit('a')[0]
+    for _ in range(5):
+        clock.now += 5
+        assert not limiter.hit('a')[0]
+    clock.now += 5
+    assert limiter.hit('a')[0]
+
+
+def test_reset_clears_a_key(monkeypatch):
+    monkeypatch.setattr(auth_service.time, 'monotonic', FakeClock())
+    limiter = SlidingWindowRateLimiter(limit=1, window=30)
+    limiter.hit('a')
+    limiter.reset('a')
+    assert limiter.hit('a')[0]
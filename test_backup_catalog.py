@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from backup_catalog import BackupCatalog
+
+NOW = datetime.datetime(2024, 6, 15, 12, 0)  # a Saturday
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return BackupCatalog(str(tmp_path / 'catalog.db'))
+
+
+def add_backups(catalog, times):
+    for created_at in times:
+        catalog.add('database', f"db_{created_at:%Y%m%d_%H%M%S}.sql", 'md5', size_bytes=1,
+                    created_at=created_at)
+
+
+def planned_paths(catalog, **kwargs):
+    keep, expire = catalog.plan_retention('database', now=NOW, **kwargs)
+    return {entry['filepath'] for entry in keep}, {entry['filepath'] for entry in expire}
+
+
+def test_keeps_newest_backup_of_each_recent_day(catalog):
+    add_backups(catalog, [
+        datetime.datetime(2024, 6, 15, 9, 0),
+        datetime.datetime(2024, 6, 15, 3, 0),
+        datetime.datetime(2024, 6, 14, 3, 0),
+        datetime.datetime(2024, 6, 14, 1, 0),
+    ])
+    keep, expire = planned_paths(catalog, daily=7, weekly=0, monthly=0)
+    assert keep == {'db_20240615_090000.sql', 'db_20240614_030000.sql'}
+    assert expire == {'db_20240615_030000.sql', 'db_20240614_010000.sql'}
+
+
+def test_weekly_and_monthly_tiers(catalog):
+    add_backups(catalog, [
+        datetime.datetime(2024, 6, 14),   # this week
+        datetime.datetime(2024, 6, 5),    # last week (Wednesday)
+        datetime.datetime(2024, 6, 3),    # last week (Monday), older than the 5th
+        datetime.datetime(2024, 5, 20),   # four weeks ago, outside weekly=2
+        datetime.datetime(2024, 4, 30),   # April
+        datetime.datetime(2024, 4, 2),    # April, older
+        datetime.datetime(2023, 1, 10),   # outside every tier
+    ])
+    keep, expire = planned_paths(catalog, daily=1, weekly=2, monthly=3)
+    assert keep == {'db_20240614_000000.sql', 'db_20240605_000000.sql',
+                    'db_20240520_000000.sql', 'db_20240430_000000.sql'}
+    assert expire == {'db_20240603_000000.sql', 'db_20240402_000000.sql', 'db_20230110_000000.sql'}
+
+
+def test_newest_backup_is_always_kept(catalog):
+    add_backups(catalog, [datetime.datetime(2020, 1, 1), datetime.datetime(2019, 1, 1)])
+    keep, expire = planned_paths(catalog, daily=7, weekly=4, monthly=12)
+    assert keep == {'db_20200101_000000.sql'}
+    assert expire == {'db_20190101_000000.sql'}
+
+
+def test_monthly_window_crosses_year_boundary(catalog):
+    add_backups(catalog, [
+        datetime.datetime(2024, 6, 1),
+        datetime.datetime(2023, 12, 31),
+        datetime.datetime(2023, 12, 1),
+        datetime.datetime(2023, 6, 30),
+    ])
+    # June 2024 back to July 2023 is twelve months
+    keep, expire = planned_paths(catalog, daily=0, weekly=0, monthly=12)
+    assert keep == {'db_20240601_000000.sql', 'db_20231231_000000.sql'}
+    assert expire == {'db_20231201_000000.sql', 'db_20230630_000000.sql'}
+
+
+def test_plan_is_per_type(catalog):
+    add_backups(catalog, [datetime.datetime(2024, 6, 15, 1, 0), datetime.datetime(2024, 6, 15, 2, 0)])
+    catalog.add('files', 'files_20240101_000000.zip', 'md5', created_at=datetime.datetime(2024, 1, 1))
+    keep, expire = catalog.plan_retention('files', 1, 0, 0, now=NOW)
+    assert [entry['filepath'] for entry in keep] == ['files_20240101_000000.zip']
+    assert expire == []
@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+
+from backup_scheduler import CronSchedule, _parse_cron_field
+
+
+def at(*args):
+    return datetime.datetime(*args)
+
+
+def test_parse_cron_field_forms():
+    assert _parse_cron_field('*', 0, 5) == {0, 1, 2, 3, 4, 5}
+    assert _parse_cron_field('3', 0, 59) == {3}
+    assert _parse_cron_field('1-4', 0, 59) == {1, 2, 3, 4}
+    assert _parse_cron_field('*/15', 0, 59) == {0, 15, 30, 45}
+    assert _parse_cron_field('10-30/10', 0, 59) == {10, 20, 30}
+    assert _parse_cron_field('5/20', 0, 59) == {5, 25, 45}
+    assert _parse_cron_field('1,3,5-6', 0, 59) == {1, 3, 5, 6}
+
+
+@pytest.mark.parametrize('field', ['60', '5-3', '*/0', '-1', 'x'])
+def test_parse_cron_field_rejects_invalid(field):
+    with pytest.raises(ValueError):
+        _parse_cron_field(field, 0, 59)
+
+
+def test_wrong_field_count_rejected():
+    with pytest.raises(ValueError):
+        CronSchedule('0 3 * *')
+
+
+def test_next_fire_is_strictly_after():
+    cron = CronSchedule('0 3 * * *')
+    assert cron.next_after(at(2024, 5, 1, 2, 59, 30)) == at(2024, 5, 1, 3, 0)
+    assert cron.next_after(at(2024, 5, 1, 3, 0)) == at(2024, 5, 2, 3, 0)
+
+
+def test_hour_day_month_and_year_rollover():
+    cron = CronSchedule('30 4 * * *')
+    assert cron.next_after(at(2024, 12, 31, 5, 0)) == at(2025, 1, 1, 4, 30)
+    assert CronSchedule('0 0 1 * *').next_after(at(2024, 1, 31, 12, 0)) == at(2024, 2, 1, 0, 0)
+
+
+def test_leap_day():
+    cron = CronSchedule('0 0 29 2 *')
+    assert cron.next_after(at(2024, 3, 1)) == at(2028, 2, 29, 0, 0)
+    assert cron.next_after(at(2023, 6, 1)) == at(2024, 2, 29, 0, 0)
+
+
+def test_impossible_date_raises():
+    with pytest.raises(ValueError):
+        CronSchedule('0 0 31 2 *').next_after(at(2024, 1, 1))
+
+
+def test_weekday_sunday_is_zero_or_seven():
+    # 2024-05-05 is a Sunday
+    expected = at(2024, 5, 5, 0, 0)
+    assert CronSchedule('0 0 * * 0').next_after(at(2024, 5, 1)) == expected
+    assert CronSchedule('0 0 * * 7').next_after(at(2024, 5, 1)) == expected
+
+
+def test_restricted_day_and_weekday_match_either():
+    # The 15th or any Monday; 2024-05-06 is the first Monday after May 1st
+    cron = CronSchedule('0 12 15 * 1')
+    assert cron.next_after(at(2024, 5, 1)) == at(2024, 5, 6, 12, 0)
+    assert cron.next_after(at(2024, 5, 13, 13, 0)) == at(2024, 5, 15, 12, 0)
+
+
+def test_stepped_star_day_field_is_anded_with_weekday():
+    # Odd days that are Mondays: 2024-05-06 and 2024-05-20 are even, 2024-05-13 is odd
+    cron = CronSchedule('0 0 */2 * 1')
+    assert cron.next_after(at(2024, 5, 1)) == at(2024, 5, 13, 0, 0)
+    assert cron.next_after(at(2024, 5, 14)) == at(2024, 5, 27, 0, 0)
+    # Likewise a stepped weekday field leaves the day-of-month restriction in force
+    assert CronSchedule('0 0 15 * */2').next_after(at(2024, 5, 1)) == at(2024, 6, 15, 0, 0)
+
+
+def test_aliases_and_intervals():
+    assert CronSchedule('@hourly').next_after(at(2024, 5, 1, 10, 15)) == at(2024, 5, 1, 11, 0)
+    assert CronSchedule('@weekly').next_after(at(2024, 5, 1)) == at(2024, 5, 5, 0, 0)
+    assert CronSchedule('@every 30m').next_after(at(2024, 5, 1, 10, 15, 7)) == at(2024, 5, 1, 10, 45, 7)
+    with pytest.raises(ValueError):
+        CronSchedule('@every 0m')
@@ -0,0 +1,103 @@
+import os
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+import bulk_transfer
+
+
+class RecordingCursor:
+    def __init__(self, statements):
+        self.statements = statements
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.statements.append(' '.join(sql.split()))
+
+    def copy_expert(self, sql, f, size=None):
+        self.statements.append(sql)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return RecordingCursor(self.statements)
+
+    def commit(self):
+        self.statements.append('COMMIT')
+
+    def rollback(self):
+        self.statements.append('ROLLBACK')
+
+
+def test_truncate_import_of_outfits_recounts_inbox_in_the_same_transaction(tmp_path, monkeypatch):
+    conn = RecordingConnection()
+
+    @contextmanager
+    def fake_connection():
+        yield conn
+
+    monkeypatch.setattr(bulk_transfer, 'get_db_connection', fake_connection)
+    source = tmp_path / 'saved_outfits.csv'
+    source.write_text('id,outfit_id,user_id\n1,abc,1\n')
+
+    bulk_transfer._import_tables({'saved_outfits': str(source)}, 'csv', truncate=True)
+
+    statements = conn.statements
+    assert statements[0] == 'TRUNCATE saved_outfits CASCADE'
+    recount = statements.index('DELETE FROM user_inbox_counts')
+    assert statements[recount + 1].startswith('INSERT INTO user_inbox_counts')
+    assert 'DELETE FROM user_preference_profiles' in statements[recount:]
+    assert statements[-1] == 'COMMIT'
+
+
+# Runs against the configured PG* database and truncates its outfit tables,
+# so it only runs when explicitly enabled
+requires_database = pytest.mark.skipif(
+    not os.environ.get('OUTFIT_WIZARD_TEST_DATABASE'),
+    reason="set OUTFIT_WIZARD_TEST_DATABASE=1 to run against a disposable database"
+)
+
+
+@requires_database
+def test_truncate_import_clears_unread_share_counts(tmp_path):
+    from migrations import run_migrations
+    from data_manager import get_db_connection, get_unread_share_count
+
+    assert run_migrations()[0]
+    suffix = uuid.uuid4().hex[:8]
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        user_ids = []
+        for name in ('sender', 'recipient'):
+            cur.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id",
+                (f"{name}_{suffix}", f"{name}_{suffix}@example.com", b'x')
+            )
+            user_ids.append(cur.fetchone()[0])
+        cur.execute("INSERT INTO saved_outfits (outfit_id, user_id) VALUES (%s, %s) RETURNING id",
+                    (suffix, user_ids[0]))
+        outfit_pk = cur.fetchone()[0]
+        cur.execute(
+            "INSERT INTO shared_outfits (outfit_id, shared_by_user_id, shared_with_user_id) VALUES (%s, %s, %s)",
+            (outfit_pk, user_ids[0], user_ids[1])
+        )
+        conn.commit()
+        cur.close()
+    assert get_unread_share_count(user_ids[1]) == 1
+
+    assert bulk_transfer.export_table('saved_outfits', str(tmp_path / 'saved_outfits.csv'))[0]
+    results = bulk_transfer.import_all(str(tmp_path), tables=['saved_outfits'], truncate=True)
+    assert results['saved_outfits'][0]
+
+    # The outfits came back but the cascade removed their shares
+    assert get_unread_share_count(user_ids[1]) == 0
@@ -0,0 +1,33 @@
+from text_layout import get_font, wrap_text
+
+TEXT = ("Layer a light cardigan over a fitted tee and finish with white sneakers "
+        "for an easy weekend look that works from brunch to an evening walk")
+
+
+def width(line):
+    return get_font('body').getlength(line)
+
+
+def test_wrap_keeps_every_word_in_order():
+    lines = wrap_text(TEXT, 'body', 300)
+    assert " ".join(lines).split() == TEXT.split()
+
+
+def test_lines_fit_and_are_filled_greedily():
+    lines = wrap_text(TEXT, 'body', 300)
+    assert len(lines) > 1
+    for line, following in zip(lines, lines[1:]):
+        assert width(line) <= 300
+        # The next line's first word would not have fit on this one
+        assert width(f"{line} {following.split()[0]}") > 300
+    assert width(lines[-1]) <= 300
+
+
+def test_overlong_word_gets_its_own_line():
+    lines = wrap_text("a Supercalifragilisticexpialidocious b", 'body', 50)
+    assert lines == ("a", "Supercalifragilisticexpialidocious", "b")
+
+
+def test_empty_and_whitespace_text():
+    assert wrap_text("", 'body', 300) == ()
+    assert wrap_text("   \n  ", 'body', 300) == ()
@@ -0,0 +1,56 @@
+import logging
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from PIL import ImageFont
+
+# Font roles used by the style recipe renderer: (font file, point size)
+FONT_SPECS: Dict[str, Tuple[str, int]] = {
+    'title': ("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 48),
+    'heading': ("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36),
+    'body': ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24),
+}
+
+
+@lru_cache(maxsize=None)
+def get_font(role: str) -> ImageFont.ImageFont:
+    """Load a font for a role once per process, falling back to the default font"""
+    path, size = FONT_SPECS[role]
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError as e:
+        logging.warning(f"Falling back to default font for {role}: {str(e)}")
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=4096)
+def _word_width(role: str, word: str) -> float:
+    """Rendered width of a single word in a role's font"""
+    return get_font(role).getlength(word)
+
+
+@lru_cache(maxsize=512)
+def wrap_text(text: str, role: str, max_width: int) -> Tuple[str, ...]:
+    """Greedily wrap text to max_width pixels, measuring each word only once
+
+    Line width is tracked as a running sum of word and space widths, so
+    wrapping is linear in the number of words rather than re-measuring the
+    growing line after every word.
+    """
+    space_width = _word_width(role, ' ')
+    lines = []
+    current_line = []
+    current_width = 0.0
+
+    for word in text.split():
+        width = _word_width(role, word)
+        if current_line and current_width + space_width + width > max_width:
+            lines.append(" ".join(current_line))
+            current_line = []
+            current_width = 0.0
+        current_width += (space_width if current_line else 0.0) + width
+        current_line.append(word)
+
+    if current_line:
+        lines.append(" ".join(current_line))
+    return tuple(lines)